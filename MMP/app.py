@@ -1,69 +1,255 @@
 from flask import Flask, render_template, request
 from flask_socketio import SocketIO, emit, join_room, leave_room
+import os
 import random
 import json
+import itertools
+import secrets
+import time
+import threading
+import multiprocessing
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from timer_wheel import TimerWheel
+from patterns import PatternBoard
+from sparse_board import SparseBoard
+from matchmaking import MatchQueue, RatingStore
+from solver import solve_position, LRUCache
+import protocol
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'mahjong_secret_2024'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+DEFAULT_ROOM = 'main'
+DEFAULT_TIME_CONTROL = ('fischer', 600, 10)  # 默认每方10分钟，每步加10秒
+DEFAULT_SIZE = 15
+MIN_SIZE, MAX_SIZE = 5, 19   # 有边界棋盘的大小范围，size=None 为无限棋盘
+MAX_MAIN_TIME = 24 * 3600    # @t 主时间上限（秒），下限 1 秒
+MAX_EXTRA_TIME = 3600        # @t 每步加秒/读秒秒数上限
+MAX_PERIODS = 100            # 读秒次数上限
+MAX_COORD = 2 ** 31 - 1      # 无限棋盘坐标的绝对值上限，保证二进制协议和浏览器端的整数都不溢出
+COORD_DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+DISCONNECT_GRACE = 60        # 断线后保留座位的秒数
+ROOM_IDLE_TIMEOUT = 30 * 60  # 房间无任何操作多久后回收
+TIMER_TICK = 0.1             # 时间轮精度（秒）
+HINT_WORKERS = 2             # @hint 求解进程数
+HINT_MAX_NODES = 50000       # 单次求解的节点预算
+HINT_TIME_LIMIT = 3.0        # 单次求解的时间预算（秒）
+MATCH_SWEEP_INTERVAL = 1.0   # 匹配队列放宽分差后重新配对的间隔（秒）
+RATINGS_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ratings.db')
+BINARY_SUFFIX = '/bin'       # 二进制协议的连接加入 '<房间号>/bin'，与 JSON 文本分开广播
+
+
+class MoveClock:
+    """单个玩家的棋钟
+
+    fischer: 主时间用完即负，每走一步加 extra 秒
+    byoyomi: 主时间用完后进入读秒，每步须在 extra 秒内走完，超时消耗一次读秒，次数用完即负
+    """
+    def __init__(self, mode, main, extra, periods=0):
+        self.mode = mode
+        self.remaining = main
+        self.extra = extra
+        self.periods = periods
+
+    def time_left(self):
+        """从本步开始到超时判负的秒数"""
+        if self.mode == 'byoyomi':
+            return self.remaining + self.periods * self.extra
+        return self.remaining
+
+    def charge(self, elapsed):
+        """扣除本步用时，超时返回 False"""
+        if self.mode == 'byoyomi':
+            if elapsed <= self.remaining:
+                self.remaining -= elapsed
+                return True
+            lost = int((elapsed - self.remaining) // self.extra)
+            self.remaining = 0
+            if lost >= self.periods:
+                self.periods = 0
+                return False
+            self.periods -= lost
+            return True
+        self.remaining -= elapsed
+        if self.remaining < 0:
+            self.remaining = 0
+            return False
+        self.remaining += self.extra
+        return True
+
+    def display(self, elapsed=0.0):
+        """显示剩余时间，elapsed 为本步已用时间"""
+        remaining = self.remaining - elapsed
+        if self.mode == 'byoyomi' and remaining <= 0:
+            overflow = -remaining
+            periods = max(0, self.periods - int(overflow // self.extra))
+            return f'读秒 {periods}次 本次剩{int(self.extra - overflow % self.extra)}s'
+        minutes, seconds = divmod(int(max(0, remaining)), 60)
+        return f'{minutes:02d}:{seconds:02d}'
+
+
+game_ids = itertools.count(1)  # 每次开局一个新编号，断线重连时据此判断客户端的本地棋盘是否还有效
+
+
 class GomokuGame:
-    def __init__(self):
-        self.board = [[' ' for _ in range(15)] for _ in range(15)]
+    def __init__(self, time_control=DEFAULT_TIME_CONTROL, size=DEFAULT_SIZE):
+        self.game_id = 0
+        self.size = size
+        self.board = self.new_board()
         self.players = {}
         self.player_list = []
         self.current_turn = 0
         self.game_started = False
         self.move_history = []
+        self.time_control = time_control  # None 表示不计时
+        self.clocks = {}
+        self.turn_started = 0.0
+        self.renju = False  # 连珠规则：黑棋禁手，黑棋长连不算胜
+        self.rated = False  # 匹配对局，结束时更新等级分
+        self.patterns = self.new_patterns()
         
+    def new_board(self):
+        if self.size is None:
+            return SparseBoard()
+        return [[' ' for _ in range(self.size)] for _ in range(self.size)]
+    
+    def new_patterns(self):
+        # 棋型表按线建立，只用于有边界的棋盘
+        if self.size is None:
+            return None
+        return PatternBoard(self.size, renju=self.renju)
+    
     def start_game(self):
         if len(self.players) != 2:
             return False, "需要正好2个玩家"
         
-        self.board = [[' ' for _ in range(15)] for _ in range(15)]
+        self.game_id = next(game_ids)
+        self.board = self.new_board()
         self.player_list = list(self.players.keys())
         self.current_turn = 0
         self.game_started = True
         self.move_history = []
+        self.patterns = self.new_patterns()
         
         self.players[self.player_list[0]]['symbol'] = '●'
         self.players[self.player_list[1]]['symbol'] = '○'
         
+        self.clocks = {}
+        if self.time_control:
+            for pid in self.player_list:
+                self.clocks[pid] = MoveClock(*self.time_control)
+        self.turn_started = time.monotonic()
+        
         return True, f"游戏开始！{self.players[self.player_list[0]]['name']}(●) vs {self.players[self.player_list[1]]['name']}(○)"
     
     def place_stone(self, player_id, row, col):
         if not self.game_started:
-            return False, "游戏还未开始", None
+            return False, "游戏还未开始", 'not_started'
         
         current_player_id = self.player_list[self.current_turn]
         if player_id != current_player_id:
-            return False, f"现在是 {self.players[current_player_id]['name']} 的回合", None
+            return False, f"现在是 {self.players[current_player_id]['name']} 的回合", 'not_your_turn'
         
-        if row < 0 or row >= 15 or col < 0 or col >= 15:
-            return False, "坐标超出范围 (0-14)", None
+        if self.size is None:
+            if self.board.get(row, col) != ' ':
+                return False, "该位置已有棋子", 'occupied'
+        else:
+            if row < 0 or row >= self.size or col < 0 or col >= self.size:
+                return False, f"坐标超出范围 (0-{self.size - 1})", 'out_of_range'
+            if self.board[row][col] != ' ':
+                return False, "该位置已有棋子", 'occupied'
+        
+        if self.renju and self.current_turn == 0:
+            forbidden = self.patterns.forbidden(row, col)
+            if forbidden:
+                return False, f"黑棋禁手（{forbidden}），请换个位置", 'forbidden'
         
-        if self.board[row][col] != ' ':
-            return False, "该位置已有棋子", None
+        # 扣除本步用时
+        now = time.monotonic()
+        clock = self.clocks.get(player_id)
+        if clock and not clock.charge(now - self.turn_started):
+            return True, self.timeout(player_id), 'timeout'
+        self.turn_started = now
         
         symbol = self.players[player_id]['symbol']
-        self.board[row][col] = symbol
         self.move_history.append((row, col, symbol))
-        
-        winner = self.check_winner(row, col, symbol)
-        if winner:
+        if self.size is None:
+            self.board.place(row, col, symbol)
+            won = self.board.check_five(row, col, symbol)
+        else:
+            self.board[row][col] = symbol
+            # 查表得到四个方向的棋型，同时增量更新整盘棋型计数
+            patterns = self.patterns.place(row, col, self.current_turn)
+            won = self.patterns.is_win(patterns, self.current_turn)
+        if won:
             return True, f"恭喜 {self.players[player_id]['name']} 获胜！", 'win'
         
         self.current_turn = 1 - self.current_turn
         next_player = self.players[self.player_list[self.current_turn]]['name']
         return True, f"落子成功！轮到 {next_player}", None
     
+    def current_player_id(self):
+        return self.player_list[self.current_turn] if self.game_started else None
+    
+    def time_left(self):
+        """当前走棋方距离超时的秒数，不计时返回 None"""
+        clock = self.clocks.get(self.current_player_id())
+        if clock is None:
+            return None
+        return clock.time_left() - (time.monotonic() - self.turn_started)
+    
+    def rebind(self, old_id, new_id):
+        """断线重连：把座位、先后手和棋钟转给新的连接"""
+        self.players = {new_id if pid == old_id else pid: info for pid, info in self.players.items()}
+        self.player_list = [new_id if pid == old_id else pid for pid in self.player_list]
+        if old_id in self.clocks:
+            self.clocks[new_id] = self.clocks.pop(old_id)
+    
+    def opponent_of(self, player_id):
+        return next(pid for pid in self.player_list if pid != player_id)
+    
+    def timeout(self, player_id):
+        """超时判负，返回结果消息"""
+        self.game_started = False
+        winner_id = self.opponent_of(player_id)
+        return f"{self.players[player_id]['name']} 超时，{self.players[winner_id]['name']} 获胜！"
+    
+    def remove_player(self, player_id):
+        """玩家离开，对局中则判对方获胜，返回结果消息"""
+        name = self.players.pop(player_id)['name']
+        if self.game_started and player_id in self.player_list:
+            self.game_started = False
+            winner_id = self.opponent_of(player_id)
+            return f"{name} 断线未归，{self.players[winner_id]['name']} 获胜！"
+        return f"{name} 离开了游戏"
+    
+    def get_clock_display(self):
+        if not self.clocks:
+            return ''
+        parts = []
+        for pid in self.player_list:
+            # 当前走棋方显示扣除本步已用时间后的剩余
+            elapsed = 0.0
+            if self.game_started and pid == self.current_player_id():
+                elapsed = time.monotonic() - self.turn_started
+            text = self.clocks[pid].display(elapsed)
+            parts.append(f"{self.players[pid]['name']}({self.players[pid]['symbol']}) {text}")
+        return '计时: ' + ' | '.join(parts)
+    
     def check_winner(self, row, col, symbol):
+        if self.size is None:
+            return self.board.check_five(row, col, symbol)
+        size = self.size
         directions = [(0,1), (1,0), (1,1), (1,-1)]
         for dr, dc in directions:
             count = 1
             for direction in [1, -1]:
                 r, c = row + dr * direction, col + dc * direction
-                while 0 <= r < 15 and 0 <= c < 15 and self.board[r][c] == symbol:
+                while 0 <= r < size and 0 <= c < size and self.board[r][c] == symbol:
                     count += 1
                     r += dr * direction
                     c += dc * direction
@@ -72,13 +258,382 @@ class GomokuGame:
         return False
     
     def get_board_display(self):
+        if self.size is None:
+            return self.board.render()
         lines = []
-        lines.append('   ' + ' '.join([f'{i:X}' for i in range(15)]))
+        lines.append('   ' + ' '.join([COORD_DIGITS[i] for i in range(self.size)]))
         for i, row in enumerate(self.board):
-            lines.append(f'{i:X}  ' + ' '.join(row))
+            lines.append(f'{COORD_DIGITS[i]}  ' + ' '.join(row))
         return '\n'.join(lines)
 
-game = GomokuGame()
+class Room:
+    """一个房间：一局棋、房间内的连接以及相关定时器"""
+    def __init__(self, room_id):
+        self.id = room_id
+        self.game = GomokuGame()
+        self.members = set()    # 房间内的连接(sid)，含观战者
+        self.flag_timer = None  # 走棋方超时判负
+        self.idle_timer = None  # 无操作回收
+        self.grace_timers = {}  # 断线玩家 -> 保留座位的定时器
+
+
+rooms = {}
+player_rooms = {}  # sid -> 房间号
+binary_clients = set()  # 开启了二进制协议的连接
+sessions = {}    # 会话令牌 -> sid，重连时凭令牌找回座位
+session_of = {}  # sid -> 会话令牌
+pending_resumes = {}  # sid -> (令牌, 对局编号, 序号)：座位仍被在线的连接占用，等待 @resume 确认接管
+state_lock = threading.RLock()  # 命令处理与定时器回调在不同线程，共用一把锁
+
+# 所有房间的计时共用一个时间轮和一个 tick 任务
+timer_wheel = TimerWheel(TIMER_TICK, now=time.monotonic())
+timer_task_started = False
+
+
+def get_room(room_id):
+    room = rooms.get(room_id)
+    if room is None:
+        room = rooms[room_id] = Room(room_id)
+        touch_room(room)
+    return room
+
+
+def room_of(sid):
+    return get_room(player_rooms.get(sid, DEFAULT_ROOM))
+
+
+def socket_room(sid, room_id):
+    """连接实际加入的 Socket.IO 房间：二进制客户端在 '<房间号>/bin'"""
+    return room_id + BINARY_SUFFIX if sid in binary_clients else room_id
+
+
+def enter_room(sid, room, sync=True):
+    """把连接移到指定房间，之后只收到该房间的广播"""
+    old = player_rooms.get(sid)
+    if old == room.id:
+        return
+    if old in rooms:
+        rooms[old].members.discard(sid)
+    if old is not None:
+        socketio.server.leave_room(sid, socket_room(sid, old), namespace='/')
+    player_rooms[sid] = room.id
+    room.members.add(sid)
+    socketio.server.enter_room(sid, socket_room(sid, room.id), namespace='/')
+    if sync and sid in binary_clients:
+        sync_binary(sid, room)
+
+
+def broadcast(room, data):
+    """文本消息，两种协议的客户端都收到"""
+    socketio.emit('output', {'data': data}, to=room.id)
+    socketio.emit('output', {'data': data}, to=room.id + BINARY_SUFFIX)
+
+
+def broadcast_game(room, texts, packets, **fields):
+    """对局事件：JSON 客户端收到文本，二进制客户端收到对应的包，由客户端本地生成文字
+
+    fields 附加在第一条文本里（对局编号、落子序号），客户端据此维护本地棋盘，重连时只补缺的步
+    """
+    for i, text in enumerate(texts):
+        data = {'data': text, **fields} if i == 0 else {'data': text}
+        socketio.emit('output', data, to=room.id)
+    for packet in packets:
+        socketio.emit('b', packet, to=room.id + BINARY_SUFFIX)
+
+
+def sync_binary(sid, room):
+    """二进制客户端在本地维护棋盘，中途进入对局时补发玩家和棋盘"""
+    game = room.game
+    if game.game_started:
+        socketio.emit('b', protocol.encode_start(game, resync=True), to=sid)
+        socketio.emit('b', protocol.encode_board(game), to=sid)
+
+
+def touch_room(room):
+    """房间有操作，顺延空闲回收时间"""
+    timer_wheel.cancel(room.idle_timer)
+    room.idle_timer = timer_wheel.schedule(ROOM_IDLE_TIMEOUT, evict_room, room.id)
+
+
+def schedule_flag(room):
+    """按当前走棋方的剩余时间安排超时判负"""
+    timer_wheel.cancel(room.flag_timer)
+    room.flag_timer = None
+    left = room.game.time_left()
+    if left is not None:
+        room.flag_timer = timer_wheel.schedule(left, on_flag, room.id, room.game.current_player_id(),
+                                               len(room.game.move_history))
+
+
+def on_flag(room_id, player_id, moves):
+    room = rooms.get(room_id)
+    if room is None or not room.game.game_started:
+        return
+    game = room.game
+    # 定时器安排之后已经走过棋，忽略
+    if game.current_player_id() != player_id or len(game.move_history) != moves:
+        return
+    broadcast_game(room, [game.timeout(player_id)],
+                   [protocol.encode_result(protocol.RESULT_TIMEOUT, game.player_list.index(player_id))])
+    finish_rated_game(room, game.opponent_of(player_id))
+
+
+def on_grace_expired(room_id, sid):
+    room = rooms.get(room_id)
+    if room is None:
+        return
+    room.grace_timers.pop(sid, None)
+    room.members.discard(sid)
+    player_rooms.pop(sid, None)
+    drop_session(sid)
+    if sid in room.game.players:
+        game = room.game
+        if game.game_started:
+            finish_rated_game(room, game.opponent_of(sid))
+            loser = game.player_list.index(sid)
+            broadcast_game(room, [game.remove_player(sid)],
+                           [protocol.encode_result(protocol.RESULT_ABANDON, loser)])
+        else:
+            broadcast(room, game.remove_player(sid))
+        if not game.game_started:
+            timer_wheel.cancel(room.flag_timer)
+
+
+def evict_room(room_id):
+    """回收长时间无操作的房间，仍在线的连接回到默认房间"""
+    room = rooms.pop(room_id, None)
+    if room is None:
+        return
+    timer_wheel.cancel(room.flag_timer)
+    for timer in room.grace_timers.values():
+        timer_wheel.cancel(timer)
+    broadcast(room, f'房间 {room_id} 长时间无操作，已关闭')
+    members = [sid for sid in room.members if sid not in room.grace_timers]
+    for sid in room.members:
+        socketio.server.leave_room(sid, socket_room(sid, room_id), namespace='/')
+        player_rooms.pop(sid, None)
+        drop_session(sid)
+    if members:
+        lobby = get_room(DEFAULT_ROOM)
+        for sid in members:
+            enter_room(sid, lobby)
+
+
+def issue_session(sid):
+    """入座时发放会话令牌，断线后凭令牌重连可以回到原来的座位"""
+    drop_session(sid)
+    token = secrets.token_urlsafe(16)
+    sessions[token] = sid
+    session_of[sid] = token
+    socketio.emit('session', {'token': token}, to=sid)
+
+
+def drop_session(sid):
+    token = session_of.pop(sid, None)
+    if token is not None:
+        sessions.pop(token, None)
+
+
+def resync_state(room, game_id, seq):
+    """重连快照：对局信息加上客户端确认的序号之后的落子，不发整盘棋盘
+
+    客户端的对局编号不符（或没有本地棋盘）时从第一步补起
+    """
+    game = room.game
+    history = game.move_history
+    start = seq if game_id == game.game_id and 0 <= seq <= len(history) else 0
+    return {
+        'room': room.id,
+        'game': game.game_id,
+        'started': game.game_started,
+        'size': game.size or 0,
+        'names': [game.players[pid]['name'] if pid in game.players else '' for pid in game.player_list],
+        'current': game.current_turn,
+        'from': start,
+        'seq': len(history),
+        'moves': [v for row, col, _ in history[start:] for v in (row, col)],
+        'clock': game.get_clock_display() if game.game_started else '',
+    }
+
+
+def resume_session(sid, token, game_id, seq, takeover=False):
+    """把令牌对应的座位转给新连接并补发状态，令牌无效时返回 False
+
+    占用座位的旧连接仍在线时（例如同一浏览器的另一个标签页）不抢座位，除非 takeover=True（@resume）
+    """
+    old = sessions.get(token)
+    room = rooms.get(player_rooms.get(old))
+    if room is None or old not in room.game.players:
+        drop_session(old)
+        return False
+    if old == sid:
+        emit('resync', resync_state(room, game_id, seq))
+        return True
+    connected = socketio.server.manager.is_connected(old, '/')
+    if connected and not takeover:
+        pending_resumes[sid] = (token, game_id, seq)
+        emit('output', {'data': f"座位 {room.game.players[old]['name']} 正在另一个连接中使用。"
+                                f"输入 @resume 在这里接管（会断开另一个连接）"})
+        return True
+    timer_wheel.cancel(room.grace_timers.pop(old, None))
+    room.members.discard(old)
+    player_rooms.pop(old, None)
+    session_of.pop(old, None)
+    pending_resumes.pop(old, None)
+    if connected:
+        # 例如网络闪断后服务端还没发现旧连接已断，由玩家确认后踢掉
+        socketio.server.leave_room(old, socket_room(old, room.id), namespace='/')
+        socketio.server.disconnect(old, namespace='/')
+    binary_clients.discard(old)
+    rate_limiter.forget(old)
+    
+    enter_room(sid, room, sync=False)
+    room.game.rebind(old, sid)
+    sessions[token] = sid
+    session_of[sid] = token
+    if room.game.game_started:
+        # 超时定时器按玩家 sid 核对，换了 sid 要重排
+        schedule_flag(room)
+    emit('resync', resync_state(room, game_id, seq))
+    broadcast(room, f"{room.game.players[sid]['name']} 重新连接")
+    return True
+
+
+def run_timers():
+    while True:
+        socketio.sleep(TIMER_TICK)
+        with state_lock:
+            timer_wheel.advance(time.monotonic())
+
+
+def ensure_timer_task():
+    global timer_task_started
+    if not timer_task_started:
+        timer_task_started = True
+        socketio.start_background_task(run_timers)
+
+
+# @hint 的结果按局面缓存，观战者重复查询直接命中
+hint_cache = LRUCache(1024)
+hint_pending = {}  # 局面 -> 等待结果的连接
+hint_pool = None
+
+
+def get_hint_pool():
+    """求解放在子进程里，不占用处理命令的线程"""
+    global hint_pool
+    if hint_pool is None:
+        hint_pool = ProcessPoolExecutor(HINT_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return hint_pool
+
+
+def format_hint(result, symbols):
+    """symbols: (进攻方棋子, 防守方棋子)"""
+    if result['kind'] is None:
+        if result['complete']:
+            return f'提示: {symbols[0]} 没有连续冲四或连续活三的必胜'
+        return f'提示: {symbols[0]} 在搜索预算内没有找到必胜'
+    kind = '连续冲四(VCF)' if result['kind'] == 'VCF' else '连续威胁(VCT)'
+    steps = ' '.join(f'{symbols[i % 2]}({r},{c})' for i, (r, c) in enumerate(result['line']))
+    return f'提示: {symbols[0]} 有{kind}必胜: {steps}'
+
+
+def on_hint_done(key, symbols, future):
+    global hint_pool
+    try:
+        result = future.result()
+    except Exception as e:
+        print(f"计算提示出错: {e}")
+        text = '提示计算失败，请稍后再试'
+        # 子进程异常退出后进程池不可再用，下次重新创建
+        if isinstance(e, BrokenProcessPool):
+            hint_pool = None
+    else:
+        # 预算用完的结论不确定，不缓存
+        if result['kind'] or result['complete']:
+            hint_cache.put(key, result)
+        text = format_hint(result, symbols)
+    with state_lock:
+        waiting = hint_pending.pop(key, [])
+    for sid in waiting:
+        socketio.emit('output', {'data': text}, to=sid)
+
+
+# 匹配队列，配上的两人自动进入新房间开局
+match_queue = MatchQueue()
+match_sweep_timer = None
+match_room_ids = itertools.count(1)
+rating_store = None
+
+
+def get_rating_store():
+    global rating_store
+    if rating_store is None:
+        rating_store = RatingStore(RATINGS_DB)
+    return rating_store
+
+
+def announce_start(room, msg):
+    """开局后广播棋盘、先手和棋钟，并开始计时"""
+    game = room.game
+    board = game.get_board_display()
+    current_player = game.players[game.player_list[0]]['name']
+    texts = [msg, f'\n{board}', f'\n{current_player} 先手！']
+    packets = [protocol.encode_start(game)]
+    if game.clocks:
+        texts.append(game.get_clock_display())
+        packets.append(protocol.encode_clock(game))
+    broadcast_game(room, texts, packets, game=game.game_id, size=game.size or 0)
+    schedule_flag(room)
+
+
+def start_match(first, second):
+    """两名配上的玩家进入一个新房间，直接开局"""
+    room_id = f'q{next(match_room_ids)}'
+    while room_id in rooms:
+        room_id = f'q{next(match_room_ids)}'
+    room = get_room(room_id)
+    for entry in (first, second):
+        enter_room(entry.key, room)
+        room.game.players[entry.key] = {'name': entry.name, 'symbol': ''}
+        issue_session(entry.key)
+    room.game.rated = True
+    broadcast(room, f'匹配成功！房间 {room_id}: {first.name} ({first.rating:.0f}) vs '
+                    f'{second.name} ({second.rating:.0f})')
+    success, msg = room.game.start_game()
+    announce_start(room, msg)
+
+
+def run_match_sweep():
+    global match_sweep_timer
+    match_sweep_timer = None
+    for first, second in match_queue.sweep():
+        start_match(first, second)
+    ensure_match_sweep()
+
+
+def ensure_match_sweep():
+    """队列里有人时定期重新配对（等得越久分差窗口越宽）"""
+    global match_sweep_timer
+    if match_queue and match_sweep_timer is None:
+        match_sweep_timer = timer_wheel.schedule(MATCH_SWEEP_INTERVAL, run_match_sweep)
+
+
+def finish_rated_game(room, winner_id):
+    """匹配对局结束，记录结果并广播新的等级分"""
+    game = room.game
+    if not game.rated:
+        return
+    game.rated = False
+    winner = game.players[winner_id]['name']
+    loser = game.players[game.opponent_of(winner_id)]['name']
+    try:
+        winner_rating, loser_rating = get_rating_store().record(winner, loser)
+    except Exception as e:
+        print(f"更新等级分出错: {e}")
+        return
+    broadcast(room, f'等级分: {winner} {winner_rating:.0f}，{loser} {loser_rating:.0f}')
+
 
 @app.route('/')
 def index():
@@ -86,8 +641,132 @@ def index():
 
 @socketio.on('connect')
 def handle_connect():
+    ensure_timer_task()
+    with state_lock:
+        enter_room(request.sid, get_room(DEFAULT_ROOM))
     emit('message', {'data': '欢迎使用五子棋终端！输入 @h 查看命令'})
 
+
+@socketio.on('hello')
+def handle_hello(data):
+    """连接协商
+
+    {'binary': 1} 开启二进制对局事件，{'binary': 0} 切回 JSON 文本；
+    带上 {'token', 'game', 'seq'} 时恢复会话：回到原座位，并补发确认序号之后的落子
+    """
+    sid = request.sid
+    data = data if isinstance(data, dict) else {}
+    binary = bool(data.get('binary'))
+    token = data.get('token')
+    with state_lock:
+        room_id = player_rooms.get(sid)
+        if room_id is not None:
+            socketio.server.leave_room(sid, socket_room(sid, room_id), namespace='/')
+        if binary:
+            binary_clients.add(sid)
+        else:
+            binary_clients.discard(sid)
+        emit('hello', {'binary': int(binary), 'version': protocol.PROTOCOL_VERSION})
+        if room_id is not None:
+            socketio.server.enter_room(sid, socket_room(sid, room_id), namespace='/')
+        if token:
+            try:
+                game_id, seq = int(data.get('game') or 0), int(data.get('seq') or 0)
+            except (TypeError, ValueError):
+                game_id, seq = 0, 0
+            if not resume_session(sid, str(token), game_id, seq):
+                emit('session', {'token': None})
+                emit('output', {'data': '会话已过期，请重新加入游戏 (@j <名字>)'})
+            return
+        if room_id is not None and binary:
+            sync_binary(sid, rooms[room_id])
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积攒 burst 个"""
+    __slots__ = ('tokens', 'last', 'notified')
+
+    def __init__(self, burst):
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.notified = False
+
+
+class RateLimiter:
+    """按连接(sid)限流，防止单个客户端刷命令拖慢所有玩家"""
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+
+    def allow(self, sid, cost=1):
+        bucket = self.buckets.get(sid)
+        if bucket is None:
+            bucket = self.buckets[sid] = TokenBucket(self.burst)
+        now = time.monotonic()
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.last) * self.rate)
+        bucket.last = now
+        if bucket.tokens < cost:
+            return False
+        bucket.tokens -= cost
+        bucket.notified = False
+        return True
+
+    def should_notify(self, sid):
+        """被拒绝时只提示一次，直到再次放行，避免提示本身成为负担"""
+        bucket = self.buckets.get(sid)
+        if bucket is None or bucket.notified:
+            return False
+        bucket.notified = True
+        return True
+
+    def forget(self, sid):
+        self.buckets.pop(sid, None)
+
+
+RATE_LIMIT_RATE = 5    # 每秒补充的令牌数
+RATE_LIMIT_BURST = 10  # 允许的突发命令数
+rate_limiter = RateLimiter(RATE_LIMIT_RATE, RATE_LIMIT_BURST)
+
+# 每个命令的调用、限流拒绝和参数错误次数
+command_stats = defaultdict(Counter)
+
+
+class CommandSpec:
+    def __init__(self, handler, args, optional, usage, error, cost):
+        self.handler = handler
+        self.args = args
+        self.optional = optional
+        self.usage = usage
+        self.error = error
+        self.cost = cost
+
+
+COMMANDS = {}
+
+
+def command(*names, args=(), optional=(), usage=None, error=None, cost=1):
+    """注册命令处理函数
+
+    args 为各参数的解析函数，参数不足时回复 usage，解析失败时回复 error；
+    optional 为可选参数的解析函数，未提供的可选参数不传给处理函数；
+    cost 为限流时消耗的令牌数，生成大段输出的命令消耗更多。
+    """
+    def decorator(func):
+        spec = CommandSpec(func, args, optional, usage, error, cost)
+        for name in names:
+            COMMANDS[name] = spec
+        return func
+    return decorator
+
+
+def parse_coord(text):
+    """解析坐标，单个字符按36进制 (0-9, A-I...)，否则按十进制（无限棋盘可为负数，绝对值不超过 MAX_COORD）"""
+    value = int(text, 36) if len(text) == 1 else int(text)
+    if abs(value) > MAX_COORD:
+        raise ValueError(text)
+    return value
+
+
 @socketio.on('command')
 def handle_command(data):
     cmd = data.get('command', '').strip()
@@ -98,109 +777,422 @@ def handle_command(data):
     
     parts = cmd.split()
     command = parts[0].lower()
+    spec = COMMANDS.get(command)
+    
+    # 先限流再做任何游戏逻辑
+    if not rate_limiter.allow(player_id, spec.cost if spec else 1):
+        command_stats[command if spec else '?']['rejected'] += 1
+        if rate_limiter.should_notify(player_id):
+            emit('output', {'data': '命令太频繁，请稍后再试'})
+        return
+    
+    if spec is None:
+        command_stats['?']['calls'] += 1
+        emit('output', {'data': f'未知命令: {command}，输入 @h 查看帮助'})
+        return
     
-    if command == '@h' or command == 'help':
-        help_text = """
+    command_stats[command]['calls'] += 1
+    if len(parts) - 1 < len(spec.args):
+        command_stats[command]['errors'] += 1
+        emit('output', {'data': spec.usage})
+        return
+    
+    try:
+        args = [parse(value) for parse, value in zip(spec.args + spec.optional, parts[1:])]
+    except ValueError:
+        command_stats[command]['errors'] += 1
+        emit('output', {'data': spec.error})
+        return
+    
+    with state_lock:
+        spec.handler(player_id, *args)
+        room = rooms.get(player_rooms.get(player_id))
+        if room:
+            touch_room(room)
+
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    sid = request.sid
+    rate_limiter.forget(sid)
+    with state_lock:
+        match_queue.remove(sid)
+        pending_resumes.pop(sid, None)
+        binary_clients.discard(sid)
+        room = rooms.get(player_rooms.get(sid))
+        if room is None:
+            player_rooms.pop(sid, None)
+            return
+        if sid in room.game.players:
+            # 保留座位一段时间，期间棋钟照常走
+            room.grace_timers[sid] = timer_wheel.schedule(DISCONNECT_GRACE, on_grace_expired, room.id, sid)
+            name = room.game.players[sid]['name']
+            broadcast(room, f'{name} 断线，{DISCONNECT_GRACE} 秒内未回来将离开游戏')
+        else:
+            room.members.discard(sid)
+            player_rooms.pop(sid, None)
+            drop_session(sid)
+
+
+@app.route('/stats')
+def stats():
+    return {name: dict(counter) for name, counter in command_stats.items()}
+
+
+@app.route('/leaderboard')
+def leaderboard():
+    return {'leaderboard': [{'name': name, 'rating': round(rating), 'wins': wins, 'losses': losses, 'draws': draws}
+                            for name, rating, wins, losses, draws in get_rating_store().leaderboard(100)]}
+
+
+@command('@h', 'help')
+def cmd_help(player_id):
+    help_text = """
 可用命令:
-  @j <名字>      - 加入游戏 (例: @j 小明)
+  @j <名字> [房间] - 加入游戏，可指定房间 (例: @j 小明 房间1)
   @s             - 开始游戏 (需要2人)
-  @p <行> <列>   - 下棋 (例: @p 7 7 表示中心位置)
+  @p <行> <列>   - 下棋 (例: @p 7 7 表示15路棋盘的中心)
   @b             - 查看棋盘
   @l             - 查看玩家列表
   @m             - 查看历史记录
+  @t <f|b|off> [参数] - 设置计时 (例: @t f 600 10 每方10分钟每步加10秒,
+                   @t b 300 30 3 主时间5分钟后读秒30秒3次)
+  @f <on|off>    - 连珠规则开关 (黑棋三三、四四、长连禁手)
+  @g <大小|inf>  - 设置棋盘大小 (5-19，inf 为无限棋盘)
+  @r             - 查看房间列表
+  @hint          - 提示当前走棋方的连续冲四/连续威胁必胜
+  @q [名字]      - 进入匹配队列，按等级分自动配对开局；不带名字为退出队列
+  @top [人数]    - 查看等级分排行榜
+  @resume        - 接管仍在另一个连接（标签页）中使用的座位
   @c             - 清屏
   @h             - 显示帮助
 
-坐标说明: 行和列都是0-14 (用十六进制0-E表示)
+坐标说明: 行和列从0开始，单个字符按36进制 (0-9, A-I)
+          无限棋盘的坐标可以是任意整数，包括负数 (绝对值不超过 2147483647)
 """
-        emit('output', {'data': help_text})
+    emit('output', {'data': help_text})
+
+
+@command('@j', args=(str,), optional=(str,), usage='用法: @j <名字> [房间]')
+def cmd_join(player_id, name, room_id=None):
+    room = room_of(player_id)
+    game = room.game
+    if player_id in game.players:
+        emit('output', {'data': f'你已经加入游戏，名字: {game.players[player_id]["name"]}'})
+        return
     
-    elif command == '@j':
-        if len(parts) < 2:
-            emit('output', {'data': '用法: @j <名字>'})
+    if match_queue.remove(player_id):
+        emit('output', {'data': '已退出匹配队列'})
+    
+    if room_id and room_id != room.id:
+        room = get_room(room_id)
+        game = room.game
+        if len(game.players) >= 2:
+            emit('output', {'data': f'房间 {room_id} 已满，只能2人对战'})
             return
-        
-        name = parts[1]
-        if player_id in game.players:
-            emit('output', {'data': f'你已经加入游戏，名字: {game.players[player_id]["name"]}'})
-        elif len(game.players) >= 2:
-            emit('output', {'data': '游戏已满，只能2人对战'})
-        else:
-            game.players[player_id] = {'name': name, 'symbol': ''}
-            emit('output', {'data': f'{name} 加入游戏！'})
-            socketio.emit('output', {'data': f'玩家 {name} 加入了游戏'})
+        enter_room(player_id, room)
     
-    elif command == '@l':
-        if not game.players:
-            emit('output', {'data': '当前没有玩家'})
+    if len(game.players) >= 2:
+        emit('output', {'data': '游戏已满，只能2人对战'})
+    else:
+        game.players[player_id] = {'name': name, 'symbol': ''}
+        issue_session(player_id)
+        emit('output', {'data': f'{name} 加入游戏！(房间 {room.id})'})
+        broadcast(room, f'玩家 {name} 加入了游戏')
+
+
+@command('@q', optional=(str,))
+def cmd_queue(player_id, name=None):
+    if player_id in match_queue:
+        if name is None:
+            match_queue.remove(player_id)
+            emit('output', {'data': '已退出匹配队列'})
         else:
-            player_list = '\n'.join([f"- {p['name']} {p.get('symbol', '')}" for p in game.players.values()])
-            emit('output', {'data': f'当前玩家:\n{player_list}'})
+            emit('output', {'data': f'你已在匹配队列中，当前 {len(match_queue)} 人排队'})
+        return
+    if name is None:
+        emit('output', {'data': '用法: @q <名字> 进入匹配，再输入 @q 退出'})
+        return
+    room = room_of(player_id)
+    if player_id in room.game.players:
+        emit('output', {'data': f'你已在房间 {room.id} 的对局中，不能同时匹配'})
+        return
     
-    elif command == '@s':
-        if player_id not in game.players:
-            emit('output', {'data': '请先加入游戏 (@j <名字>)'})
-            return
-        
-        success, msg = game.start_game()
-        if success:
-            socketio.emit('output', {'data': msg})
-            board = game.get_board_display()
-            socketio.emit('output', {'data': f'\n{board}'})
-            current_player = game.players[game.player_list[0]]['name']
-            socketio.emit('output', {'data': f'\n{current_player} 先手！'})
-        else:
-            emit('output', {'data': msg})
+    try:
+        rating = get_rating_store().get(name)
+    except Exception as e:
+        print(f"读取等级分出错: {e}")
+        emit('output', {'data': '读取等级分失败，请稍后再试'})
+        return
+    pair = match_queue.add(player_id, name, rating)
+    if pair:
+        start_match(*pair)
+    else:
+        emit('output', {'data': f'{name} 进入匹配队列 (等级分 {rating:.0f})，当前 {len(match_queue)} 人排队'})
+        ensure_match_sweep()
+
+
+@command('@top', optional=(int,), error='人数必须是数字')
+def cmd_leaderboard(player_id, limit=10):
+    rows = get_rating_store().leaderboard(max(1, min(limit, 50)))
+    if not rows:
+        emit('output', {'data': '还没有排位记录'})
+        return
+    lines = [f'{i + 1}. {name} {rating:.0f} ({wins}胜 {losses}负 {draws}和)'
+             for i, (name, rating, wins, losses, draws) in enumerate(rows)]
+    emit('output', {'data': '等级分排行榜:\n' + '\n'.join(lines)})
+
+
+@command('@resume')
+def cmd_resume(player_id):
+    pending = pending_resumes.pop(player_id, None)
+    if pending is None:
+        emit('output', {'data': '没有等待接管的座位'})
+        return
+    token, game_id, seq = pending
+    if not resume_session(player_id, token, game_id, seq, takeover=True):
+        emit('output', {'data': '会话已过期，请重新加入游戏 (@j <名字>)'})
+
+
+@command('@l')
+def cmd_list(player_id):
+    game = room_of(player_id).game
+    if not game.players:
+        emit('output', {'data': '当前没有玩家'})
+    else:
+        player_list = '\n'.join([f"- {p['name']} {p.get('symbol', '')}" for p in game.players.values()])
+        emit('output', {'data': f'当前玩家:\n{player_list}'})
+
+
+@command('@r')
+def cmd_rooms(player_id):
+    current = player_rooms.get(player_id)
+    lines = []
+    for room in rooms.values():
+        status = '对局中' if room.game.game_started else '等待中'
+        mark = ' (当前)' if room.id == current else ''
+        lines.append(f'- {room.id}{mark}: {len(room.game.players)}/2 人, {status}')
+    emit('output', {'data': '房间列表:\n' + '\n'.join(lines)})
+
+
+def parse_time_control(mode, *values):
+    """把 @t 的参数转成 GomokuGame 的 time_control，模式或数值超出范围时抛出 ValueError"""
+    if mode == 'off':
+        return None
+    if len(values) >= 2 and not (1 <= values[0] <= MAX_MAIN_TIME and 0 <= values[1] <= MAX_EXTRA_TIME):
+        raise ValueError(values)
+    if mode == 'f' and len(values) >= 2:
+        return ('fischer', values[0], values[1])
+    if mode == 'b' and len(values) >= 3 and values[1] > 0 and 0 <= values[2] <= MAX_PERIODS:
+        return ('byoyomi', values[0], values[1], values[2])
+    raise ValueError(mode)
+
+
+@command('@t', args=(str,), optional=(int, int, int),
+         usage=f'用法: @t f <每方秒数> <每步加秒> | @t b <主时间秒数> <读秒秒数> <读秒次数> | @t off\n'
+               f'      主时间 1-{MAX_MAIN_TIME} 秒，加秒/读秒 0-{MAX_EXTRA_TIME} 秒（读秒至少 1 秒），读秒次数 0-{MAX_PERIODS}',
+         error='计时参数必须是整数秒')
+def cmd_time_control(player_id, mode, *values):
+    game = room_of(player_id).game
+    if player_id not in game.players:
+        emit('output', {'data': '请先加入游戏 (@j <名字>)'})
+        return
+    if game.game_started:
+        emit('output', {'data': '对局进行中，不能修改计时'})
+        return
     
-    elif command == '@b':
-        if not game.game_started:
-            emit('output', {'data': '游戏还未开始'})
+    try:
+        game.time_control = parse_time_control(mode.lower(), *values)
+    except ValueError:
+        emit('output', {'data': COMMANDS['@t'].usage})
+        return
+    
+    if game.time_control is None:
+        broadcast(room_of(player_id), '本局不计时')
+    elif game.time_control[0] == 'fischer':
+        broadcast(room_of(player_id), f'计时: 每方 {values[0]} 秒，每步加 {values[1]} 秒')
+    else:
+        broadcast(room_of(player_id), f'计时: 主时间 {values[0]} 秒，读秒 {values[1]} 秒 x {values[2]} 次')
+
+
+@command('@f', args=(str,), usage='用法: @f on | @f off')
+def cmd_renju(player_id, mode):
+    room = room_of(player_id)
+    game = room.game
+    if player_id not in game.players:
+        emit('output', {'data': '请先加入游戏 (@j <名字>)'})
+        return
+    if game.game_started:
+        emit('output', {'data': '对局进行中，不能修改规则'})
+        return
+    if mode.lower() not in ('on', 'off'):
+        emit('output', {'data': COMMANDS['@f'].usage})
+        return
+    if game.size is None and mode.lower() == 'on':
+        emit('output', {'data': '无限棋盘不支持连珠规则'})
+        return
+    
+    game.renju = mode.lower() == 'on'
+    broadcast(room, '规则: 连珠 (黑棋禁手)' if game.renju else '规则: 无禁手')
+
+
+def parse_size(text):
+    """@g 的参数：5-19 或 inf"""
+    if text.lower() in ('inf', '0'):
+        return None
+    size = int(text)
+    if not MIN_SIZE <= size <= MAX_SIZE:
+        raise ValueError(text)
+    return size
+
+
+@command('@g', args=(parse_size,), usage=f'用法: @g <{MIN_SIZE}-{MAX_SIZE}> | @g inf',
+         error=f'棋盘大小必须是 {MIN_SIZE}-{MAX_SIZE} 或 inf')
+def cmd_size(player_id, size):
+    room = room_of(player_id)
+    game = room.game
+    if player_id not in game.players:
+        emit('output', {'data': '请先加入游戏 (@j <名字>)'})
+        return
+    if game.game_started:
+        emit('output', {'data': '对局进行中，不能修改棋盘'})
+        return
+    if size is None and game.renju:
+        emit('output', {'data': '连珠规则不支持无限棋盘，请先 @f off'})
+        return
+    
+    game.size = size
+    game.board = game.new_board()
+    game.patterns = game.new_patterns()
+    broadcast(room, '棋盘: 无限' if size is None else f'棋盘: {size}x{size}')
+
+
+@command('@s')
+def cmd_start(player_id):
+    room = room_of(player_id)
+    game = room.game
+    if player_id not in game.players:
+        emit('output', {'data': '请先加入游戏 (@j <名字>)'})
+        return
+    
+    success, msg = game.start_game()
+    if success:
+        announce_start(room, msg)
+    else:
+        emit('output', {'data': msg})
+
+
+@command('@b', cost=2)
+def cmd_board(player_id):
+    game = room_of(player_id).game
+    if not game.game_started:
+        emit('output', {'data': '游戏还未开始'})
+        return
+    
+    if player_id in binary_clients:
+        emit('b', protocol.encode_board(game))
+        if game.clocks:
+            emit('b', protocol.encode_clock(game, time.monotonic() - game.turn_started))
+        return
+    
+    board = game.get_board_display()
+    emit('output', {'data': f'\n{board}'})
+    if game.player_list:
+        current_player = game.players[game.player_list[game.current_turn]]['name']
+        emit('output', {'data': f'当前回合: {current_player}'})
+    if game.clocks:
+        emit('output', {'data': game.get_clock_display()})
+
+
+@command('@p', args=(parse_coord, parse_coord), usage='用法: @p <行> <列> (例: @p 7 7)',
+         error=f'坐标必须是数字 (例: 7、A 或 -3)，绝对值不超过 {MAX_COORD}')
+def cmd_place(player_id, row, col):
+    room = room_of(player_id)
+    game = room.game
+    if player_id not in game.players:
+        emit('output', {'data': '请先加入游戏 (@j <名字>)'})
+        return
+    
+    success, msg, result = game.place_stone(player_id, row, col)
+    if success:
+        if result == 'timeout':
+            broadcast_game(room, [msg],
+                           [protocol.encode_result(protocol.RESULT_TIMEOUT, game.player_list.index(player_id))])
+            timer_wheel.cancel(room.flag_timer)
+            finish_rated_game(room, game.opponent_of(player_id))
             return
-        
         board = game.get_board_display()
-        emit('output', {'data': f'\n{board}'})
-        if game.player_list:
-            current_player = game.players[game.player_list[game.current_turn]]['name']
-            emit('output', {'data': f'当前回合: {current_player}'})
-    
-    elif command == '@p':
-        if player_id not in game.players:
-            emit('output', {'data': '请先加入游戏 (@j <名字>)'})
-            return
-        
-        if len(parts) < 3:
-            emit('output', {'data': '用法: @p <行> <列> (例: @p 7 7)'})
-            return
-        
-        try:
-            row = int(parts[1], 16) if len(parts[1]) == 1 else int(parts[1])
-            col = int(parts[2], 16) if len(parts[2]) == 1 else int(parts[2])
-        except ValueError:
-            emit('output', {'data': '坐标必须是数字 (0-14 或 0-E)'})
-            return
-        
-        success, msg, result = game.place_stone(player_id, row, col)
-        if success:
-            socketio.emit('output', {'data': msg})
-            board = game.get_board_display()
-            socketio.emit('output', {'data': f'\n{board}'})
-            if result == 'win':
-                game.game_started = False
+        symbol = game.players[player_id]['symbol']
+        broadcast_game(room, [msg, f'\n{board}'],
+                       [protocol.encode_move(row, col, symbol, game.current_turn, result == 'win')],
+                       seq=len(game.move_history), move=[row, col])
+        if result == 'win':
+            game.game_started = False
+            timer_wheel.cancel(room.flag_timer)
+            finish_rated_game(room, player_id)
         else:
-            emit('output', {'data': msg})
+            schedule_flag(room)
+    elif player_id in binary_clients:
+        emit('b', protocol.encode_error(result, error_arg(game, result, row, col)))
+    else:
+        emit('output', {'data': msg})
+
+
+def error_arg(game, code, row, col):
+    """落子错误包的参数：当前走棋方序号、最大坐标或禁手类型"""
+    if code == 'not_your_turn':
+        return game.current_turn
+    if code == 'out_of_range':
+        return game.size - 1
+    if code == 'forbidden':
+        return protocol.FORBIDDEN_KINDS.index(game.patterns.forbidden(row, col))
+    return 0
+
+
+@command('@hint', cost=3)
+def cmd_hint(player_id):
+    game = room_of(player_id).game
+    if not game.game_started:
+        emit('output', {'data': '游戏还未开始'})
+        return
     
-    elif command == '@m':
-        if not game.move_history:
-            emit('output', {'data': '还没有落子记录'})
-        else:
-            history = '\n'.join([f'{i+1}. ({r},{c}) {s}' for i, (r, c, s) in enumerate(game.move_history)])
-            emit('output', {'data': f'落子历史:\n{history}'})
+    if game.size is None:
+        emit('output', {'data': '无限棋盘暂不支持提示'})
+        return
     
-    elif command == '@c':
-        emit('clear')
+    attacker = game.current_turn
+    symbols = ('●', '○') if attacker == 0 else ('○', '●')
+    key = (game.patterns.hash, attacker, game.renju, game.size)
+    result = hint_cache.get(key)
+    if result is not None:
+        emit('output', {'data': format_hint(result, symbols)})
+        return
     
+    # 同一局面已经在算，等同一个结果
+    emit('output', {'data': '正在计算提示...'})
+    if key in hint_pending:
+        hint_pending[key].append(player_id)
+        return
+    hint_pending[key] = [player_id]
+    moves = [(r, c, 0 if s == '●' else 1) for r, c, s in game.move_history]
+    future = get_hint_pool().submit(solve_position, moves, attacker, game.size, game.renju,
+                                    HINT_MAX_NODES, HINT_TIME_LIMIT)
+    future.add_done_callback(lambda f: on_hint_done(key, symbols, f))
+
+
+@command('@m', cost=2)
+def cmd_history(player_id):
+    game = room_of(player_id).game
+    if not game.move_history:
+        emit('output', {'data': '还没有落子记录'})
     else:
-        emit('output', {'data': f'未知命令: {command}，输入 @h 查看帮助'})
+        history = '\n'.join([f'{i+1}. ({r},{c}) {s}' for i, (r, c, s) in enumerate(game.move_history)])
+        emit('output', {'data': f'落子历史:\n{history}'})
+
+
+@command('@c')
+def cmd_clear(player_id):
+    emit('clear')
 
 if __name__ == '__main__':
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,102 @@
+"""批量棋盘评估：一次处理 (N, 15, 15) 的 int8 棋盘数组
+
+0 为空，1 为黑（●），2 为白（○）。四个方向都用错位切片做滑动窗口，
+整批棋盘一起向量化计算，用于对局存档分析和训练评估函数。
+需要 numpy（pip install numpy），游戏服务器本身不依赖它。
+
+    from batch_eval import evaluate_boards, board_to_array
+    result = evaluate_boards(boards)
+    result['winner']        # (N,) 0 无人成五，1 黑，2 白，3 双方都有（非法局面）
+    result['five_mask']     # (N, 15, 15) 属于五连（含长连）的棋子
+    result['window_counts'] # (N, 2, 6) 每方只含己方棋子的五格窗口，按己方子数 0-5 计数
+    result['open_fours']    # (N, 2) 每方的活四 (空四连空) 个数
+"""
+import numpy as np
+
+EMPTY, BLACK, WHITE = 0, 1, 2
+SYMBOLS = {' ': EMPTY, '●': BLACK, '○': WHITE}
+
+
+def board_to_array(board):
+    """GomokuGame.board（字符二维列表）转成 int8 数组"""
+    return np.array([[SYMBOLS[cell] for cell in row] for row in board], dtype=np.int8)
+
+
+def _window_slices(height, width, length):
+    """四个方向上长度为 length 的窗口：每个方向给出窗口内第 i 格的切片列表"""
+    directions = []
+    # 横
+    directions.append([(slice(None), slice(i, width - length + 1 + i)) for i in range(length)])
+    # 竖
+    directions.append([(slice(i, height - length + 1 + i), slice(None)) for i in range(length)])
+    # 主对角线 (右下)
+    directions.append([(slice(i, height - length + 1 + i), slice(i, width - length + 1 + i))
+                       for i in range(length)])
+    # 副对角线 (左下)：窗口起点在右上
+    directions.append([(slice(i, height - length + 1 + i), slice(length - 1 - i, width - i))
+                       for i in range(length)])
+    return directions
+
+
+def _sum_windows(plane, slices):
+    total = plane[(slice(None),) + slices[0]].astype(np.uint8)
+    for s in slices[1:]:
+        total += plane[(slice(None),) + s]
+    return total
+
+
+def evaluate_boards(boards):
+    """boards: (N, H, W) int8，返回胜者、五连掩码和棋型计数"""
+    boards = np.asarray(boards, dtype=np.int8)
+    if boards.ndim == 2:
+        boards = boards[np.newaxis]
+    n, height, width = boards.shape
+    planes = [(boards == BLACK).view(np.uint8), (boards == WHITE).view(np.uint8)]
+
+    five_mask = np.zeros(boards.shape, dtype=bool)
+    has_five = np.zeros((n, 2), dtype=bool)
+    window_counts = np.zeros((n, 2, 6), dtype=np.int32)
+    open_fours = np.zeros((n, 2), dtype=np.int32)
+    empty = (boards == EMPTY).view(np.uint8)
+
+    for slices in _window_slices(height, width, 5):
+        sums = [_sum_windows(plane, slices) for plane in planes]
+        for player in (0, 1):
+            own, other = sums[player], sums[1 - player]
+            clean = other == 0
+            for k in range(5):
+                window_counts[:, player, k] += np.count_nonzero(clean & (own == k), axis=(1, 2))
+            starts = own == 5
+            fives = np.count_nonzero(starts, axis=(1, 2))
+            window_counts[:, player, 5] += fives
+            hit = np.flatnonzero(fives)
+            if hit.size:
+                has_five[hit, player] = True
+                # 只对有五连的棋盘把窗口起点展开回窗口里的 5 个格子
+                starts = starts[hit]
+                for s in slices:
+                    five_mask[(hit,) + s] |= starts
+
+    for slices in _window_slices(height, width, 6):
+        ends = empty[(slice(None),) + slices[0]] & empty[(slice(None),) + slices[5]]
+        for player in (0, 1):
+            middle = _sum_windows(planes[player], slices[1:5])
+            open_fours[:, player] += np.count_nonzero(ends.astype(bool) & (middle == 4), axis=(1, 2))
+
+    winner = has_five[:, 0] * BLACK + has_five[:, 1] * WHITE
+    return {
+        'winner': winner.astype(np.int8),
+        'five_mask': five_mask,
+        'window_counts': window_counts,
+        'open_fours': open_fours,
+    }
+
+
+def random_boards(n, rng=None, fill=0.3, size=15):
+    """随机棋盘（不保证是合法对局），用于测试和基准"""
+    rng = rng or np.random.default_rng()
+    cells = rng.random((n, size, size))
+    boards = np.zeros((n, size, size), dtype=np.int8)
+    boards[cells < fill] = BLACK
+    boards[cells < fill / 2] = WHITE
+    return boards
@@ -0,0 +1,690 @@
+"""性能基准测试（本地运行，使用 Flask-SocketIO 的测试客户端）
+
+用法:
+    python bench.py          # 运行全部基准
+    python bench.py flood    # 只运行指定基准
+"""
+import os
+import sys
+import time
+import random
+import tracemalloc
+import tempfile
+
+import app as server
+from timer_wheel import TimerWheel
+from patterns import PatternBoard
+from solver import solve_position, LRUCache
+from tournament import run_tournament
+from matchmaking import MatchQueue, RatingStore
+import protocol
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _client():
+    return server.socketio.test_client(server.app)
+
+
+def _send(client, command):
+    """发送一条命令，返回服务端处理耗时（秒）"""
+    started = time.perf_counter()
+    client.emit('command', {'command': command})
+    elapsed = time.perf_counter() - started
+    client.get_received()
+    return elapsed
+
+
+def _setup_game(moves=100):
+    """两名玩家开局并落若干子，让 @b/@m 的输出足够大"""
+    server.rooms.clear()
+    server.player_rooms.clear()
+    a, b = _client(), _client()
+    _send(a, '@j 甲')
+    _send(b, '@j 乙')
+    _send(a, '@s')
+    game = server.get_room(server.DEFAULT_ROOM).game
+    for i in range(moves):
+        symbol = '●' if i % 2 == 0 else '○'
+        game.move_history.append((i // 15, i % 15, symbol))
+    return a, b
+
+
+def _run_flood(flood_events, honest_every, limited):
+    if limited:
+        server.rate_limiter = server.RateLimiter(server.RATE_LIMIT_RATE, server.RATE_LIMIT_BURST)
+    else:
+        server.rate_limiter = server.RateLimiter(float('inf'), float('inf'))
+    server.command_stats.clear()
+    player, _ = _setup_game()
+    flooder = _client()
+
+    # 事件循环单线程处理：突发刷屏时，正常玩家的命令要排在之前的刷屏命令之后
+    honest_latency = []
+    flood_cost = []
+    waiting = 0.0
+    for i in range(flood_events):
+        elapsed = _send(flooder, '@m' if i % 2 else '@b')
+        flood_cost.append(elapsed)
+        waiting += elapsed
+        if (i + 1) % honest_every == 0:
+            honest_latency.append(waiting + _send(player, '@l'))
+            waiting = 0.0
+    server.rate_limiter = server.RateLimiter(server.RATE_LIMIT_RATE, server.RATE_LIMIT_BURST)
+    return honest_latency, flood_cost
+
+
+def bench_flood(flood_events=5000, honest_every=50):
+    """一个客户端狂刷 @b/@m 时，其他玩家命令的排队延迟"""
+    for limited in (False, True):
+        honest, flood = _run_flood(flood_events, honest_every, limited)
+        print(f"{'开启' if limited else '关闭'}限流: 刷屏 {flood_events} 条")
+        print(f"  刷屏命令平均处理 {sum(flood) / len(flood) * 1e6:.1f} us，总计 {sum(flood) * 1000:.1f} ms")
+        print(f"  正常玩家延迟 p50 {_percentile(honest, 50) * 1000:.2f} ms，"
+              f"p99 {_percentile(honest, 99) * 1000:.2f} ms")
+        stats = server.command_stats
+        print(f"  命令计数: @b {dict(stats['@b'])}，@m {dict(stats['@m'])}")
+
+
+def bench_timers(games=10000, seconds=600, move_interval=15.0):
+    """大量对局同时计时：每局一个超时定时器和一个空闲回收定时器，走棋时取消并重排"""
+    rng = random.Random(0)
+    wheel = TimerWheel(server.TIMER_TICK, now=0.0)
+    fired = [0]
+
+    def on_fire(game_id):
+        fired[0] += 1
+
+    flag_timers = [wheel.schedule(rng.uniform(30, 600), on_fire, i) for i in range(games)]
+    idle_timers = [wheel.schedule(server.ROOM_IDLE_TIMEOUT, on_fire, i) for i in range(games)]
+    next_move = [rng.expovariate(1 / move_interval) for _ in range(games)]
+
+    schedule_time = 0.0
+    advance_time = 0.0
+    ops = 0
+    ticks = int(seconds / server.TIMER_TICK)
+    clock = time.perf_counter
+    for tick in range(1, ticks + 1):
+        now = tick * server.TIMER_TICK
+        started = clock()
+        for game_id in range(tick % 10, games, 10):
+            if next_move[game_id] <= now:
+                # 一步棋：重排本局的超时和空闲定时器
+                wheel.cancel(flag_timers[game_id])
+                flag_timers[game_id] = wheel.schedule(rng.uniform(30, 600), on_fire, game_id)
+                wheel.cancel(idle_timers[game_id])
+                idle_timers[game_id] = wheel.schedule(server.ROOM_IDLE_TIMEOUT, on_fire, game_id)
+                next_move[game_id] = now + rng.expovariate(1 / move_interval)
+                ops += 4
+        schedule_time += clock() - started
+
+        started = clock()
+        wheel.advance(now)
+        advance_time += clock() - started
+
+    print(f"{games} 局，模拟 {seconds} 秒 ({ticks} 个 tick)，定时器 {wheel.count} 个在等待，触发 {fired[0]} 个")
+    print(f"  添加/取消 {ops} 次，平均 {schedule_time / ops * 1e9:.0f} ns/次")
+    print(f"  时间轮推进平均 {advance_time / ticks * 1e6:.1f} us/tick")
+    cpu = (schedule_time + advance_time) / seconds * 100
+    print(f"  计时总开销占单核 {cpu:.3f}%")
+
+
+def _random_games(count, seed=0):
+    """随机对局的落子序列，下到有人五连或棋盘下满为止"""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        cells = [(r, c) for r in range(15) for c in range(15)]
+        rng.shuffle(cells)
+        board = PatternBoard()
+        moves = []
+        for i, (r, c) in enumerate(cells):
+            moves.append((r, c))
+            if board.is_win(board.place(r, c, i % 2), i % 2):
+                break
+        games.append(moves)
+    return games
+
+
+# 连珠规则下黑棋补成长连的局面：(名字, 先落的黑子, 最后一手)，最后一手不能算胜
+OVERLINES = [
+    ("右端补成六连", [(7, c) for c in range(2, 7)], (7, 7)),
+    ("左端补成六连", [(7, c) for c in range(3, 8)], (7, 2)),
+    ("中间补成六连", [(7, 2), (7, 3), (7, 4), (7, 6), (7, 7)], (7, 5)),
+    ("中间补成七连", [(7, 1), (7, 2), (7, 3), (7, 5), (7, 6), (7, 7)], (7, 4)),
+    ("斜线右端补成六连", [(i, i) for i in range(5)], (5, 5)),
+    ("斜线左端补成六连", [(i, i) for i in range(1, 6)], (0, 0)),
+]
+
+
+def _run_lengths(stones, row, col, player):
+    """逐格数出 (row, col) 四个方向上 player 的连子数"""
+    lengths = []
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        count = 1
+        for sign in (1, -1):
+            r, c = row + dr * sign, col + dc * sign
+            while stones.get((r, c)) == player:
+                count += 1
+                r += dr * sign
+                c += dc * sign
+        lengths.append(count)
+    return lengths
+
+
+def _check_renju(records):
+    """连珠规则的胜负和长连禁手与逐格数子核对，返回不一致的次数"""
+    mismatches = 0
+    for name, black, last in OVERLINES:
+        board = PatternBoard(renju=True)
+        for r, c in black:
+            board.place(r, c, 0)
+        if board.forbidden(*last) != '长连' or board.is_win(board.place(*last, 0), 0):
+            print(f"  长连未识别: {name}")
+            mismatches += 1
+    for record in records:
+        board = PatternBoard(renju=True)
+        stones = {}
+        for i, (r, c) in enumerate(record):
+            player = i % 2
+            stones[(r, c)] = player
+            lengths = _run_lengths(stones, r, c, player)
+            expected = 5 in lengths if player == 0 else max(lengths) >= 5
+            if board.is_win(board.place(r, c, player), player) != expected:
+                mismatches += 1
+            if expected:
+                break
+    return mismatches
+
+
+def bench_patterns(games=500):
+    """查表棋型分类：每秒分类的棋型数，以及每步落子的增量更新和胜负判断耗时"""
+    records = _random_games(games)
+    moves = sum(len(m) for m in records)
+    clock = time.perf_counter
+
+    # 落子：增量更新棋型（含胜负判断）
+    started = clock()
+    for record in records:
+        board = PatternBoard()
+        for i, (r, c) in enumerate(record):
+            board.is_win(board.place(r, c, i % 2), i % 2)
+    place_time = clock() - started
+
+    # 对照：逐格走的 check_winner
+    game = server.GomokuGame(None)
+    started = clock()
+    for record in records:
+        game.board = [[' ' for _ in range(15)] for _ in range(15)]
+        for i, (r, c) in enumerate(record):
+            symbol = '●' if i % 2 == 0 else '○'
+            game.board[r][c] = symbol
+            game.check_winner(r, c, symbol)
+    walk_time = clock() - started
+
+    # 候选点评估：中盘局面上每个空点、双方各四个方向查表
+    boards = []
+    for record in records[:50]:
+        board = PatternBoard()
+        for i, (r, c) in enumerate(record[:len(record) // 2]):
+            board.place(r, c, i % 2)
+        boards.append(board)
+    lookups = 0
+    started = clock()
+    for board in boards:
+        for r in range(15):
+            for c in range(15):
+                if r * 15 + c not in board.stones:
+                    board.classify_point(r, c, 0)
+                    board.classify_point(r, c, 1)
+                    lookups += 8
+    point_time = clock() - started
+
+    print(f"{games} 局随机对局，共 {moves} 步")
+    print(f"  落子+增量棋型更新: {place_time / moves * 1e6:.1f} us/步")
+    print(f"  check_winner 逐格判断: {walk_time / moves * 1e6:.1f} us/步（只判五连）")
+    print(f"  候选点查表: {lookups / point_time / 1e6:.2f} M 棋型/秒 ({lookups} 次)")
+    print(f"  连珠规则核对（{len(OVERLINES)} 个长连局面 + {games} 局随机对局）: 不一致 {_check_renju(records)} 次")
+
+
+# (名字, 黑棋, 白棋, 预期结果)，均为黑棋走
+PUZZLES = [
+    ("活三成活四", [(7, 6), (7, 7), (7, 8)], [(0, 0), (0, 2), (14, 14)], 'VCF'),
+    ("四四", [(7, 7), (7, 8), (7, 9), (8, 10), (9, 10), (10, 10)],
+     [(7, 6), (11, 10), (0, 0), (0, 2), (0, 4), (14, 14)], 'VCF'),
+    ("四三", [(7, 7), (7, 8), (7, 9), (8, 10), (9, 10)], [(7, 6), (0, 0), (0, 2), (0, 4), (14, 14)], 'VCF'),
+    ("三三（白有冲四反击）", [(7, 7), (7, 8), (8, 6), (9, 6)], [(0, 0), (0, 2), (0, 4), (0, 14)], 'VCT'),
+    ("两个死三", [(7, 7), (7, 8), (7, 9), (8, 6), (9, 6), (10, 6)], [(7, 6), (7, 10), (6, 6), (11, 6)], 'VCT'),
+    ("开局无必胜", [(7, 7), (8, 8)], [(7, 8), (6, 6)], None),
+]
+
+
+def bench_hint(repeat=5):
+    """@hint 求解器：一组已知局面的求解耗时、节点数，以及缓存命中的耗时"""
+    cache = LRUCache()
+    clock = time.perf_counter
+    for name, black, white, expected in PUZZLES:
+        moves = [(r, c, 0) for r, c in black] + [(r, c, 1) for r, c in white]
+        times = []
+        for _ in range(repeat):
+            started = clock()
+            result = solve_position(moves, 0, max_nodes=200000, time_limit=None)
+            times.append(clock() - started)
+        status = 'OK' if result['kind'] == expected else f"预期 {expected}"
+        best = min(times)
+        print(f"{name}: {result['kind'] or '无'} {len(result['line'])} 手, {result['nodes']} 节点, "
+              f"{best * 1000:.1f} ms ({result['nodes'] / best / 1000:.0f} k节点/秒) {status}")
+        cache.put(name, result)
+
+    started = clock()
+    for _ in range(10000):
+        for name, _, _, _ in PUZZLES:
+            cache.get(name)
+    per_hit = (clock() - started) / (10000 * len(PUZZLES))
+    print(f"缓存命中: {per_hit * 1e6:.2f} us/次")
+
+
+def bench_selfplay(games=400):
+    """自对弈吞吐量：1 到 CPU 核数个进程的局/秒和加速比，同时测核心落子逻辑"""
+    cores = os.cpu_count() or 1
+    counts = sorted({1, cores} | {n for n in (2, 4, 8, 16, 32) if n < cores})
+    base = None
+    for workers in counts:
+        report = run_tournament(['greedy', 'random'], games, workers, seed=0, opening=2)
+        base = base or report['games_per_s']
+        print(f"{workers:>2} 进程: {report['games_per_s']:7.1f} 局/秒  {report['moves_per_s']:8.0f} 步/秒  "
+              f"加速比 {report['games_per_s'] / base:.2f}")
+
+
+def _check_winner_reference(board_array):
+    """逐格调用 check_winner 得到的胜者和五连掩码，用于核对批量结果"""
+    game = server.GomokuGame(None)
+    game.board = [[' ●○'[v] for v in row] for row in board_array.tolist()]
+    winner = 0
+    mask = [[False] * 15 for _ in range(15)]
+    for r in range(15):
+        for c in range(15):
+            symbol = game.board[r][c]
+            if symbol != ' ' and game.check_winner(r, c, symbol):
+                mask[r][c] = True
+                winner |= 1 if symbol == '●' else 2
+    return winner, mask
+
+
+def bench_batch(total=1000000, chunk=50000, verify=2000):
+    """批量 NumPy 评估：100 万个棋盘的吞吐量，并抽样与 check_winner 逐一核对"""
+    import numpy as np
+    from batch_eval import evaluate_boards, random_boards
+    rng = np.random.default_rng(0)
+
+    # 核对：不同密度的随机棋盘，胜者和五连掩码必须与 check_winner 完全一致
+    mismatches = 0
+    started = time.perf_counter()
+    for fill in (0.2, 0.4, 0.6):
+        boards = random_boards(verify, rng, fill)
+        result = evaluate_boards(boards)
+        for i, board in enumerate(boards):
+            winner, mask = _check_winner_reference(board)
+            if winner != result['winner'][i] or result['five_mask'][i].tolist() != mask:
+                mismatches += 1
+    reference_time = time.perf_counter() - started
+    print(f"核对 {verify * 3} 个棋盘: 不一致 {mismatches} 个 (逐格 check_winner {verify * 3 / reference_time:.0f} 盘/秒)")
+
+    boards = random_boards(chunk, rng, 0.4)
+    elapsed = 0.0
+    done = 0
+    winners = 0
+    while done < total:
+        batch = boards[:min(chunk, total - done)]
+        started = time.perf_counter()
+        result = evaluate_boards(batch)
+        elapsed += time.perf_counter() - started
+        winners += int(np.count_nonzero(result['winner']))
+        done += len(batch)
+    print(f"{done} 个棋盘 (每批 {chunk}): {elapsed:.2f} s，{done / elapsed / 1e6:.2f} M 盘/秒，有五连的 {winners} 个")
+
+
+def _play_moves(size, moves):
+    """按给定落子序列走完一局（有人成五也继续），返回每步耗时和棋局对象"""
+    game = server.GomokuGame(None, size=size)
+    game.players = {'a': {'name': 'a', 'symbol': ''}, 'b': {'name': 'b', 'symbol': ''}}
+    game.start_game()
+    started = time.perf_counter()
+    for row, col in moves:
+        game.place_stone(game.current_player_id(), row, col)
+    return (time.perf_counter() - started) / len(moves), game
+
+
+def bench_board_size(stones=200):
+    """每步落子耗时和内存随棋盘大小的变化，以及无限棋盘随棋子数的变化"""
+    rng = random.Random(0)
+    for size in (9, 15, 19, None):
+        if size is None:
+            cells = set()
+            while len(cells) < stones:
+                cells.add((rng.randint(-500, 500), rng.randint(-500, 500)))
+            moves = list(cells)
+        else:
+            moves = [(r, c) for r in range(size) for c in range(size)]
+            rng.shuffle(moves)
+            moves = moves[:stones]
+        tracemalloc.start()
+        per_move, game = _play_moves(size, moves)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        per_move, game = _play_moves(size, moves)  # 不开 tracemalloc 再测一次时间
+        started = time.perf_counter()
+        for row, col, symbol in game.move_history:
+            game.check_winner(row, col, symbol)
+        check = (time.perf_counter() - started) / len(moves)
+        label = '无限' if size is None else f'{size}x{size}'
+        print(f"{label:>6}: {len(moves):>5} 步，落子 {per_move * 1e6:6.1f} us/步，"
+              f"check_winner {check * 1e6:5.2f} us/次，内存 {memory / 1024:7.0f} KB")
+
+    # 无限棋盘：开销只随棋子数增长
+    for count in (1000, 10000, 100000):
+        cells = set()
+        while len(cells) < count:
+            cells.add((rng.randint(-10 ** 6, 10 ** 6), rng.randint(-10 ** 6, 10 ** 6)))
+        moves = list(cells)
+        tracemalloc.start()
+        traced = _play_moves(None, moves)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del traced
+        per_move, game = _play_moves(None, moves)
+        started = time.perf_counter()
+        game.get_board_display()
+        render = time.perf_counter() - started
+        print(f"  无限棋盘 {count:>6} 子: 落子 {per_move * 1e6:5.1f} us/步，内存 {memory / count:5.0f} B/子，"
+              f"窗口显示 {render * 1000:.1f} ms")
+
+
+def _simulate_queue(queue, players, arrival_rate, sweep_interval, rng):
+    clock = time.perf_counter
+    add_times = []
+    sweep_times = []
+    waits = []
+    diffs = []
+    peak = 0
+    now = 0.0
+    next_sweep = sweep_interval
+
+    def record(first, second):
+        waits.append(now - first.joined)
+        diffs.append(abs(first.rating - second.rating))
+
+    def sweep(at):
+        started = clock()
+        for first, second in queue.sweep(at):
+            record(first, second)
+        sweep_times.append(clock() - started)
+
+    for i in range(players):
+        now += rng.expovariate(arrival_rate)
+        while next_sweep <= now:
+            sweep(next_sweep)
+            next_sweep += sweep_interval
+        rating = min(3000, max(0, rng.gauss(1500, 300)))
+        started = clock()
+        pair = queue.add(i, f'p{i}', rating, now)
+        add_times.append(clock() - started)
+        if pair:
+            record(*pair)
+        peak = max(peak, len(queue))
+    # 放完人后继续按间隔重配，直到窗口放到最宽
+    for _ in range(60):
+        now = next_sweep
+        sweep(now)
+        next_sweep += sweep_interval
+
+    print(f"  队列峰值 {peak} 人，配成 {len(waits)} 对，剩余 {len(queue)} 人")
+    print(f"  入队+找对手: 平均 {sum(add_times) / len(add_times) * 1e6:.1f} us，p99 {_percentile(add_times, 99) * 1e6:.1f} us")
+    print(f"  定期重配: 平均 {sum(sweep_times) / len(sweep_times) * 1000:.2f} ms，"
+          f"最长 {max(sweep_times) * 1000:.2f} ms")
+    print(f"  等待时间 p50 {_percentile(waits, 50):.2f} s，p99 {_percentile(waits, 99):.2f} s；"
+          f"分差 p50 {_percentile(diffs, 50):.0f}，p99 {_percentile(diffs, 99):.0f}")
+
+
+def bench_matchmaking(players=10000, arrival_rate=2000.0, sweep_interval=1.0):
+    """10k 名玩家高速涌入匹配队列：入队延迟、定期重配耗时、等待时间和分差；以及等级分库的读写"""
+    rng = random.Random(0)
+    print(f"{players} 人，平均每秒到达 {arrival_rate:.0f} 人，默认窗口:")
+    _simulate_queue(MatchQueue(), players, arrival_rate, sweep_interval, rng)
+    # 窄窗口让大量玩家滞留在队列里，考验按桶索引的查找
+    print(f"{players} 人，平均每秒到达 {arrival_rate * 10:.0f} 人，初始分差窗口 2，每秒放宽 2:")
+    _simulate_queue(MatchQueue(base_window=2, widen_rate=2), players, arrival_rate * 10, sweep_interval, rng)
+
+    clock = time.perf_counter
+    with tempfile.TemporaryDirectory() as directory:
+        store = RatingStore(f'{directory}/ratings.db')
+        games = 10000
+        started = clock()
+        for _ in range(games):
+            a, b = rng.sample(range(players), 2)
+            store.record(f'p{a}', f'p{b}')
+        record_time = clock() - started
+        started = clock()
+        for _ in range(100):
+            store.leaderboard(10)
+        board_time = (clock() - started) / 100
+        started = clock()
+        for i in range(1000):
+            store.get(f'p{i}')
+        get_time = (clock() - started) / 1000
+        store.close()
+    print(f"等级分库: 记录结果 {record_time / games * 1e6:.0f} us/局，查分 {get_time * 1e6:.0f} us，"
+          f"前 10 名 {board_time * 1000:.2f} ms")
+
+
+def _wire_size(event, data):
+    """Socket.IO 帧的字节数：文本帧，二进制事件另加附件"""
+    from socketio.packet import Packet, EVENT
+    encoded = Packet(EVENT, data=[event, data]).encode()
+    if isinstance(encoded, list):
+        return sum(len(part) if isinstance(part, bytes) else len(part.encode()) for part in encoded)
+    return len(encoded.encode())
+
+
+def _received_size(client):
+    """客户端收到的事件：(负载字节数, 帧字节数)"""
+    payload = wire = 0
+    for event in client.get_received():
+        args = event['args'][0] if isinstance(event['args'], list) else event['args']
+        if event['name'] == 'b':
+            payload += len(args)
+        else:
+            payload += protocol.json_size(args)
+        wire += _wire_size(event['name'], args)
+    return payload, wire
+
+
+def _protocol_games(size, games, rng):
+    """两名 JSON 玩家随机下完若干局，一个 JSON 观战者和一个二进制观战者统计收到的字节"""
+    server.rooms.clear()
+    server.player_rooms.clear()
+    a, b, text, binary = _client(), _client(), _client(), _client()
+    binary.emit('hello', {'binary': 1})
+    _send(a, '@j 甲')
+    _send(b, '@j 乙')
+    _send(a, f'@g {size}')
+    text.get_received()
+    binary.get_received()
+    totals = {'text': [0, 0], 'binary': [0, 0]}
+    moves = 0
+    span = 15 if size == 'inf' else int(size)
+    for _ in range(games):
+        _send(a, '@s')
+        game = server.get_room(server.DEFAULT_ROOM).game
+        while game.game_started:
+            player = (a, b)[game.current_turn]
+            row, col = rng.randrange(span), rng.randrange(span)
+            if game.size is None:
+                occupied = game.board.get(row, col) != ' '
+            else:
+                occupied = game.board[row][col] != ' '
+            if occupied:
+                continue
+            _send(player, f'@p {row} {col}')
+            moves += 1
+        for name, client in (('text', text), ('binary', binary)):
+            payload, wire = _received_size(client)
+            totals[name][0] += payload
+            totals[name][1] += wire
+    for client in (a, b, text, binary):
+        client.disconnect()
+    return totals, moves
+
+
+def bench_protocol(games=20, iterations=20000):
+    """JSON 文本与二进制协议：每步的编码耗时、负载和 Socket.IO 帧字节数"""
+    server.rate_limiter = server.RateLimiter(float('inf'), float('inf'))
+    rng = random.Random(0)
+    clock = time.perf_counter
+    from socketio.packet import Packet, EVENT
+
+    # 编码：中盘 15 路棋盘上一步棋要发出的内容
+    game = server.GomokuGame(None)
+    game.players = {'black': {'name': '甲', 'symbol': ''}, 'white': {'name': '乙', 'symbol': ''}}
+    game.start_game()
+    for row, col in _random_games(1)[0][:60]:
+        game.place_stone(game.current_player_id(), row, col)
+    row, col, symbol = game.move_history[-1]
+    started = clock()
+    for _ in range(iterations):
+        Packet(EVENT, data=['output', {'data': '落子成功！轮到 乙'}]).encode()
+        Packet(EVENT, data=['output', {'data': f'\n{game.get_board_display()}'}]).encode()
+    text_time = (clock() - started) / iterations
+    started = clock()
+    for _ in range(iterations):
+        Packet(EVENT, data=['b', protocol.encode_move(row, col, symbol, game.current_turn)]).encode()
+    binary_time = (clock() - started) / iterations
+    started = clock()
+    for _ in range(iterations):
+        packet = protocol.encode_board(game)
+    board_time = (clock() - started) / iterations
+    started = clock()
+    for _ in range(iterations):
+        protocol.decode(packet)
+    decode_time = (clock() - started) / iterations
+    print(f"每步编码 (含 Socket.IO 帧): JSON 文本 {text_time * 1e6:.1f} us，二进制 {binary_time * 1e6:.1f} us")
+    print(f"整盘棋盘包: 编码 {board_time * 1e6:.1f} us，解码 {decode_time * 1e6:.1f} us，{len(packet)} 字节")
+
+    # 每步字节数：实际对局中观战者收到的全部对局事件（开局、落子、胜负）
+    for size in ('15', '19', 'inf'):
+        totals, moves = _protocol_games(size, games, rng)
+        text_payload, text_wire = totals['text']
+        binary_payload, binary_wire = totals['binary']
+        label = '无限棋盘' if size == 'inf' else f'{size} 路'
+        print(f"{label} {games} 局 {moves} 步: 每步负载 JSON {text_payload / moves:.0f} B / 二进制 "
+              f"{binary_payload / moves:.1f} B，每步帧 JSON {text_wire / moves:.0f} B / 二进制 "
+              f"{binary_wire / moves:.1f} B (节省 {1 - binary_wire / text_wire:.1%})")
+    server.rate_limiter = server.RateLimiter(server.RATE_LIMIT_RATE, server.RATE_LIMIT_BURST)
+
+def _args(event):
+    return event['args'][0] if isinstance(event['args'], list) else event['args']
+
+
+def bench_reconnect(clients=2000, moves=30, missed=4):
+    """服务器闪断后 clients 个玩家同时重连：凭令牌找回座位，只补发确认序号之后的落子"""
+    server.rate_limiter = server.RateLimiter(float('inf'), float('inf'))
+    server.rooms.clear()
+    server.player_rooms.clear()
+    server.sessions.clear()
+    server.session_of.clear()
+    rng = random.Random(0)
+    clock = time.perf_counter
+
+    # 准备: clients / 2 个房间各下 moves 步，记下每个玩家的令牌和收到的对局编号/序号
+    players = []
+    for i in range(clients // 2):
+        pair = [_client(), _client()]
+        for j, client in enumerate(pair):
+            client.emit('command', {'command': f'@j p{i}-{j} r{i}'})
+        pair[0].emit('command', {'command': '@s'})
+        game = server.rooms[f'r{i}'].game
+        while game.game_started and len(game.move_history) < moves:
+            row, col = rng.randrange(15), rng.randrange(15)
+            if game.board[row][col] == ' ':
+                pair[game.current_turn].emit('command', {'command': f'@p {row} {col}'})
+        for client in pair:
+            state = {'game': 0, 'seq': 0}
+            for event in client.get_received():
+                data = _args(event)
+                if event['name'] == 'session':
+                    state['token'] = data['token']
+                elif event['name'] == 'output' and 'game' in data:
+                    state['game'] = data['game']
+                elif event['name'] == 'output' and 'seq' in data:
+                    state['seq'] = data['seq']
+            # 模拟闪断前最后几步没收到
+            state['seq'] = max(0, state['seq'] - rng.randint(0, missed))
+            players.append((client, state))
+
+    started = clock()
+    for client, _ in players:
+        client.disconnect()
+    disconnect_time = clock() - started
+
+    latencies = []
+    resync_bytes = []
+    full_bytes = []
+    resumed = 0
+    started = clock()
+    for _, state in players:
+        client = _client()
+        begin = clock()
+        client.emit('hello', {'token': state['token'], 'game': state['game'], 'seq': state['seq']})
+        latencies.append(clock() - begin)
+        for event in client.get_received():
+            if event['name'] == 'resync':
+                resumed += 1
+                data = _args(event)
+                resync_bytes.append(protocol.json_size(data))
+                # 对照：整盘棋盘文本 + 当前回合
+                game = server.rooms[data['room']].game
+                full_bytes.append(protocol.json_size({'data': f'\n{game.get_board_display()}'}) +
+                                  protocol.json_size({'data': f'当前回合: {data["names"][data["current"]]}'}))
+    storm_time = clock() - started
+
+    waiting = sum(len(room.grace_timers) for room in server.rooms.values())
+    print(f"{clients} 个玩家 ({clients // 2} 局，每局约 {moves} 步) 断开耗时 {disconnect_time * 1000:.0f} ms")
+    print(f"  同时重连: 恢复 {resumed}/{clients}，总耗时 {storm_time * 1000:.0f} ms (含建立连接)，"
+          f"{clients / storm_time:.0f} 个/秒，仍在等待重连的座位 {waiting}")
+    print(f"  恢复会话处理 p50 {_percentile(latencies, 50) * 1e6:.0f} us，p99 {_percentile(latencies, 99) * 1e6:.0f} us")
+    print(f"  快照平均 {sum(resync_bytes) / len(resync_bytes):.0f} B (补发最多 {missed} 步)，"
+          f"整盘棋盘文本 {sum(full_bytes) / len(full_bytes):.0f} B")
+    server.rate_limiter = server.RateLimiter(server.RATE_LIMIT_RATE, server.RATE_LIMIT_BURST)
+
+BENCHMARKS = {
+    "flood": bench_flood,
+    "timers": bench_timers,
+    "patterns": bench_patterns,
+    "hint": bench_hint,
+    "selfplay": bench_selfplay,
+    "batch": bench_batch,
+    "board_size": bench_board_size,
+    "matchmaking": bench_matchmaking,
+    "protocol": bench_protocol,
+    "reconnect": bench_reconnect,
+}
+
+
+def main(argv=None):
+    names = (argv if argv is not None else sys.argv[1:]) or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"未知基准: {name}，可选: {', '.join(BENCHMARKS)}")
+            return 1
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""通过 GomokuGame 下棋的引擎
+
+引擎只需要实现 choose_move(game) -> (行, 列)，可以读取 game.board、game.patterns 等，
+但不能修改局面，落子由裁判调用 place_stone 完成。
+game.size 为 None 时是无限棋盘：game.board 是 SparseBoard，没有 game.patterns，
+只有 RandomEngine 能在上面下棋。
+
+自定义引擎可以写在任意模块里，用 'module:Class' 的形式交给 tournament.py。
+"""
+import random
+import importlib
+
+from patterns import PATTERN_SCORES
+from solver import solve_position
+
+
+def candidate_moves(game, radius=2):
+    """已有棋子周围 radius 格内的空点；空棋盘返回天元，无限棋盘的空棋盘返回原点"""
+    size = game.size
+    if not game.move_history:
+        return [(0, 0)] if size is None else [(size // 2, size // 2)]
+    cells = set()
+    for row, col, _ in game.move_history:
+        if size is None:
+            rows = range(row - radius, row + radius + 1)
+            cols = range(col - radius, col + radius + 1)
+        else:
+            rows = range(max(0, row - radius), min(size, row + radius + 1))
+            cols = range(max(0, col - radius), min(size, col + radius + 1))
+        for r in rows:
+            for c in cols:
+                stone = game.board.get(r, c) if size is None else game.board[r][c]
+                if stone == ' ':
+                    cells.add((r, c))
+    return sorted(cells)
+
+
+def legal_moves(game, moves):
+    """去掉连珠规则下黑棋的禁手"""
+    if game.current_turn != 0 or not game.renju:
+        return moves
+    return [(r, c) for r, c in moves if not game.patterns.forbidden(r, c)]
+
+
+class RandomEngine:
+    """在已有棋子附近随机落子"""
+    name = 'random'
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+
+    def choose_move(self, game):
+        return self.rng.choice(legal_moves(game, candidate_moves(game, 1)))
+
+
+class GreedyEngine:
+    """一步棋型估值：自己落下后的棋型分 + 挡住对方的棋型分"""
+    name = 'greedy'
+    defence = 0.9
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+
+    def score(self, game, row, col):
+        me = game.current_turn
+        patterns = game.patterns
+        attack = sum(PATTERN_SCORES[p] for p in patterns.classify_point(row, col, me))
+        block = sum(PATTERN_SCORES[p] for p in patterns.classify_point(row, col, 1 - me))
+        return attack + self.defence * block
+
+    def choose_move(self, game):
+        if game.size is None:
+            raise ValueError(f"{self.name} 引擎依赖棋型表，不支持无限棋盘")
+        best = None
+        best_score = -1.0
+        for row, col in legal_moves(game, candidate_moves(game)):
+            # 随机扰动只用于打破平局
+            score = self.score(game, row, col) + self.rng.random()
+            if score > best_score:
+                best, best_score = (row, col), score
+        return best
+
+
+class ThreatEngine(GreedyEngine):
+    """先用 VCF/VCT 求解器找必胜，找不到再按棋型估值"""
+    name = 'threat'
+    max_nodes = 500
+
+    def choose_move(self, game):
+        if game.size is None:
+            raise ValueError(f"{self.name} 引擎依赖棋型表，不支持无限棋盘")
+        moves = [(r, c, 0 if s == '●' else 1) for r, c, s in game.move_history]
+        result = solve_position(moves, game.current_turn, game.size, game.renju,
+                                max_nodes=self.max_nodes, time_limit=None)
+        if result['kind']:
+            return result['line'][0]
+        return super().choose_move(game)
+
+
+ENGINES = {
+    'random': RandomEngine,
+    'greedy': GreedyEngine,
+    'threat': ThreatEngine,
+}
+
+
+def load_engine(spec):
+    """按名字或 'module:Class' 取得引擎类"""
+    if spec in ENGINES:
+        return ENGINES[spec]
+    module_name, _, class_name = spec.partition(':')
+    if not class_name:
+        raise ValueError(f"未知引擎: {spec}，可选: {', '.join(ENGINES)} 或 module:Class")
+    return getattr(importlib.import_module(module_name), class_name)
@@ -0,0 +1,168 @@
+"""匹配队列和等级分
+
+MatchQueue 按等级分分桶，非空桶号保存在有序列表里，找对手时二分定位到可接受
+范围内的桶，只看这些桶里等得最久的人。可接受的分差随等待时间放宽。
+
+RatingStore 用 SQLite 保存每个名字的 Elo 等级分和战绩，按分数建索引以便查排行榜。
+"""
+import time
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+
+DEFAULT_RATING = 1500.0
+K_FACTOR = 32
+
+
+class QueueEntry:
+    __slots__ = ('key', 'name', 'rating', 'joined', 'bucket')
+
+    def __init__(self, key, name, rating, joined, bucket):
+        self.key = key
+        self.name = name
+        self.rating = rating
+        self.joined = joined
+        self.bucket = bucket
+
+
+class MatchQueue:
+    """bucket_size: 每个桶覆盖的分数段；分差窗口从 base_window 开始，每秒放宽 widen_rate，最多 max_window"""
+    def __init__(self, bucket_size=50, base_window=100, widen_rate=20, max_window=800):
+        self.bucket_size = bucket_size
+        self.base_window = base_window
+        self.widen_rate = widen_rate
+        self.max_window = max_window
+        self.entries = {}     # key -> QueueEntry
+        self.buckets = {}     # 桶号 -> {key: QueueEntry}，按入队先后排列
+        self.bucket_ids = []  # 非空桶号，有序
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def window(self, entry, now):
+        return min(self.max_window, self.base_window + self.widen_rate * (now - entry.joined))
+
+    def _bucket(self, rating):
+        return int(rating // self.bucket_size)
+
+    def add(self, key, name, rating, now=None):
+        """入队并立即尝试配对，配上返回 (先来的, 后来的)，否则返回 None"""
+        now = time.monotonic() if now is None else now
+        entry = QueueEntry(key, name, rating, now, self._bucket(rating))
+        opponent = self._find(entry, now)
+        if opponent is not None:
+            self._remove(opponent)
+            return opponent, entry
+        self.entries[key] = entry
+        bucket = self.buckets.get(entry.bucket)
+        if bucket is None:
+            bucket = self.buckets[entry.bucket] = {}
+            insort(self.bucket_ids, entry.bucket)
+        bucket[key] = entry
+        return None
+
+    def remove(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self._remove(entry)
+        return entry
+
+    def _remove(self, entry):
+        del self.entries[entry.key]
+        bucket = self.buckets[entry.bucket]
+        del bucket[entry.key]
+        if not bucket:
+            del self.buckets[entry.bucket]
+            del self.bucket_ids[bisect_left(self.bucket_ids, entry.bucket)]
+
+    def _find(self, entry, now):
+        """在 entry 的分差窗口内找分数最接近的对手（每个桶只看等得最久的合适人选）"""
+        window = self.window(entry, now)
+        low = self._bucket(entry.rating - window)
+        high = self._bucket(entry.rating + window)
+        best = None
+        best_diff = None
+        i = bisect_left(self.bucket_ids, low)
+        while i < len(self.bucket_ids) and self.bucket_ids[i] <= high:
+            for other in self.buckets[self.bucket_ids[i]].values():
+                if other.key == entry.key:
+                    continue
+                diff = abs(other.rating - entry.rating)
+                if diff <= window:
+                    if best is None or diff < best_diff:
+                        best, best_diff = other, diff
+                    break
+            i += 1
+        return best
+
+    def sweep(self, now=None):
+        """按等待时间从久到短重新配对（窗口已经放宽），返回配上的 [(a, b)]"""
+        now = time.monotonic() if now is None else now
+        pairs = []
+        for entry in list(self.entries.values()):
+            if entry.key not in self.entries:
+                continue
+            opponent = self._find(entry, now)
+            if opponent is not None:
+                self._remove(entry)
+                self._remove(opponent)
+                pairs.append((entry, opponent))
+        return pairs
+
+
+def expected_score(rating, opponent):
+    return 1 / (1 + 10 ** ((opponent - rating) / 400))
+
+
+class RatingStore:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS ratings (
+                    name TEXT PRIMARY KEY,
+                    rating REAL NOT NULL,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    losses INTEGER NOT NULL DEFAULT 0,
+                    draws INTEGER NOT NULL DEFAULT 0,
+                    updated REAL NOT NULL
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS ratings_by_rating ON ratings (rating DESC)")
+
+    def get(self, name):
+        with self.lock:
+            row = self.conn.execute("SELECT rating FROM ratings WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else DEFAULT_RATING
+
+    def record(self, winner, loser, draw=False):
+        """记一局结果并更新双方等级分，返回 (胜方新分, 负方新分)"""
+        with self.lock, self.conn:
+            ratings = {}
+            for name in (winner, loser):
+                row = self.conn.execute("SELECT rating FROM ratings WHERE name = ?", (name,)).fetchone()
+                ratings[name] = row[0] if row else DEFAULT_RATING
+            score = 0.5 if draw else 1.0
+            delta = K_FACTOR * (score - expected_score(ratings[winner], ratings[loser]))
+            now = time.time()
+            for name, change, column in ((winner, delta, 'draws' if draw else 'wins'),
+                                         (loser, -delta, 'draws' if draw else 'losses')):
+                self.conn.execute(
+                    f"INSERT INTO ratings (name, rating, {column}, updated) VALUES (?, ?, 1, ?) "
+                    f"ON CONFLICT(name) DO UPDATE SET rating = excluded.rating, "
+                    f"{column} = {column} + 1, updated = excluded.updated",
+                    (name, ratings[name] + change, now))
+            return ratings[winner] + delta, ratings[loser] - delta
+
+    def leaderboard(self, limit=10):
+        """[(名字, 等级分, 胜, 负, 和)]，按等级分从高到低"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT name, rating, wins, losses, draws FROM ratings ORDER BY rating DESC LIMIT ?",
+                (limit,)).fetchall()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,277 @@
+"""五子棋棋型查表：以落点为中心的 9 格窗口 -> 棋型
+
+每条线用两个位掩码保存黑白棋子（棋盘外按对方棋子处理），取出某点两侧各 4 格只要移位，
+自己的 9 位和对方的 9 位拼成 18 位下标，查一次预先算好的表就得到该方向的棋型。
+落子时只需重新分类这一点四个方向上 ±4 格内的棋子，棋型计数随之增量更新。
+
+棋型只看 9 格窗口，是常用的近似：窗口外的棋子不影响判断。唯一的例外是连珠规则下黑棋的五连：
+六连的另一端可能恰好在窗口外 5 格处，查表得到五连时再从线上掩码数一次实际连子数，确认不是长连。
+"""
+import random
+
+NONE, TWO, OPEN_TWO, THREE, OPEN_THREE, FOUR, OPEN_FOUR, FIVE, OVERLINE = range(9)
+PATTERN_NAMES = ['无', '眠二', '活二', '眠三', '活三', '冲四', '活四', '五连', '长连']
+
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+WINDOW = 9
+CENTER = 4
+WINDOW_MASK = (1 << WINDOW) - 1
+
+# 估值权重，按棋型下标
+PATTERN_SCORES = [0, 10, 100, 100, 1000, 1000, 10000, 100000, 100000]
+
+
+def _run_through_center(own):
+    """包含中心的连续己方棋子数"""
+    length = 1
+    i = CENTER + 1
+    while i < WINDOW and own >> i & 1:
+        length += 1
+        i += 1
+    i = CENTER - 1
+    while i >= 0 and own >> i & 1:
+        length += 1
+        i -= 1
+    return length
+
+
+def _build_table(exact_five):
+    """exact_five=True 时恰好五连才算五（连珠规则的黑棋），六连及以上为长连"""
+    table = bytearray(1 << (2 * WINDOW))
+    memo = {}
+
+    def classify(own, opp):
+        key = own | opp << WINDOW
+        if key in memo:
+            return memo[key]
+        run = _run_through_center(own)
+        if run >= 5:
+            result = OVERLINE if exact_five and run > 5 else FIVE
+        else:
+            # 在窗口内每个空位试落一子，看能变成什么棋型
+            fives = 0
+            best = NONE
+            empty = ~(own | opp) & WINDOW_MASK
+            for i in range(WINDOW):
+                if not empty >> i & 1:
+                    continue
+                after = classify(own | 1 << i, opp)
+                if after == FIVE:
+                    fives += 1
+                elif after in (OPEN_FOUR, FOUR, OPEN_THREE, THREE) and after > best:
+                    best = after
+            if fives >= 2:
+                result = OPEN_FOUR
+            elif fives == 1:
+                result = FOUR
+            elif best == OPEN_FOUR:
+                result = OPEN_THREE
+            elif best == FOUR:
+                result = THREE
+            elif best == OPEN_THREE:
+                result = OPEN_TWO
+            elif best == THREE:
+                result = TWO
+            else:
+                result = NONE
+        memo[key] = result
+        return result
+
+    # 枚举中心以外 8 格的三态组合（空/己方/对方），中心固定为己方
+    for code in range(3 ** (WINDOW - 1)):
+        own = 1 << CENTER
+        opp = 0
+        for i in range(WINDOW):
+            if i == CENTER:
+                continue
+            code, cell = divmod(code, 3)
+            if cell == 1:
+                own |= 1 << i
+            elif cell == 2:
+                opp |= 1 << i
+        table[own | opp << WINDOW] = classify(own, opp)
+    return table
+
+
+FREESTYLE_TABLE = _build_table(False)
+EXACT_TABLE = _build_table(True)
+
+
+class PatternBoard:
+    """按线保存位掩码的棋盘，维护每个棋子四个方向的棋型及双方棋型计数
+
+    player 为 0（黑/先手）或 1（白/后手）。renju=True 时黑棋只有恰好五连算胜，
+    并可用 forbidden() 检查三三、四四、长连禁手。
+    counts[player][棋型] 按“棋子×方向”计数，例如一个活三的三颗子各计一次。
+    """
+    def __init__(self, size=15, renju=False):
+        self.size = size
+        self.renju = renju
+        self.tables = [EXACT_TABLE if renju else FREESTYLE_TABLE, FREESTYLE_TABLE]
+        # Zobrist 哈希：同一局面不论落子顺序都得到同一个 hash
+        rng = random.Random(size)
+        self.zobrist = [[rng.getrandbits(64) for _ in range(size * size)] for _ in range(2)]
+        self.cell_lines = []  # 格子 -> 四个方向上的 (线号, 线上位置)
+        self.line_cells = []  # 线号 -> 线上各位置的格子
+        self.border = []      # 线号 -> 棋盘外的位（两端各留 4 位）
+        index = {}
+        for r in range(size):
+            for c in range(size):
+                entry = []
+                for d, (dr, dc) in enumerate(DIRECTIONS):
+                    # 沿反方向走到线的起点，起点决定是哪条线
+                    sr, sc = r, c
+                    while 0 <= sr - dr < size and 0 <= sc - dc < size:
+                        sr -= dr
+                        sc -= dc
+                    key = (d, sr, sc)
+                    if key not in index:
+                        index[key] = len(self.line_cells)
+                        cells = []
+                        lr, lc = sr, sc
+                        while 0 <= lr < size and 0 <= lc < size:
+                            cells.append(lr * size + lc)
+                            lr += dr
+                            lc += dc
+                        self.line_cells.append(cells)
+                        full = (1 << (len(cells) + 2 * CENTER)) - 1
+                        self.border.append(full ^ (((1 << len(cells)) - 1) << CENTER))
+                    entry.append((index[key], max(abs(r - sr), abs(c - sc))))
+                self.cell_lines.append(entry)
+        self.reset()
+
+    def reset(self):
+        lines = len(self.line_cells)
+        self.masks = [[0] * lines, [0] * lines]
+        self.stones = {}                # 格子 -> player
+        self.patterns = {}              # 格子 -> 四个方向的棋型
+        self.counts = [[0] * len(PATTERN_NAMES), [0] * len(PATTERN_NAMES)]
+        self.hash = 0
+
+    def _lookup(self, line, pos, player):
+        """线上 pos 处（视为 player 的棋子）的棋型"""
+        own = (self.masks[player][line] >> pos) & WINDOW_MASK
+        opp = ((self.masks[1 - player][line] | self.border[line]) >> pos) & WINDOW_MASK
+        pattern = self.tables[player][own | 1 << CENTER | opp << WINDOW]
+        if pattern == FIVE and self.renju and player == 0 and self._run_length(line, pos) > 5:
+            return OVERLINE
+        return pattern
+
+    def _run_length(self, line, pos):
+        """线上 pos 处（视为黑棋）所在的黑棋连子数，不受窗口大小限制"""
+        own = self.masks[0][line] | 1 << (pos + CENTER)
+        length = 1
+        i = pos + CENTER + 1
+        while own >> i & 1:
+            length += 1
+            i += 1
+        i = pos + CENTER - 1
+        while i >= 0 and own >> i & 1:
+            length += 1
+            i -= 1
+        return length
+
+    def _refresh_line(self, d, line, pos):
+        """重新分类线上 pos 两侧 4 格内所有棋子在方向 d 的棋型
+
+        连珠规则下多看 1 格：五连一端再连一子成长连时，另一端的棋子在 5 格之外。
+        """
+        reach = CENTER + 1 if self.renju else CENTER
+        low_bit = pos + CENTER - reach
+        occupied = self.masks[0][line] | self.masks[1][line]
+        occupied = occupied >> low_bit if low_bit >= 0 else occupied << -low_bit
+        occupied &= (1 << (2 * reach + 1)) - 1
+        cells = self.line_cells[line]
+        while occupied:
+            low = occupied & -occupied
+            occupied ^= low
+            q = low_bit + low.bit_length() - 1 - CENTER
+            cell = cells[q]
+            player = self.stones[cell]
+            old = self.patterns[cell][d]
+            new = self._lookup(line, q, player)
+            if old != new:
+                self.patterns[cell][d] = new
+                counts = self.counts[player]
+                counts[old] -= 1
+                counts[new] += 1
+
+    def place(self, row, col, player):
+        """落子并增量更新棋型，返回新棋子四个方向的棋型"""
+        cell = row * self.size + col
+        self.stones[cell] = player
+        self.hash ^= self.zobrist[player][cell]
+        self.patterns[cell] = [NONE] * 4
+        self.counts[player][NONE] += 4
+        for line, pos in self.cell_lines[cell]:
+            self.masks[player][line] |= 1 << (pos + CENTER)
+        for d, (line, pos) in enumerate(self.cell_lines[cell]):
+            self._refresh_line(d, line, pos)
+        return self.patterns[cell]
+
+    def remove(self, row, col):
+        """撤销一手，供搜索回退使用"""
+        cell = row * self.size + col
+        player = self.stones.pop(cell)
+        self.hash ^= self.zobrist[player][cell]
+        counts = self.counts[player]
+        for pattern in self.patterns.pop(cell):
+            counts[pattern] -= 1
+        for line, pos in self.cell_lines[cell]:
+            self.masks[player][line] &= ~(1 << (pos + CENTER))
+        for d, (line, pos) in enumerate(self.cell_lines[cell]):
+            self._refresh_line(d, line, pos)
+
+    def classify_point(self, row, col, player):
+        """假设 player 在空点 (row, col) 落子，四个方向的棋型；不修改棋盘"""
+        cell = row * self.size + col
+        return [self._lookup(line, pos, player) for line, pos in self.cell_lines[cell]]
+
+    def threat_points(self, player, sources, targets):
+        """player 落在哪些空点能让某个方向的棋型变成 targets 之一
+
+        只检查该方向棋型属于 sources 的己方棋子两侧 4 格，例如
+        threat_points(p, (FOUR, OPEN_FOUR), (FIVE,)) 就是 p 的成五点。
+        """
+        points = set()
+        for cell, patterns in self.patterns.items():
+            if self.stones[cell] != player:
+                continue
+            for d, pattern in enumerate(patterns):
+                if pattern not in sources:
+                    continue
+                line, pos = self.cell_lines[cell][d]
+                cells = self.line_cells[line]
+                for q in range(max(0, pos - CENTER), min(len(cells), pos + CENTER + 1)):
+                    target = cells[q]
+                    if target not in self.stones and target not in points \
+                            and self._lookup(line, q, player) in targets:
+                        points.add(target)
+        return points
+
+    def is_win(self, patterns, player):
+        return FIVE in patterns or (OVERLINE in patterns and not (self.renju and player == 0))
+
+    def forbidden(self, row, col):
+        """连珠规则下黑棋在此落子是否禁手，返回 '长连'/'四四'/'三三' 或 None
+
+        五连优先于禁手；三三只按窗口内的活三判断，不再递归检查活三能否成为真活四。
+        """
+        if not self.renju:
+            return None
+        patterns = self.classify_point(row, col, 0)
+        if FIVE in patterns:
+            return None
+        if OVERLINE in patterns:
+            return '长连'
+        if sum(1 for p in patterns if p in (FOUR, OPEN_FOUR)) >= 2:
+            return '四四'
+        if patterns.count(OPEN_THREE) >= 2:
+            return '三三'
+        return None
+
+    def evaluate(self, player):
+        """按棋型计数的局面估值，正数对 player 有利"""
+        mine = sum(n * s for n, s in zip(self.counts[player], PATTERN_SCORES))
+        theirs = sum(n * s for n, s in zip(self.counts[1 - player], PATTERN_SCORES))
+        return mine - theirs
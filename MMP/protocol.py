@@ -0,0 +1,194 @@
+"""二进制对局协议（可选，客户端连上后发送 hello {'binary': 1} 开启）
+
+每个包第一个字节是操作码，后面是紧凑的负载，通过 Socket.IO 的 'b' 事件以二进制附件发送。
+坐标和时间用 zigzag 变长整数，小数值只占 1 字节；文字提示由客户端按消息码本地生成。
+未开启的客户端仍然收到原来的 JSON 文本。
+
+    START  op, flags(bit0=补发状态，不播报), size(0=无限), n, [名字长度, 名字UTF-8] * n, 对局编号
+    MOVE   op, row, col, flags(bit0-1=棋子 1黑2白, bit2=获胜), 下一手玩家序号
+    BOARD  op, size, 当前玩家序号(255=未开局), 有边界: 每格 2 位打包; 无限: 子数, [row, col, 棋子] * 子数
+    CLOCK  op, n, [模式(0不计时 1加秒 2读秒), 剩余(0.1秒), 加秒/读秒(秒), 读秒次数(变长整数)] * n
+    RESULT op, 原因(1超时 2断线), 输家序号
+    ERROR  op, 错误码, 参数
+"""
+PROTOCOL_VERSION = 3
+
+OP_START = 0x01
+OP_MOVE = 0x02
+OP_BOARD = 0x03
+OP_CLOCK = 0x04
+OP_RESULT = 0x05
+OP_ERROR = 0x06
+
+STONES = {' ': 0, '●': 1, '○': 2}
+STONE_SYMBOLS = ' ●○'
+
+RESULT_TIMEOUT = 1
+RESULT_ABANDON = 2
+
+# place_stone 失败时返回的结果码 -> 协议错误码
+ERROR_CODES = {
+    'not_started': 1,
+    'not_your_turn': 2,
+    'out_of_range': 3,
+    'occupied': 4,
+    'forbidden': 5,
+}
+FORBIDDEN_KINDS = ['长连', '四四', '三三']
+CLOCK_MODES = {'fischer': 1, 'byoyomi': 2}
+NO_PLAYER = 255
+
+
+def write_varint(out, value):
+    """zigzag + LEB128，负数也能紧凑表示"""
+    value = (value << 1) ^ (value >> 63)
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    return (result >> 1) ^ -(result & 1), pos
+
+
+def encode_start(game, resync=False):
+    out = bytearray((OP_START, 1 if resync else 0, game.size or 0, len(game.player_list)))
+    for pid in game.player_list:
+        name = game.players[pid]['name'].encode('utf-8')[:255]
+        out.append(len(name))
+        out += name
+    write_varint(out, game.game_id)
+    return bytes(out)
+
+
+def encode_move(row, col, symbol, next_index, win=False):
+    out = bytearray((OP_MOVE,))
+    write_varint(out, row)
+    write_varint(out, col)
+    out.append(STONES[symbol] | (4 if win else 0))
+    out.append(next_index)
+    return bytes(out)
+
+
+def encode_board(game):
+    current = game.current_turn if game.game_started else NO_PLAYER
+    if game.size is None:
+        out = bytearray((OP_BOARD, 0, current))
+        write_varint(out, len(game.board.stones))
+        for (row, col), symbol in game.board.stones.items():
+            write_varint(out, row)
+            write_varint(out, col)
+            out.append(STONES[symbol])
+        return bytes(out)
+    out = bytearray((OP_BOARD, game.size, current))
+    # 每格 2 位，4 格一个字节
+    byte = 0
+    shift = 0
+    for row in game.board:
+        for cell in row:
+            byte |= STONES[cell] << shift
+            shift += 2
+            if shift == 8:
+                out.append(byte)
+                byte = 0
+                shift = 0
+    if shift:
+        out.append(byte)
+    return bytes(out)
+
+
+def encode_clock(game, elapsed=0.0):
+    """elapsed 为当前走棋方本步已用时间"""
+    out = bytearray((OP_CLOCK, len(game.player_list)))
+    current = game.current_player_id()
+    for pid in game.player_list:
+        clock = game.clocks.get(pid)
+        if clock is None:
+            out += b'\x00\x00\x00\x00'
+            continue
+        remaining = clock.remaining - (elapsed if pid == current else 0.0)
+        out.append(CLOCK_MODES[clock.mode])
+        write_varint(out, int(remaining * 10))
+        write_varint(out, int(clock.extra))
+        write_varint(out, clock.periods)
+    return bytes(out)
+
+
+def encode_result(reason, loser_index):
+    return bytes((OP_RESULT, reason, loser_index))
+
+
+def encode_error(code, arg=0):
+    out = bytearray((OP_ERROR, ERROR_CODES[code]))
+    write_varint(out, arg)
+    return bytes(out)
+
+
+def decode(packet):
+    """解码成字典，供测试和基准核对"""
+    op = packet[0]
+    if op == OP_START:
+        resync, size, count = packet[1], packet[2], packet[3]
+        pos = 4
+        names = []
+        for _ in range(count):
+            length = packet[pos]
+            names.append(packet[pos + 1:pos + 1 + length].decode('utf-8'))
+            pos += 1 + length
+        game_id, _ = read_varint(packet, pos)
+        return {'op': 'start', 'resync': bool(resync), 'size': size or None, 'names': names, 'game': game_id}
+    if op == OP_MOVE:
+        row, pos = read_varint(packet, 1)
+        col, pos = read_varint(packet, pos)
+        flags, next_index = packet[pos], packet[pos + 1]
+        return {'op': 'move', 'row': row, 'col': col, 'symbol': STONE_SYMBOLS[flags & 3],
+                'win': bool(flags & 4), 'next': next_index}
+    if op == OP_BOARD:
+        size, current = packet[1], packet[2]
+        stones = {}
+        if size:
+            for i in range(size * size):
+                stone = (packet[3 + i // 4] >> (2 * (i % 4))) & 3
+                if stone:
+                    stones[divmod(i, size)] = STONE_SYMBOLS[stone]
+        else:
+            count, pos = read_varint(packet, 3)
+            for _ in range(count):
+                row, pos = read_varint(packet, pos)
+                col, pos = read_varint(packet, pos)
+                stones[row, col] = STONE_SYMBOLS[packet[pos]]
+                pos += 1
+        return {'op': 'board', 'size': size or None, 'current': None if current == NO_PLAYER else current,
+                'stones': stones}
+    if op == OP_CLOCK:
+        clocks = []
+        pos = 2
+        for _ in range(packet[1]):
+            mode = packet[pos]
+            remaining, pos = read_varint(packet, pos + 1)
+            extra, pos = read_varint(packet, pos)
+            periods, pos = read_varint(packet, pos)
+            clocks.append({'mode': mode, 'remaining': remaining / 10, 'extra': extra, 'periods': periods})
+        return {'op': 'clock', 'clocks': clocks}
+    if op == OP_RESULT:
+        return {'op': 'result', 'reason': packet[1], 'loser': packet[2]}
+    if op == OP_ERROR:
+        arg, _ = read_varint(packet, 2)
+        return {'op': 'error', 'code': packet[1], 'arg': arg}
+    raise ValueError(f'未知操作码: {op}')
+
+
+def json_size(data):
+    """JSON 文本事件的负载字节数（与 Socket.IO 实际发送的文本一致）"""
+    import json
+    return len(json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
@@ -0,0 +1,215 @@
+"""威胁空间搜索：连续冲四胜 (VCF) 和连续威胁胜 (VCT)
+
+进攻方每步都必须是威胁（VCF 只用冲四/活四，VCT 还可以走活三），防守方只考虑
+挡住威胁的点和自己的冲四反击，搜索空间因此很小。成五点、冲四点都由 patterns
+的查表棋型直接给出。
+
+solve_position() 可以在子进程里运行（参数和返回值都是普通数据）。
+"""
+import time
+import threading
+from collections import OrderedDict
+
+from patterns import PatternBoard, TWO, OPEN_TWO, THREE, OPEN_THREE, FOUR, OPEN_FOUR, FIVE
+
+FIVE_SOURCES = (FOUR, OPEN_FOUR)
+FOUR_SOURCES = (THREE, OPEN_THREE)
+FOUR_TARGETS = (FOUR, OPEN_FOUR)
+THREE_SOURCES = (TWO, OPEN_TWO)
+THREE_TARGETS = (OPEN_THREE,)
+
+MAX_DEPTH = {'VCF': 15, 'VCT': 7}  # 进攻方最多走几步威胁
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class ThreatSearch:
+    def __init__(self, board, attacker, max_nodes=20000, deadline=None):
+        self.board = board
+        self.attacker = attacker
+        self.defender = 1 - attacker
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        self.nodes = 0
+        self.failed = {}  # (hash, 模式) -> 已证明搜不到胜法的最大深度
+
+    def _count(self):
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise BudgetExceeded()
+        if self.deadline and self.nodes % 256 == 0 and time.monotonic() > self.deadline:
+            raise BudgetExceeded()
+
+    def _cell(self, cell):
+        return divmod(cell, self.board.size)
+
+    def _play(self, cell, player):
+        self.board.place(*self._cell(cell), player)
+
+    def _undo(self, cell):
+        self.board.remove(*self._cell(cell))
+
+    def _five_points(self, player):
+        counts = self.board.counts[player]
+        if not counts[FOUR] and not counts[OPEN_FOUR]:
+            return set()
+        return self.board.threat_points(player, FIVE_SOURCES, (FIVE,))
+
+    def _legal(self, cell, player):
+        return not (player == 0 and self.board.forbidden(*self._cell(cell)))
+
+    def _threats(self, mode):
+        """进攻方的威胁着法：冲四在前，VCT 再加上活三"""
+        board = self.board
+        fours = board.threat_points(self.attacker, FOUR_SOURCES, FOUR_TARGETS)
+        moves = sorted(fours)
+        if mode == 'VCT':
+            threes = board.threat_points(self.attacker, THREE_SOURCES, THREE_TARGETS) - fours
+            moves += sorted(threes)
+        return [cell for cell in moves if self._legal(cell, self.attacker)]
+
+    def attack(self, mode, depth):
+        """进攻方走，返回胜法（格子序列，攻守交替）或 None"""
+        self._count()
+        fives = self._five_points(self.attacker)
+        if fives:
+            return [min(fives)]
+        key = (self.board.hash, mode)
+        if self.failed.get(key, -1) >= depth:
+            return None
+
+        result = None
+        blocks = self._five_points(self.defender)
+        if len(blocks) > 1:
+            moves = []
+        elif blocks:
+            # 防守方有冲四，只能先挡；挡的这手自己也必须是威胁
+            cell = blocks.pop()
+            moves = [cell] if cell in self._threats(mode) else []
+        elif depth > 0:
+            moves = self._threats(mode)
+        else:
+            moves = []
+
+        for cell in moves:
+            self._play(cell, self.attacker)
+            try:
+                line = self.defend(mode, depth - 1)
+            finally:
+                self._undo(cell)
+            if line is not None:
+                result = [cell] + line
+                break
+
+        if result is None:
+            self.failed[key] = depth
+        return result
+
+    def defend(self, mode, depth):
+        """进攻方刚走出威胁，防守方所有应对都输才返回胜法"""
+        self._count()
+        if self._five_points(self.defender):
+            return None
+        fives = self._five_points(self.attacker)
+        if len(fives) > 1:
+            # 活四或双四：防守方挡一个，进攻方在另一个成五
+            return sorted(fives)[:2]
+        if fives:
+            cell = fives.pop()
+            if not self._legal(cell, self.defender):
+                # 唯一的防点是黑棋禁手，挡不住
+                return []
+            defences = [cell]
+        else:
+            # 活三：挡住会变成四的点，或者用自己的冲四反击
+            defences = self.board.threat_points(self.attacker, (OPEN_THREE,), FOUR_TARGETS + (FIVE,))
+            defences |= self.board.threat_points(self.defender, FOUR_SOURCES, FOUR_TARGETS)
+            defences = [c for c in sorted(defences) if self._legal(c, self.defender)]
+            if not defences:
+                return None
+
+        main_line = None
+        for cell in defences:
+            self._play(cell, self.defender)
+            try:
+                line = self._after_defence(mode, depth, bool(fives))
+            finally:
+                self._undo(cell)
+            if line is None:
+                return None
+            if main_line is None:
+                main_line = [cell] + line
+        return main_line
+
+    def _after_defence(self, mode, depth, blocked_four):
+        """防守方应对活三时走了冲四：进攻方先挡，原来的活三还在，轮到防守方继续应对"""
+        if blocked_four:
+            return self.attack(mode, depth)
+        counter = self._five_points(self.defender)
+        if not counter:
+            return self.attack(mode, depth)
+        if len(counter) > 1:
+            return None
+        cell = counter.pop()
+        if not self._legal(cell, self.attacker):
+            return None
+        self._play(cell, self.attacker)
+        try:
+            line = self.defend(mode, depth)
+        finally:
+            self._undo(cell)
+        return None if line is None else [cell] + line
+
+
+def solve_position(moves, attacker, size=15, renju=False, max_nodes=20000, time_limit=2.0):
+    """在 moves 局面下为 attacker 找 VCF/VCT 胜法
+
+    moves: [(行, 列, player)]，player 0 为黑。
+    返回 {'kind': 'VCF'/'VCT'/None, 'line': [(行, 列), ...], 'nodes': 节点数, 'complete': 是否搜完}
+    complete=False 表示预算用完，结论不确定。
+    """
+    board = PatternBoard(size, renju=renju)
+    for row, col, player in moves:
+        board.place(row, col, player)
+    deadline = time.monotonic() + time_limit if time_limit else None
+    search = ThreatSearch(board, attacker, max_nodes, deadline)
+    complete = True
+    try:
+        for mode in ('VCF', 'VCT'):
+            # 逐步加深，先找到的就是最短的胜法
+            for depth in range(1, MAX_DEPTH[mode] + 1):
+                line = search.attack(mode, depth)
+                if line is not None:
+                    return {'kind': mode, 'line': [divmod(c, size) for c in line],
+                            'nodes': search.nodes, 'complete': True}
+    except BudgetExceeded:
+        complete = False
+    return {'kind': None, 'line': [], 'nodes': search.nodes, 'complete': complete}
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存"""
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
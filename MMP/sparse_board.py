@@ -0,0 +1,81 @@
+"""无限棋盘：只保存已落的棋子
+
+棋子存在以 (行, 列) 为键的字典里，内存和判胜开销只和棋子数有关，和棋盘面积无关。
+坐标可以是任意整数（包括负数），显示时只画出落子区域附近的窗口。
+"""
+
+DIRECTIONS = [(0, 1), (1, 0), (1, 1), (1, -1)]
+VIEW_SIZE = 15  # 显示窗口最大边长
+MARGIN = 2      # 窗口在棋子外围多留的格数
+
+
+class SparseBoard:
+    def __init__(self):
+        self.stones = {}  # (行, 列) -> 棋子符号
+        self.last = None
+        self.bounds = None  # [最小行, 最大行, 最小列, 最大列]，落子时增量维护
+
+    def __len__(self):
+        return len(self.stones)
+
+    def get(self, row, col):
+        return self.stones.get((row, col), ' ')
+
+    def place(self, row, col, symbol):
+        self.stones[row, col] = symbol
+        self.last = (row, col)
+        if self.bounds is None:
+            self.bounds = [row, row, col, col]
+        else:
+            bounds = self.bounds
+            if row < bounds[0]:
+                bounds[0] = row
+            elif row > bounds[1]:
+                bounds[1] = row
+            if col < bounds[2]:
+                bounds[2] = col
+            elif col > bounds[3]:
+                bounds[3] = col
+
+    def check_five(self, row, col, symbol):
+        """(row, col) 所在的四条线上是否有连续 5 个 symbol，只访问相连的棋子"""
+        stones = self.stones
+        for dr, dc in DIRECTIONS:
+            count = 1
+            for direction in (1, -1):
+                r, c = row + dr * direction, col + dc * direction
+                while stones.get((r, c)) == symbol:
+                    count += 1
+                    r += dr * direction
+                    c += dc * direction
+            if count >= 5:
+                return True
+        return False
+
+    def view(self):
+        """要显示的窗口 (top, left, height, width)：棋子外围加 MARGIN，
+        太大时以最后一手为中心截取 VIEW_SIZE x VIEW_SIZE"""
+        if not self.stones:
+            half = VIEW_SIZE // 2
+            return -half, -half, VIEW_SIZE, VIEW_SIZE
+        min_row, max_row, min_col, max_col = self.bounds
+        top, bottom = min_row - MARGIN, max_row + MARGIN
+        left, right = min_col - MARGIN, max_col + MARGIN
+        if bottom - top + 1 > VIEW_SIZE:
+            top = self.last[0] - VIEW_SIZE // 2
+            bottom = top + VIEW_SIZE - 1
+        if right - left + 1 > VIEW_SIZE:
+            left = self.last[1] - VIEW_SIZE // 2
+            right = left + VIEW_SIZE - 1
+        return top, left, bottom - top + 1, right - left + 1
+
+    def render(self):
+        top, left, height, width = self.view()
+        label = max(len(str(top)), len(str(top + height - 1)))
+        cell = max(len(str(left)), len(str(left + width - 1)))
+        lines = [' ' * (label + 2) + ' '.join(f'{c:>{cell}}' for c in range(left, left + width))]
+        for r in range(top, top + height):
+            row = ' '.join(f'{self.get(r, c):>{cell}}' for c in range(left, left + width))
+            lines.append(f'{r:>{label}}  {row}')
+        lines.append(f'(显示 行 {top}~{top + height - 1}，列 {left}~{left + width - 1}，共 {len(self.stones)} 子)')
+        return '\n'.join(lines)
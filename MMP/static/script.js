@@ -1,5 +1,38 @@
 const socket = io();
 
+// 二进制协议：地址带 ?bin=1 或 localStorage['mmp-binary'] = '1' 时开启，对局事件以紧凑的二进制包接收
+const BINARY = new URLSearchParams(location.search).get('bin') === '1'
+    || localStorage.getItem('mmp-binary') === '1';
+const COORD_DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ';
+const STONE_SYMBOLS = [' ', '●', '○'];
+const FORBIDDEN_KINDS = ['长连', '四四', '三三'];
+const VIEW_SIZE = 15;
+const MARGIN = 2;
+
+// 消息码 -> 文字，与服务端的 JSON 文本保持一致
+const MESSAGES = {
+    start: (a, b) => `游戏开始！${a}(●) vs ${b}(○)`,
+    first: (name) => `\n${name} 先手！`,
+    placed: (name) => `落子成功！轮到 ${name}`,
+    win: (name) => `恭喜 ${name} 获胜！`,
+    turn: (name) => `当前回合: ${name}`,
+    resumed: (room, missed) => `已恢复会话 (房间 ${room})` + (missed ? `，补上断线期间的 ${missed} 步` : ''),
+    result: {
+        1: (loser, winner) => `${loser} 超时，${winner} 获胜！`,
+        2: (loser, winner) => `${loser} 断线未归，${winner} 获胜！`,
+    },
+    error: {
+        1: () => '游戏还未开始',
+        2: (arg) => `现在是 ${game.names[arg]} 的回合`,
+        3: (arg) => `坐标超出范围 (0-${arg})`,
+        4: () => '该位置已有棋子',
+        5: (arg) => `黑棋禁手（${FORBIDDEN_KINDS[arg]}），请换个位置`,
+    },
+};
+
+// 本地棋盘状态；id 为对局编号，seq 为已收到的落子数，重连时服务端只补发 seq 之后的步
+const game = { id: null, seq: 0, size: 15, names: [], stones: new Map(), last: null, bounds: null };
+
 const terminalOutput = document.getElementById('output');
 const terminalInput = document.getElementById('terminal-input');
 
@@ -7,6 +40,45 @@ terminalInput.focus();
 
 socket.on('connect', () => {
     addOutput('已连接到服务器');
+    // 有会话令牌时同时恢复会话（回到原座位）；令牌按标签页保存，刷新后仍在，其他标签页看不到
+    const token = sessionStorage.getItem('mmp-token');
+    if (BINARY || token) {
+        socket.emit('hello', { binary: BINARY ? 1 : 0, token: token, game: game.id, seq: game.seq });
+    }
+});
+
+socket.on('session', (data) => {
+    if (data.token) {
+        sessionStorage.setItem('mmp-token', data.token);
+    } else {
+        sessionStorage.removeItem('mmp-token');
+    }
+});
+
+socket.on('resync', (data) => {
+    if (data.from === 0) {
+        resetBoard(data.size);
+    }
+    game.id = data.game;
+    game.names = data.names;
+    for (let i = 0; i < data.moves.length; i += 2) {
+        placeStone(data.moves[i], data.moves[i + 1], (data.from + i / 2) % 2 === 0 ? 1 : 2);
+    }
+    game.seq = data.seq;
+    addOutput(MESSAGES.resumed(data.room, data.from ? data.seq - data.from : 0));
+    if (data.game) {
+        addOutput(`\n${renderBoard()}`);
+    }
+    if (data.started) {
+        addOutput(MESSAGES.turn(game.names[data.current]));
+    }
+    if (data.clock) {
+        addOutput(data.clock);
+    }
+});
+
+socket.on('b', (data) => {
+    handlePacket(new Uint8Array(data));
 });
 
 socket.on('message', (data) => {
@@ -14,6 +86,15 @@ socket.on('message', (data) => {
 });
 
 socket.on('output', (data) => {
+    // 对局事件带有对局编号/落子序号，同步到本地棋盘
+    if (data.game !== undefined) {
+        resetBoard(data.size);
+        game.id = data.game;
+    }
+    if (data.move) {
+        placeStone(data.move[0], data.move[1], data.seq % 2 ? 1 : 2);
+        game.seq = data.seq;
+    }
     addOutput(data.data);
 });
 
@@ -40,6 +121,197 @@ function addOutput(text, type = 'output') {
     terminalOutput.scrollTop = terminalOutput.scrollHeight;
 }
 
+function readVarint(bytes, pos) {
+    // zigzag + LEB128
+    let value = 0;
+    let scale = 1;
+    let byte;
+    do {
+        byte = bytes[pos++];
+        value += (byte & 0x7f) * scale;
+        scale *= 128;
+    } while (byte & 0x80);
+    return [value % 2 ? -(value + 1) / 2 : value / 2, pos];
+}
+
+function resetBoard(size) {
+    game.size = size;
+    game.seq = 0;
+    game.stones = new Map();
+    game.last = null;
+    game.bounds = null;
+}
+
+function placeStone(row, col, stone) {
+    game.stones.set(`${row},${col}`, stone);
+    game.last = [row, col];
+    const b = game.bounds;
+    game.bounds = b
+        ? [Math.min(b[0], row), Math.max(b[1], row), Math.min(b[2], col), Math.max(b[3], col)]
+        : [row, row, col, col];
+}
+
+function cellAt(row, col) {
+    return STONE_SYMBOLS[game.stones.get(`${row},${col}`) || 0];
+}
+
+function renderBoard() {
+    if (game.size) {
+        const lines = ['   ' + COORD_DIGITS.slice(0, game.size).split('').join(' ')];
+        for (let r = 0; r < game.size; r++) {
+            const cells = [];
+            for (let c = 0; c < game.size; c++) {
+                cells.push(cellAt(r, c));
+            }
+            lines.push(`${COORD_DIGITS[r]}  ` + cells.join(' '));
+        }
+        return lines.join('\n');
+    }
+    // 无限棋盘：与服务端 SparseBoard.render 相同的显示窗口
+    let top, left, height, width;
+    if (!game.bounds) {
+        top = left = -Math.floor(VIEW_SIZE / 2);
+        height = width = VIEW_SIZE;
+    } else {
+        let [minRow, maxRow, minCol, maxCol] = game.bounds;
+        top = minRow - MARGIN;
+        let bottom = maxRow + MARGIN;
+        left = minCol - MARGIN;
+        let right = maxCol + MARGIN;
+        if (bottom - top + 1 > VIEW_SIZE) {
+            top = game.last[0] - Math.floor(VIEW_SIZE / 2);
+            bottom = top + VIEW_SIZE - 1;
+        }
+        if (right - left + 1 > VIEW_SIZE) {
+            left = game.last[1] - Math.floor(VIEW_SIZE / 2);
+            right = left + VIEW_SIZE - 1;
+        }
+        height = bottom - top + 1;
+        width = right - left + 1;
+    }
+    const label = Math.max(String(top).length, String(top + height - 1).length);
+    const cell = Math.max(String(left).length, String(left + width - 1).length);
+    const header = [];
+    for (let c = left; c < left + width; c++) {
+        header.push(String(c).padStart(cell));
+    }
+    const lines = [' '.repeat(label + 2) + header.join(' ')];
+    for (let r = top; r < top + height; r++) {
+        const cells = [];
+        for (let c = left; c < left + width; c++) {
+            cells.push(cellAt(r, c).padStart(cell));
+        }
+        lines.push(`${String(r).padStart(label)}  ${cells.join(' ')}`);
+    }
+    lines.push(`(显示 行 ${top}~${top + height - 1}，列 ${left}~${left + width - 1}，共 ${game.stones.size} 子)`);
+    return lines.join('\n');
+}
+
+function clockText(mode, remaining, extra, periods) {
+    if (mode === 2 && remaining <= 0) {
+        const overflow = -remaining;
+        const left = Math.max(0, periods - Math.floor(overflow / extra));
+        return `读秒 ${left}次 本次剩${Math.floor(extra - overflow % extra)}s`;
+    }
+    const total = Math.floor(Math.max(0, remaining));
+    const pad = (n) => String(n).padStart(2, '0');
+    return `${pad(Math.floor(total / 60))}:${pad(total % 60)}`;
+}
+
+function handlePacket(bytes) {
+    let pos;
+    switch (bytes[0]) {
+        case 0x01: { // START
+            const resync = bytes[1] & 1;
+            resetBoard(bytes[2]);
+            game.names = [];
+            const decoder = new TextDecoder();
+            pos = 4;
+            for (let i = 0; i < bytes[3]; i++) {
+                game.names.push(decoder.decode(bytes.subarray(pos + 1, pos + 1 + bytes[pos])));
+                pos += 1 + bytes[pos];
+            }
+            [game.id] = readVarint(bytes, pos);
+            if (!resync) {
+                addOutput(MESSAGES.start(game.names[0], game.names[1]));
+                addOutput(`\n${renderBoard()}`);
+                addOutput(MESSAGES.first(game.names[0]));
+            }
+            break;
+        }
+        case 0x02: { // MOVE
+            let row, col;
+            [row, pos] = readVarint(bytes, 1);
+            [col, pos] = readVarint(bytes, pos);
+            const flags = bytes[pos];
+            const stone = flags & 3;
+            placeStone(row, col, stone);
+            game.seq += 1;
+            if (flags & 4) {
+                addOutput(MESSAGES.win(game.names[stone - 1]));
+            } else {
+                addOutput(MESSAGES.placed(game.names[bytes[pos + 1]]));
+            }
+            addOutput(`\n${renderBoard()}`);
+            break;
+        }
+        case 0x03: { // BOARD
+            resetBoard(bytes[1]);
+            const current = bytes[2];
+            if (game.size) {
+                for (let i = 0; i < game.size * game.size; i++) {
+                    const stone = (bytes[3 + (i >> 2)] >> ((i & 3) * 2)) & 3;
+                    if (stone) {
+                        placeStone(Math.floor(i / game.size), i % game.size, stone);
+                    }
+                }
+            } else {
+                let count, row, col;
+                [count, pos] = readVarint(bytes, 3);
+                for (let i = 0; i < count; i++) {
+                    [row, pos] = readVarint(bytes, pos);
+                    [col, pos] = readVarint(bytes, pos);
+                    placeStone(row, col, bytes[pos++]);
+                }
+            }
+            game.seq = game.stones.size;
+            addOutput(`\n${renderBoard()}`);
+            if (current !== 255) {
+                addOutput(MESSAGES.turn(game.names[current]));
+            }
+            break;
+        }
+        case 0x04: { // CLOCK
+            const parts = [];
+            let remaining, extra, periods;
+            pos = 2;
+            for (let i = 0; i < bytes[1]; i++) {
+                const mode = bytes[pos];
+                [remaining, pos] = readVarint(bytes, pos + 1);
+                [extra, pos] = readVarint(bytes, pos);
+                [periods, pos] = readVarint(bytes, pos);
+                if (mode) {
+                    parts.push(`${game.names[i]}(${STONE_SYMBOLS[i + 1]}) ${clockText(mode, remaining / 10, extra, periods)}`);
+                }
+            }
+            if (parts.length) {
+                addOutput('计时: ' + parts.join(' | '));
+            }
+            break;
+        }
+        case 0x05: { // RESULT
+            const loser = bytes[2];
+            addOutput(MESSAGES.result[bytes[1]](game.names[loser], game.names[1 - loser]));
+            break;
+        }
+        case 0x06: { // ERROR
+            const [arg] = readVarint(bytes, 2);
+            addOutput(MESSAGES.error[bytes[1]](arg));
+            break;
+        }
+    }
+}
+
 document.addEventListener('click', (e) => {
     if (e.target.closest('.terminal')) {
         terminalInput.focus();
@@ -0,0 +1,103 @@
+"""分层时间轮：O(1) 添加/取消定时器，所有房间的计时共用一个 tick 任务
+
+第 0 层每格 tick 秒，第 L 层每格 tick * slots^L 秒。定时器先放进能容纳其剩余
+时间的最低一层，低层转完一圈时把上一层对应格子里的定时器重新分配到低层。
+"""
+import threading
+
+
+class Timer:
+    __slots__ = ('expires', 'callback', 'args', 'slot', 'cancelled')
+
+    def __init__(self, expires, callback, args):
+        self.expires = expires  # 到期的 tick 序号
+        self.callback = callback
+        self.args = args
+        self.slot = None
+        self.cancelled = False
+
+
+class TimerWheel:
+    def __init__(self, tick=0.1, slot_bits=6, levels=4, now=0.0):
+        self.tick = tick
+        self.slot_bits = slot_bits
+        self.slots = 1 << slot_bits
+        self.mask = self.slots - 1
+        self.levels = levels
+        # 每个格子用 dict 存放定时器，删除为 O(1) 且保持插入顺序
+        self.wheels = [[{} for _ in range(self.slots)] for _ in range(levels)]
+        self.current = int(now / tick)  # 已处理到的 tick 序号
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def schedule(self, delay, callback, *args):
+        """delay 秒后调用 callback(*args)，返回可取消的 Timer"""
+        ticks = max(1, int(delay / self.tick + 0.5))
+        with self.lock:
+            timer = Timer(self.current + ticks, callback, args)
+            self._place(timer)
+            self.count += 1
+        return timer
+
+    def cancel(self, timer):
+        """取消定时器，O(1)；已触发或已取消的定时器忽略"""
+        if timer is None:
+            return
+        with self.lock:
+            timer.cancelled = True
+            if timer.slot is not None:
+                del timer.slot[timer]
+                timer.slot = None
+                self.count -= 1
+
+    def _place(self, timer):
+        delta = timer.expires - self.current
+        if delta <= 0:
+            # 级联时恰好在本 tick 到期，放进马上要处理的格子
+            slot = self.wheels[0][self.current & self.mask]
+            slot[timer] = None
+            timer.slot = slot
+            return
+        level = 0
+        while level < self.levels - 1 and delta >= 1 << (self.slot_bits * (level + 1)):
+            level += 1
+        # 超出最高层范围的定时器先放在最高层，轮到时再重新分配
+        span = 1 << (self.slot_bits * self.levels)
+        expires = min(timer.expires, self.current + span - 1)
+        slot = self.wheels[level][(expires >> (self.slot_bits * level)) & self.mask]
+        slot[timer] = None
+        timer.slot = slot
+
+    def advance(self, now):
+        """推进到时间 now（秒），触发所有到期的定时器，返回触发数量"""
+        target = int(now / self.tick)
+        fired = []
+        with self.lock:
+            while self.current < target:
+                self.current += 1
+                self._cascade()
+                slot = self.wheels[0][self.current & self.mask]
+                if not slot:
+                    continue
+                for timer in list(slot):
+                    if timer.expires <= self.current:
+                        del slot[timer]
+                        timer.slot = None
+                        self.count -= 1
+                        fired.append(timer)
+        for timer in fired:
+            if not timer.cancelled:
+                timer.callback(*timer.args)
+        return len(fired)
+
+    def _cascade(self):
+        """低层转完一圈时，把上一层当前格子的定时器重新分配到低层"""
+        for level in range(1, self.levels):
+            if (self.current >> (self.slot_bits * (level - 1))) & self.mask:
+                break
+            slot = self.wheels[level][(self.current >> (self.slot_bits * level)) & self.mask]
+            if slot:
+                timers = list(slot)
+                slot.clear()
+                for timer in timers:
+                    self._place(timer)
@@ -0,0 +1,231 @@
+"""引擎自对弈比赛：多进程并行跑大量对局，统计 Elo 和吞吐量
+
+每局由 GomokuGame 当裁判（place_stone 落子，check_winner 复核胜负）。同一个随机开局
+下两局、交换先后手；种子固定时结果可复现。
+
+用法:
+    python tournament.py greedy random --games 1000
+    python tournament.py greedy threat random --games 200 --workers 8 --opening 4 --json result.json
+    python tournament.py mybot:MyEngine greedy    # 自定义引擎 module:Class
+    python tournament.py greedy greedy            # 同一个引擎出现多次时记为 greedy、greedy#2 ...
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+from itertools import combinations
+from concurrent.futures import ProcessPoolExecutor
+
+from app import GomokuGame
+from engines import load_engine
+
+OPENING_RADIUS = 3  # 随机开局落在天元附近的范围
+
+
+def random_opening(rng, plies, size=15):
+    """天元附近随机的 plies 手开局"""
+    center = size // 2
+    cells = [(r, c) for r in range(center - OPENING_RADIUS, center + OPENING_RADIUS + 1)
+             for c in range(center - OPENING_RADIUS, center + OPENING_RADIUS + 1)]
+    return rng.sample(cells, plies)
+
+
+def label_engines(specs):
+    """给每个参赛引擎一个唯一的名字，重复出现的依次加上 #2、#3"""
+    labels = []
+    for spec in specs:
+        label, number = spec, 1
+        while label in labels:
+            number += 1
+            label = f'{spec}#{number}'
+        labels.append(label)
+    return labels
+
+
+def engine_spec(label):
+    """label_engines 给出的名字 -> 引擎名"""
+    spec, _, number = label.rpartition('#')
+    return spec if spec and number.isdigit() else label
+
+
+def play_game(task):
+    """下一局，task = (序号, 黑方引擎, 白方引擎, 开局, 种子, 连珠规则)"""
+    index, black_spec, white_spec, opening, seed, renju = task
+    game = GomokuGame(None)
+    game.renju = renju
+    game.players = {'black': {'name': black_spec, 'symbol': ''},
+                    'white': {'name': white_spec, 'symbol': ''}}
+    game.start_game()
+    engines = {
+        'black': load_engine(engine_spec(black_spec))(random.Random(f'{seed}-{index}-black')),
+        'white': load_engine(engine_spec(white_spec))(random.Random(f'{seed}-{index}-white')),
+    }
+    size = game.size
+
+    opening = list(opening)
+    while True:
+        player_id = game.current_player_id()
+        if opening:
+            row, col = opening.pop(0)
+        else:
+            row, col = engines[player_id].choose_move(game)
+        success, _, result = game.place_stone(player_id, row, col)
+        if not success:
+            # 非法落子判负
+            winner = 'white' if player_id == 'black' else 'black'
+            return {'index': index, 'winner': winner, 'reason': 'illegal', 'moves': len(game.move_history)}
+        if result == 'win':
+            symbol = game.players[player_id]['symbol']
+            if not game.check_winner(row, col, symbol):
+                raise RuntimeError(f"第 {index} 局胜负判断不一致: ({row}, {col})")
+            return {'index': index, 'winner': player_id, 'reason': 'five', 'moves': len(game.move_history)}
+        if size is not None and len(game.move_history) == size * size:
+            return {'index': index, 'winner': None, 'reason': 'full', 'moves': len(game.move_history)}
+
+
+def make_tasks(engines, games, seed, plies, renju):
+    """循环赛：每对引擎 games 局，每个开局下两局并交换先后手"""
+    tasks = []
+    index = 0
+    for a, b in combinations(engines, 2):
+        for pair in range((games + 1) // 2):
+            opening = random_opening(random.Random(f'{seed}-{a}-{b}-{pair}'), plies)
+            for black, white in ((a, b), (b, a))[:games - pair * 2]:
+                tasks.append((index, black, white, opening, seed, renju))
+                index += 1
+    return tasks
+
+
+def elo_from_score(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def pair_stats(scores):
+    """scores 为一方每局得分 (1/0.5/0)，返回得分率、Elo 差和 95% 置信区间"""
+    n = len(scores)
+    mean = sum(scores) / n
+    variance = sum((s - mean) ** 2 for s in scores) / max(1, n - 1)
+    margin = 1.96 * math.sqrt(variance / n)
+    return {
+        'games': n,
+        'wins': scores.count(1.0),
+        'draws': scores.count(0.5),
+        'losses': scores.count(0.0),
+        'score': mean,
+        'elo': elo_from_score(mean),
+        'elo_low': elo_from_score(mean - margin),
+        'elo_high': elo_from_score(mean + margin),
+    }
+
+
+def ratings(engines, results):
+    """Bradley-Terry 最大似然估计（每对引擎加一局虚拟和棋防止发散），均值为 0"""
+    points = {(a, b): 0.5 for a in engines for b in engines if a != b}
+    games = {(a, b): 1 for a in engines for b in engines if a != b}
+    for black, white, winner in results:
+        games[black, white] += 1
+        games[white, black] += 1
+        if winner is None:
+            points[black, white] += 0.5
+            points[white, black] += 0.5
+        else:
+            loser = white if winner == black else black
+            points[winner, loser] += 1
+    strength = {e: 1.0 for e in engines}
+    for _ in range(1000):
+        updated = {}
+        for e in engines:
+            won = sum(points[e, o] for o in engines if o != e)
+            denominator = sum(games[e, o] / (strength[e] + strength[o]) for o in engines if o != e)
+            updated[e] = won / denominator
+        mean = sum(math.log10(s) for s in updated.values()) / len(engines)
+        updated = {e: s / 10 ** mean for e, s in updated.items()}
+        converged = all(abs(updated[e] - strength[e]) < 1e-9 for e in engines)
+        strength = updated
+        if converged:
+            break
+    return {e: 400 * math.log10(s) for e, s in strength.items()}
+
+
+def run_tournament(engines, games=100, workers=None, seed=0, opening=2, renju=False):
+    """跑完整个循环赛，返回报告字典；engines 中重复的引擎按 label_engines 改名后分别参赛"""
+    engines = label_engines(engines)
+    for label in engines:
+        load_engine(engine_spec(label))  # 提前报出未知引擎
+    workers = workers or os.cpu_count() or 1
+    tasks = make_tasks(engines, games, seed, opening, renju)
+
+    started = time.perf_counter()
+    if workers == 1:
+        outcomes = [play_game(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            chunksize = max(1, len(tasks) // (workers * 8))
+            outcomes = list(pool.map(play_game, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - started
+
+    results = []
+    scores = {}
+    for task, outcome in zip(tasks, outcomes):
+        _, black, white, _, _, _ = task
+        winner = {'black': black, 'white': white}.get(outcome['winner'])
+        results.append((black, white, winner))
+        a, b = sorted((black, white), key=engines.index)
+        score = 0.5 if winner is None else float(winner == a)
+        scores.setdefault((a, b), []).append(score)
+
+    moves = sum(outcome['moves'] for outcome in outcomes)
+    return {
+        'engines': engines,
+        'games': len(tasks),
+        'workers': workers,
+        'seed': seed,
+        'elapsed_s': elapsed,
+        'games_per_s': len(tasks) / elapsed if elapsed else 0.0,
+        'moves_per_s': moves / elapsed if elapsed else 0.0,
+        'illegal': sum(1 for outcome in outcomes if outcome['reason'] == 'illegal'),
+        'pairs': {f'{a} vs {b}': pair_stats(s) for (a, b), s in scores.items()},
+        'ratings': ratings(engines, results),
+    }
+
+
+def print_report(report):
+    print(f"{report['games']} 局，{report['workers']} 个进程，耗时 {report['elapsed_s']:.2f} s，"
+          f"{report['games_per_s']:.1f} 局/秒，{report['moves_per_s']:.0f} 步/秒")
+    if report['illegal']:
+        print(f"非法落子判负 {report['illegal']} 局")
+    for pair, stats in report['pairs'].items():
+        print(f"  {pair}: +{stats['wins']} ={stats['draws']} -{stats['losses']}  得分率 {stats['score']:.3f}  "
+              f"Elo 差 {stats['elo']:+.0f} (95% CI {stats['elo_low']:+.0f} ~ {stats['elo_high']:+.0f})")
+    print("Elo 排名:")
+    for engine, rating in sorted(report['ratings'].items(), key=lambda item: -item[1]):
+        print(f"  {engine:<12} {rating:+.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="五子棋引擎自对弈比赛")
+    parser.add_argument("engines", nargs='+', help="引擎名 (random/greedy/threat) 或 module:Class，至少两个")
+    parser.add_argument("--games", type=int, default=100, help="每对引擎的对局数 (默认 %(default)s)")
+    parser.add_argument("--workers", type=int, help="进程数 (默认 CPU 核数)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认 %(default)s)")
+    parser.add_argument("--opening", type=int, default=2, help="随机开局手数 (默认 %(default)s)")
+    parser.add_argument("--renju", action="store_true", help="使用连珠规则 (黑棋禁手)")
+    parser.add_argument("--json", help="把报告另存为JSON文件")
+    args = parser.parse_args(argv)
+    if len(args.engines) < 2:
+        parser.error("至少需要两个引擎")
+
+    report = run_tournament(args.engines, args.games, args.workers, args.seed, args.opening, args.renju)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""回放录制的tick，以快于实时的速度跑完整条 解析 → 状态 → 提醒 → 显示 流水线
+
+报告吞吐量（tick/秒）、各阶段延迟分布和内存峰值，可作为性能回归测试。
+
+用法:
+    python backtest.py ticks.jsonl.gz
+    python backtest.py ticks.jsonl.gz --repeat 5 --trace-memory --json report.json
+"""
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from datetime import datetime
+
+from sina_api import parse_quote_text, diff_quote
+from pipeline import (format_quote, check_alert, check_indicator_alert, AlertCooldown, INDICATOR_ALERT_COOLDOWN,
+                      render_info_html, render_tooltip, icon_text)
+from indicators import IndicatorTracker
+from ticks import read_ticks
+from metrics import LatencyHistogram
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+STAGES = ["parse", "state", "alert", "render"]
+
+
+def run_backtest(tick_path, repeat=1, trace_memory=False):
+    """回放tick文件 repeat 遍，返回报告字典"""
+    ticks = list(read_ticks(tick_path))
+    histograms = {stage: LatencyHistogram() for stage in STAGES}
+    alerts = 0
+    renders = 0
+    clock = time.perf_counter
+
+    if trace_memory:
+        tracemalloc.start()
+    started = clock()
+    for _ in range(repeat):
+        state = {}
+        tracker = IndicatorTracker()
+        cooldown = AlertCooldown(INDICATOR_ALERT_COOLDOWN)
+        for t, raw in ticks:
+            now = datetime.fromtimestamp(t)
+
+            t0 = clock()
+            quotes = parse_quote_text(raw)
+            t1 = clock()
+            changed = {}
+            indicators = {}
+            for code, quote in quotes.items():
+                if diff_quote(state.get(code), quote):
+                    state[code] = quote
+                    changed[code] = format_quote(quote, now)
+                    previous = tracker.get(code)
+                    indicators[code] = previous, tracker.update(code, quote)
+            t2 = clock()
+            for code, display in changed.items():
+                alert = check_alert(display["stock_name"], display["current_price"], display["change_percent"])
+                if not alert:
+                    alert = check_indicator_alert(display["stock_name"], display["current_price"], *indicators[code])
+                    if alert and not cooldown.allow((code, alert[0]), t):
+                        alert = None
+                if alert:
+                    alerts += 1
+            t3 = clock()
+            for code, display in changed.items():
+                render_info_html(code, display["stock_name"], display["current_price"], display["price_change"],
+                                 display["change_percent"], display["market_status"], display["update_time"],
+                                 indicators[code][1])
+                render_tooltip(code, display["stock_name"], display["current_price"], display["price_change"],
+                               display["market_status"], display["update_time"])
+                icon_text(display["current_price"])
+                renders += 1
+            t4 = clock()
+
+            histograms["parse"].add(t1 - t0)
+            histograms["state"].add(t2 - t1)
+            histograms["alert"].add(t3 - t2)
+            histograms["render"].add(t4 - t3)
+    elapsed = clock() - started
+
+    report = {
+        "ticks": len(ticks) * repeat,
+        "elapsed_s": elapsed,
+        "ticks_per_s": len(ticks) * repeat / elapsed if elapsed else 0.0,
+        "alerts": alerts,
+        "renders": renders,
+        "stages": {stage: histogram.summary() for stage, histogram in histograms.items()},
+    }
+    if trace_memory:
+        report["traced_peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    if resource:
+        # Linux 上单位为KB，macOS 上为字节
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["max_rss_kb"] = maxrss / 1024 if sys.platform == "darwin" else maxrss
+    return report
+
+
+def print_report(report):
+    print(f"tick {report['ticks']} 条，耗时 {report['elapsed_s']:.3f} s，吞吐 {report['ticks_per_s']:.0f} tick/s")
+    print(f"提醒 {report['alerts']} 次，重绘 {report['renders']} 次")
+    for stage, summary in report["stages"].items():
+        print(f"  {stage:<7} mean {summary['mean_us']:8.1f} us  p50 <{summary['p50_us']:8.0f} us  "
+              f"p99 <{summary['p99_us']:8.0f} us  max {summary['max_us']:8.1f} us")
+    if "traced_peak_kb" in report:
+        print(f"Python分配峰值 {report['traced_peak_kb']:.0f} KB")
+    if "max_rss_kb" in report:
+        print(f"进程内存峰值 {report['max_rss_kb']:.0f} KB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="tick回放性能测试")
+    parser.add_argument("ticks", help="录制的tick文件 (.jsonl.gz)")
+    parser.add_argument("--repeat", type=int, default=1, help="重复回放次数 (默认 %(default)s)")
+    parser.add_argument("--trace-memory", action="store_true", help="用 tracemalloc 统计Python分配峰值（会拖慢计时）")
+    parser.add_argument("--json", help="把报告另存为JSON文件，便于对比历史结果")
+    args = parser.parse_args(argv)
+
+    report = run_backtest(args.ticks, args.repeat, args.trace_memory)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,827 @@
+"""性能基准测试，全部在本地运行，不访问真实行情接口
+
+用法:
+    python bench.py                 # 运行全部基准
+    python bench.py daemon_fanout   # 只运行指定基准
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from sina_api import market_prefix
+
+
+def _fake_quotes(codes, seed=0):
+    """生成随机行情，字段与 sina_api.parse_quote_text 的结果一致"""
+    rng = random.Random(seed)
+    quotes = {}
+    for code in codes:
+        yesterclose = rng.uniform(5, 100)
+        price = yesterclose * rng.uniform(0.9, 1.1)
+        quotes[code] = {
+            "code": code, "name": f"股票{code}", "open": yesterclose, "yesterclose": yesterclose,
+            "price": price, "high": price * 1.01, "low": price * 0.99,
+            "volume": rng.uniform(1e5, 1e7), "amount": rng.uniform(1e6, 1e9),
+            "date": "2025-01-02", "time": "10:00:00",
+            "change": price - yesterclose, "change_percent": (price - yesterclose) / yesterclose * 100,
+        }
+    return quotes
+
+
+def _sina_text(quotes):
+    """把行情字典还原成 hq.sinajs.cn 的返回文本"""
+    lines = []
+    for code, q in quotes.items():
+        fields = [q["name"], f"{q['open']:.2f}", f"{q['yesterclose']:.2f}", f"{q['price']:.2f}",
+                  f"{q['high']:.2f}", f"{q['low']:.2f}", "0", "0", f"{q['volume']:.0f}", f"{q['amount']:.2f}"]
+        fields += ["0"] * 20 + [q["date"], q["time"], "00"]
+        prefix = market_prefix(code)
+        lines.append(f'var hq_str_{prefix}{code}="{",".join(fields)}";')
+    return "\n".join(lines)
+
+
+def _write_tick_file(path, symbols, ticks):
+    """生成模拟的tick录制文件"""
+    from ticks import TickRecorder
+
+    codes = [f"{600000 + i}" for i in range(symbols)]
+    with TickRecorder(path) as recorder:
+        for i in range(ticks):
+            recorder.record(_sina_text(_fake_quotes(codes, seed=i % 50)), t=1735779600 + i * 3)
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def bench_daemon_fanout(subscribers=100, symbols=20, rounds=50):
+    """守护进程向多个本地订阅者分发行情的延迟与CPU开销"""
+    from quote_daemon import QuoteDaemon, QuoteFeedClient
+
+    codes = [f"{600000 + i}" for i in range(symbols)]
+    daemon = QuoteDaemon("127.0.0.1:0", interval=3600, fetcher=lambda c: _fake_quotes(c))
+    daemon.start()
+
+    latencies = []
+    lock = threading.Lock()
+    received = threading.Semaphore(0)
+
+    def on_quotes(message):
+        delay = time.time() - message["ts"]
+        with lock:
+            latencies.append(delay)
+        received.release()
+
+    clients = []
+    for i in range(subscribers):
+        client = QuoteFeedClient(daemon.address, on_quotes=on_quotes)
+        # 每个订阅者关注一部分重叠的代码
+        client.subscribe(codes[i % 4::4] + codes[:2])
+        client.connect()
+        clients.append(client)
+    while len(daemon.subscribers) < subscribers or len(daemon.wanted_codes()) < symbols:
+        time.sleep(0.01)
+
+    cpu_before = daemon.publish_cpu
+    started = time.perf_counter()
+    for i in range(rounds):
+        daemon.publish(_fake_quotes(codes, seed=i))
+        for _ in range(subscribers):
+            received.acquire()
+    elapsed = time.perf_counter() - started
+
+    for client in clients:
+        client.close()
+    daemon.stop()
+
+    publish_cpu_ms = (daemon.publish_cpu - cpu_before) / rounds * 1000
+    print(f"订阅者 {subscribers}, 代码 {symbols}, 轮次 {rounds}")
+    print(f"  分发延迟 p50 {_percentile(latencies, 50) * 1000:.2f} ms, "
+          f"p99 {_percentile(latencies, 99) * 1000:.2f} ms, max {max(latencies) * 1000:.2f} ms")
+    print(f"  每轮发布CPU {publish_cpu_ms:.2f} ms, 每轮总耗时 {elapsed / rounds * 1000:.2f} ms")
+    print(f"  对比独立轮询: 每轮请求 1 次 vs {subscribers} 次")
+
+
+def bench_backtest(symbols=50, ticks=2000):
+    """回放tick文件跑完整流水线的吞吐量与各阶段延迟"""
+    from backtest import run_backtest, print_report
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ticks.jsonl.gz")
+        _write_tick_file(path, symbols, ticks)
+        print(f"tick文件 {ticks} 条 x {symbols} 只, {os.path.getsize(path) / 1024:.0f} KB")
+        print_report(run_backtest(path))
+
+
+def _tencent_text(quotes):
+    """把行情字典还原成 qt.gtimg.cn 的返回文本（只填 TencentProvider 用到的字段）"""
+    from providers import TencentProvider as T
+    lines = []
+    for code, q in quotes.items():
+        fields = [""] * (T.AMOUNT + 1)
+        fields[T.NAME], fields[T.CODE] = q["name"], code
+        for index, key in ((T.PRICE, "price"), (T.YESTERCLOSE, "yesterclose"), (T.OPEN, "open"),
+                           (T.HIGH, "high"), (T.LOW, "low")):
+            fields[index] = f"{q[key]:.2f}"
+        fields[T.VOLUME] = f"{q['volume'] / 100:.0f}"
+        fields[T.AMOUNT] = f"{q['amount'] / 10000:.4f}"
+        fields[T.TIME] = (q["date"] + q["time"]).replace("-", "").replace(":", "")
+        prefix = market_prefix(code)
+        lines.append(f'v_{prefix}{code}="1~{"~".join(fields[1:])}";')
+    return "\n".join(lines)
+
+
+def _eastmoney_items(quotes):
+    """把行情字典还原成 push2.eastmoney.com ulist 接口 data.diff 里的条目"""
+    items = {}
+    for code, q in quotes.items():
+        stamp = time.mktime(time.strptime(f"{q['date']} {q['time']}", "%Y-%m-%d %H:%M:%S"))
+        items[code] = {
+            "f2": round(q["price"], 2), "f5": round(q["volume"] / 100), "f6": round(q["amount"], 2),
+            "f12": code, "f13": 1 if code.startswith("6") else 0, "f14": q["name"],
+            "f15": round(q["high"], 2), "f16": round(q["low"], 2), "f17": round(q["open"], 2),
+            "f18": round(q["yesterclose"], 2), "f124": int(stamp),
+        }
+    return items
+
+
+class _StubQuoteHandler(BaseHTTPRequestHandler):
+    """按新浪、腾讯或东方财富的格式返回固定行情，可模拟网络延迟"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # 保持连接时避免 Nagle 与延迟确认叠加出的 40 ms 等待
+
+    def do_GET(self):
+        server = self.server
+        if server.style == "eastmoney":
+            _, sep, secids = self.path.partition("secids=")
+            codes = [secid.partition(".")[2] for secid in secids.split(",")]
+        else:
+            _, sep, symbols = self.path.partition("/list=" if server.style == "sina" else "/q=")
+            symbols = symbols.split(",")
+            codes = [symbol[2:] for symbol in symbols]
+        if not sep:
+            self.send_error(404)
+            return
+        latency = server.latency() if callable(server.latency) else server.latency
+        if latency:
+            time.sleep(latency)
+        if server.style == "eastmoney":
+            diff = [server.lines[code] for code in codes if code in server.lines]
+            body = json.dumps({"rc": 0, "data": {"total": len(diff), "diff": diff}}, ensure_ascii=False)
+            body, content_type = body.encode("utf-8"), "application/json; charset=UTF-8"
+        else:
+            # 前缀不对的代码和真实接口一样返回空行情
+            lines = []
+            for symbol in symbols:
+                line = server.lines.get(symbol[2:], "")
+                lines.append(line if f"_{symbol}=" in line.partition("=")[0] + "=" else f'var hq_str_{symbol}="";')
+            body = "\n".join(lines)
+            body, content_type = body.encode("gbk", errors="replace"), "application/javascript; charset=GBK"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_STUB_PATHS = {"sina": "/list=", "tencent": "/q=", "eastmoney": "/api/qt/ulist.np/get"}
+
+
+def _stub_quote_server(quotes, latency=0.0, style="sina"):
+    """本地模拟的行情接口（style 为 sina/tencent/eastmoney），返回 (server, 行情地址)
+
+    latency 为每次请求的延迟（秒），也可以是每次调用返回一个延迟的函数；运行中可直接改 server.latency。
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubQuoteHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.style = style
+    if style == "eastmoney":
+        server.lines = _eastmoney_items(quotes)
+    else:
+        render = _sina_text if style == "sina" else _tencent_text
+        server.lines = {code: render({code: quote}) for code, quote in quotes.items()}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://%s:%d%s" % (*server.server_address[:2], _STUB_PATHS[style])
+
+
+def _universe(symbols, seed=0):
+    """模拟的全市场代码表：沪深主板、创业板、科创板，约 5% 为 ST"""
+    rng = random.Random(seed)
+    prefixes = ["600", "601", "603", "000", "002", "300", "688"]
+    codes = sorted({f"{rng.choice(prefixes)}{rng.randrange(1000):03d}" for _ in range(symbols * 3)})[:symbols]
+    quotes = _fake_quotes(codes, seed)
+    for quote in quotes.values():
+        if rng.random() < 0.05:
+            quote["name"] = "*ST" + quote["name"]
+    return quotes
+
+
+def bench_snapshot(symbols=5000, rounds=5, latency=0.03):
+    """全市场快照：本地模拟接口上 symbols 只股票的端到端耗时（分批并发请求 + 解析 + 宽度统计）"""
+    from market_snapshot import fetch_snapshot, breadth, SNAPSHOT_WORKERS
+    from sina_api import fetch_quotes, parse_quote_text
+
+    quotes = _universe(symbols)
+    codes = list(quotes)
+    server, url = _stub_quote_server(quotes, latency)
+    print(f"{len(codes)} 只股票，模拟接口每次请求延迟 {latency * 1000:.0f} ms")
+    try:
+        for workers in (1, SNAPSHOT_WORKERS):
+            times = []
+            for _ in range(rounds):
+                started = time.perf_counter()
+                stats = breadth(fetch_snapshot(codes, url=url, workers=workers))
+                times.append(time.perf_counter() - started)
+            print(f"  并发 {workers}: 端到端 p50 {_percentile(times, 50) * 1000:.0f} ms，"
+                  f"最慢 {max(times) * 1000:.0f} ms，解析 {stats['total']} 只")
+        print(f"  上涨 {stats['advancers']} 下跌 {stats['decliners']} 涨停 {stats['limit_up']} "
+              f"跌停 {stats['limit_down']}")
+
+        # 对照：原来逐批顺序请求、逐只构造字典再用 Python 循环统计
+        started = time.perf_counter()
+        result = fetch_quotes(codes, url=url)
+        fetch_time = time.perf_counter() - started
+        print(f"  对照 fetch_quotes 顺序请求: {fetch_time * 1000:.0f} ms")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # 只比较统计部分：数组运算 vs 逐只循环
+    from market_snapshot import MarketSnapshot, parse_snapshot_text
+    text = _sina_text(quotes)
+    started = time.perf_counter()
+    parsed = [], [], []
+    parse_snapshot_text(text, *parsed)
+    snapshot = MarketSnapshot(*parsed)
+    parse_time = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(rounds):
+        breadth(snapshot)
+    vector_time = (time.perf_counter() - started) / rounds
+    started = time.perf_counter()
+    for _ in range(rounds):
+        rows = list(parse_quote_text(text).values())
+        advancers = sum(1 for q in rows if q["price"] > 0 and q["change"] > 0)
+        sorted(rows, key=lambda q: -q["change_percent"])[:10]
+        sorted(rows, key=lambda q: -q["amount"])[:10]
+    loop_time = (time.perf_counter() - started) / rounds
+    print(f"  解析成数组 {parse_time * 1000:.1f} ms，向量化统计 {vector_time * 1000:.1f} ms；"
+          f"对照逐只解析+循环统计 {loop_time * 1000:.1f} ms")
+
+
+def _spiky_latency(median, spike, spike_rate, seed):
+    """对数正态延迟，偶尔出现 spike 秒的长尾"""
+    rng = random.Random(seed)
+
+    def latency():
+        if rng.random() < spike_rate:
+            return spike
+        return rng.lognormvariate(0, 0.3) * median
+    return latency
+
+
+def bench_hedging(symbols=20, rounds=300, spike=0.4, spike_rate=0.02):
+    """多接口对冲：单接口与 HedgedFetcher 的请求延迟分布，以及主接口变慢后的改道"""
+    from providers import PROVIDERS, HedgedFetcher
+
+    quotes = _fake_quotes([f"{600000 + i}" for i in range(symbols // 2)] +
+                          [f"{i:06d}" for i in range(1, symbols - symbols // 2 + 1)])
+    codes = list(quotes)
+    medians = {"sina": 0.02, "tencent": 0.03, "eastmoney": 0.04}
+    servers = {}
+    providers = []
+    for seed, (name, median) in enumerate(medians.items()):
+        server, url = _stub_quote_server(quotes, _spiky_latency(median, spike, spike_rate, seed), name)
+        servers[name] = server
+        providers.append(PROVIDERS[name](url))
+    print(f"{symbols} 只股票，每家接口 {spike_rate:.0%} 的请求延迟 {spike * 1000:.0f} ms，"
+          f"其余中位数 " + "、".join(f"{name} {median * 1000:.0f} ms" for name, median in medians.items()))
+
+    def report(label, times):
+        print(f"  {label}: p50 {_percentile(times, 50) * 1000:.0f} ms，p95 {_percentile(times, 95) * 1000:.0f} ms，"
+              f"p99 {_percentile(times, 99) * 1000:.0f} ms")
+
+    def run(fetch):
+        times = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            result = fetch(codes)
+            times.append(time.perf_counter() - started)
+            assert len(result) == len(codes)
+        return times
+
+    try:
+        import requests
+        session = requests.Session()
+        report(f"只用 {providers[0].name}", run(lambda c: providers[0].fetch(c, session=session)))
+        fetcher = HedgedFetcher(providers)
+        report("对冲", run(fetcher.fetch))
+        print(f"  对冲请求 {fetcher.hedges} 次 ({fetcher.hedges / rounds:.1%})，探测 {fetcher.probes} 次，"
+              f"胜出: " + "、".join(f"{name} {count}" for name, count in fetcher.wins.items()))
+
+        # 主接口整体变慢，EWMA 排序应改为优先请求其他接口
+        servers["sina"].latency = 0.15
+        wins = dict(fetcher.wins)
+        hedges = fetcher.hedges
+        report("sina 变慢到 150 ms 后", run(fetcher.fetch))
+        print(f"  对冲请求 {fetcher.hedges - hedges} 次，胜出: " +
+              "、".join(f"{name} {fetcher.wins[name] - wins[name]}" for name in fetcher.wins) +
+              "；当前顺序: " + " > ".join(provider.name for provider in fetcher.ranked()))
+        fetcher.close()
+    finally:
+        for server in servers.values():
+            server.shutdown()
+            server.server_close()
+
+
+def bench_kline(symbols=5000, years=10, queries=2000):
+    """K线缓存：全市场 years 年日K的写入、增量追加、打开和区间查询耗时"""
+    import shutil
+    import numpy as np
+    from kline_store import KlineStore
+
+    days = np.arange(np.datetime64("2015-01-05"), np.datetime64("2015-01-05") + years * 366)
+    days = days[np.is_busday(days)][:years * 244]
+    times = days.astype("datetime64[s]").astype(np.int64)
+    codes = list(_universe(symbols))
+    rng = np.random.default_rng(0)
+    root = tempfile.mkdtemp(prefix="kline_")
+    store = KlineStore(root)
+    try:
+        started = time.perf_counter()
+        for code in codes:
+            close = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, len(times))))
+            store.append(code, {"time": times, "open": close * 0.99, "high": close * 1.02,
+                                "low": close * 0.98, "close": close, "volume": rng.uniform(1e5, 1e7, len(times))})
+        write_time = time.perf_counter() - started
+        size = sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root) for f in files)
+        print(f"{len(codes)} 只股票 x {len(times)} 根日K ({years} 年)，共 {size / 1e6:.0f} MB；"
+              f"首次写入 {write_time:.1f} s")
+
+        # 每只追加一根新K线
+        bar = {"time": [times[-1] + 86400], "open": [10.0], "high": [10.0], "low": [10.0], "close": [10.0],
+               "volume": [1.0]}
+        started = time.perf_counter()
+        for code in codes:
+            store.append(code, bar)
+        append_time = time.perf_counter() - started
+        print(f"  增量追加: 每只 {append_time / len(codes) * 1e6:.0f} us")
+
+        # 新开的 store 读每只最近一年（首次映射文件）
+        store = KlineStore(root)
+        started = time.perf_counter()
+        for code in codes:
+            store.query(code, limit=244)
+        load_time = time.perf_counter() - started
+        print(f"  打开并读取全市场最近一年: {load_time:.2f} s (每只 {load_time / len(codes) * 1e6:.0f} us)")
+
+        # 随机股票的随机一个月
+        samples = []
+        full = []
+        for _ in range(queries):
+            code = codes[rng.integers(len(codes))]
+            start = int(rng.integers(len(times) - 22))
+            begin, end = times[start], times[start + 21]
+            started = time.perf_counter()
+            bars = store.query(code, start=begin, end=end)
+            samples.append(time.perf_counter() - started)
+            assert len(bars["close"]) == 22
+            # 对照：整列读入内存再切片
+            started = time.perf_counter()
+            column = {field: np.fromfile(os.path.join(root, "day", code, field),
+                                         dtype=np.int64 if field == "time" else np.float64)
+                      for field in ("time", "open", "high", "low", "close", "volume")}
+            low, high = np.searchsorted(column["time"], [begin, end + 1])
+            {field: values[low:high] for field, values in column.items()}
+            full.append(time.perf_counter() - started)
+        print(f"  区间查询一个月: p50 {_percentile(samples, 50) * 1e6:.0f} us，p99 {_percentile(samples, 99) * 1e6:.0f} us；"
+              f"对照整列读入 p50 {_percentile(full, 50) * 1e6:.0f} us")
+    finally:
+        store.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def bench_indicators(symbols=500, ticks=600, history=2440, backfill_symbols=200):
+    """技术指标：symbols 只股票每秒一个tick的流式更新开销，以及历史数组批量回填与逐个更新的对比（须逐位相同）"""
+    import numpy as np
+    from indicators import IndicatorState, IndicatorTracker, backfill, NAMES
+
+    rng = np.random.default_rng(0)
+    quotes = _fake_quotes([f"{600000 + i}" for i in range(symbols)])
+    tracker = IndicatorTracker()
+    moves = rng.normal(0, 0.001, (ticks, symbols))
+    started = time.perf_counter()
+    for t in range(ticks):
+        for j, quote in enumerate(quotes.values()):
+            quote["price"] *= 1 + moves[t, j]
+            quote["volume"] += 100
+            tracker.update(quote["code"], quote)
+    elapsed = time.perf_counter() - started
+    per_update = elapsed / (ticks * symbols)
+    state = next(iter(tracker.states.values()))
+    size = sys.getsizeof(state) + sys.getsizeof(state.ring) + sys.getsizeof(state.sums)
+    print(f"流式: {symbols} 只 x {ticks} 个tick，每次更新 {per_update * 1e6:.1f} us；"
+          f"每秒刷新一次全部 {symbols} 只占 CPU {per_update * symbols:.2%}，每只状态约 {size} 字节")
+
+    prices = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, (backfill_symbols, history)), axis=1))
+    volumes = rng.uniform(1e5, 1e7, (backfill_symbols, history))
+    started = time.perf_counter()
+    batches = [backfill(prices[i], volumes[i]) for i in range(backfill_symbols)]
+    vector_time = time.perf_counter() - started
+    started = time.perf_counter()
+    streams = []
+    for i in range(backfill_symbols):
+        state = IndicatorState()
+        streams.append([state.update(p, v) for p, v in zip(prices[i].tolist(), volumes[i].tolist())])
+    stream_time = time.perf_counter() - started
+    identical = all(np.array_equal(np.array([row[name] for row in rows]).view(np.int64), result[name].view(np.int64))
+                    for rows, (result, _) in zip(streams, batches) for name in NAMES)
+    print(f"回填: {backfill_symbols} 只 x {history} 根，批量 {vector_time * 1000:.0f} ms，"
+          f"逐个更新 {stream_time * 1000:.0f} ms ({stream_time / vector_time:.1f}x)，"
+          f"结果{'逐位相同' if identical else '不一致!'}")
+
+    _indicator_session(rng)
+
+
+def _indicator_session(rng, symbols=20, hours=4, interval=3, days=250):
+    """托盘提醒：模拟 hours 小时的盘中行情（每 interval 秒一个tick），对比逐tick指标和日线指标触发的提醒次数"""
+    import numpy as np
+    from pipeline import check_indicator_alert, AlertCooldown, INDICATOR_ALERT_COOLDOWN
+    from indicators import IndicatorTracker, DailyIndicatorTracker
+
+    ticks = hours * 3600 // interval
+    counts = {"逐tick指标": 0, "日线指标": 0, "日线指标 + 冷却": 0}
+    for i in range(symbols):
+        code = f"{600000 + i}"
+        closes = 10 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+        history = [str(day) for day in np.arange("2024-01-01", days, dtype="datetime64[D]")]
+        daily = DailyIndicatorTracker()
+        daily.seed(code, history, closes)
+        trackers = {"逐tick指标": IndicatorTracker(), "日线指标": daily}
+        previous = dict.fromkeys(trackers)
+        cooldown = AlertCooldown(INDICATOR_ALERT_COOLDOWN)
+        # 盘中价格围绕昨收随机游走，日内波动约 2%
+        prices = closes[-1] * np.exp(np.cumsum(rng.normal(0, 0.02 / np.sqrt(ticks), ticks)))
+        for t, price in enumerate(prices.tolist()):
+            quote = {"date": "2025-01-02", "price": price, "volume": 100.0 * (t + 1), "amount": price * 100.0 * (t + 1)}
+            for name, tracker in trackers.items():
+                values = tracker.update(code, quote)
+                alert = check_indicator_alert(code, f"{price:.2f}", previous[name], values)
+                previous[name] = values
+                if alert:
+                    counts[name] += 1
+                    if name == "日线指标" and cooldown.allow((code, alert[0]), t * interval):
+                        counts["日线指标 + 冷却"] += 1
+    print(f"提醒: {symbols} 只股票模拟 {hours} 小时盘中（每 {interval} 秒一个tick），每只平均 "
+          + "，".join(f"{name} {count / symbols:.1f} 次" for name, count in counts.items()))
+
+
+def bench_portfolio(lines=1000, ticks=1000, changed=0.3):
+    """持仓盈亏：lines 笔持仓每个tick写入有变化的行情并重新汇总的耗时，对照逐笔 Python 循环"""
+    from portfolio import Portfolio
+
+    rng = random.Random(0)
+    quotes = _universe(int(lines * 0.8))
+    codes = list(quotes)
+    holdings = [{"code": rng.choice(codes), "quantity": rng.choice([100, 200, 500, 1000, -100]) * rng.randint(1, 10),
+                 "cost": quotes[codes[0]]["yesterclose"] * rng.uniform(0.5, 1.5)} for _ in range(lines)]
+    portfolio = Portfolio(holdings)
+    portfolio.update_quotes(quotes)
+    print(f"{lines} 笔持仓 ({len(portfolio.codes)} 只股票)，每个tick约 {changed:.0%} 的股票价格变化")
+
+    # 预先生成每个tick的变化行情，计时只包含写入和汇总
+    changes = []
+    for _ in range(ticks):
+        tick = {}
+        for code in rng.sample(codes, int(len(codes) * changed)):
+            quote = dict(quotes[code])
+            quote["price"] = quote["yesterclose"] * rng.uniform(0.9, 1.1)
+            tick[code] = quote
+        changes.append(tick)
+
+    times = []
+    for tick in changes:
+        started = time.perf_counter()
+        portfolio.update_quotes(tick)
+        summary = portfolio.summary()
+        times.append(time.perf_counter() - started)
+    print(f"  向量化: p50 {_percentile(times, 50) * 1e6:.0f} us，p99 {_percentile(times, 99) * 1e6:.0f} us")
+
+    # 对照：每个tick逐笔累加
+    latest = {code: dict(quote) for code, quote in quotes.items()}
+    loop_times = []
+    for tick in changes:
+        started = time.perf_counter()
+        latest.update(tick)
+        market = cost = day = 0.0
+        for line in holdings:
+            quote = latest[line["code"]]
+            price = quote["price"] or quote["yesterclose"]
+            market += line["quantity"] * price
+            cost += line["quantity"] * line["cost"]
+            day += line["quantity"] * (price - quote["yesterclose"])
+        loop_times.append(time.perf_counter() - started)
+    print(f"  对照逐笔循环: p50 {_percentile(loop_times, 50) * 1e6:.0f} us，"
+          f"p99 {_percentile(loop_times, 99) * 1e6:.0f} us")
+    assert abs(market - summary["market_value"]) < 1e-6 * abs(market) + 1e-6
+
+
+# 在子进程中启动托盘，打印构造完成（图标已显示）和第一次显示实时行情的时间
+_STARTUP_DRIVER = """
+import sys, time, json
+sys.path.insert(0, sys.argv[1])
+from PyQt5.QtWidgets import QApplication
+import stock_tray
+app = stock_tray.StockTrayApp(quote_url=sys.argv[2])
+icon = time.time()
+shown = app.current_price
+while app.rendered_code is None and time.time() - icon < 10:
+    QApplication.processEvents()
+    time.sleep(0.001)
+print(json.dumps({"icon": icon, "live": time.time(), "shown": shown}))
+"""
+
+
+def bench_startup(rounds=5, latency=0.3, universe=5000):
+    """冷启动：从启动进程到托盘图标出现、到显示第一笔实时行情的时间（行情接口延迟 latency 秒）"""
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    quotes = _fake_quotes(["603019"])
+    server, url = _stub_quote_server(quotes, latency, "sina")
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    print(f"行情接口延迟 {latency * 1000:.0f} ms，股票列表 {universe} 只，每种情况启动 {rounds} 次")
+    try:
+        for cached in (False, True):
+            with tempfile.TemporaryDirectory() as root:
+                with open(os.path.join(root, "stock_list.json"), "w", encoding="utf-8") as f:
+                    json.dump({f"{600000 + i}": f"股票{600000 + i}" for i in range(universe)}, f, ensure_ascii=False)
+                cache = os.path.join(root, "last_quote.json")
+                icons = []
+                lives = []
+                for _ in range(rounds):
+                    # 托盘取到行情后会写入缓存，每次启动前重置
+                    if cached:
+                        with open(cache, "w", encoding="utf-8") as f:
+                            json.dump({"code": "603019", "quote": quotes["603019"]}, f, ensure_ascii=False)
+                    elif os.path.exists(cache):
+                        os.remove(cache)
+                    started = time.time()
+                    output = subprocess.run([sys.executable, "-c", _STARTUP_DRIVER, here, url], cwd=root, env=env,
+                                            capture_output=True, text=True, check=True).stdout
+                    marks = json.loads(output.strip().splitlines()[-1])
+                    icons.append(marks["icon"] - started)
+                    lives.append(marks["live"] - started)
+                print(f"  {'有' if cached else '无'}行情缓存: 图标 {_percentile(icons, 50) * 1000:.0f} ms"
+                      f"（显示 {marks['shown']}），第一笔实时行情 {_percentile(lives, 50) * 1000:.0f} ms")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def bench_universe(rows=10000, searches=2000, renamed=0.01, missing=0.01):
+    """基础信息库：批量写入 rows 只股票、再次抓取（少量改名和退市）的耗时，以及搜索延迟，对照遍历字典"""
+    from universe import UniverseStore
+
+    rng = random.Random(0)
+    chars = "中国平安招商银行科技电子新能源医药生物华东方大通信光电股份集团控股实业发展智能制造汽车材料"
+    stocks = []
+    for i in range(rows):
+        code = f"{600000 + i:06d}" if i % 2 else f"{i:06d}"
+        stocks.append({"code": code, "name": "".join(rng.choice(chars) for _ in range(4)),
+                       "exchange": "sh" if code.startswith("6") else "sz", "board": rng.choice(["主板", "创业板", "科创板"]),
+                       "listed": f"{rng.randint(1991, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"})
+    with tempfile.TemporaryDirectory() as root:
+        with UniverseStore(os.path.join(root, "universe.db")) as store:
+            started = time.perf_counter()
+            counts = store.upsert(stocks, exchanges=["sh", "sz"], as_of="2025-01-02")
+            print(f"首次写入 {counts['added']} 只: {(time.perf_counter() - started) * 1000:.0f} ms（一个事务）")
+
+            again = [dict(row) for row in stocks if rng.random() >= missing]
+            for row in rng.sample(again, int(rows * renamed)):
+                row["name"] = "ST" + row["name"][:3]
+            started = time.perf_counter()
+            counts = store.upsert(again, exchanges=["sh", "sz"], as_of="2025-01-03")
+            print(f"再次写入 {len(again)} 只（改名 {counts['renamed']}，退市 {counts['delisted']}）: "
+                  f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+            names = store.names()
+            keywords = [rng.choice(list(names.values()))[rng.randint(0, 2):][:2] for _ in range(searches // 2)]
+            keywords += [rng.choice(list(names))[:rng.randint(3, 6)] for _ in range(searches // 2)]
+            times = []
+            for keyword in keywords:
+                started = time.perf_counter()
+                store.search(keyword, limit=20)
+                times.append(time.perf_counter() - started)
+            print(f"搜索 {searches} 次（一半名称片段、一半代码前缀）: p50 {_percentile(times, 50) * 1e6:.0f} us，"
+                  f"p99 {_percentile(times, 99) * 1e6:.0f} us")
+
+            # 对照：托盘原来对 {代码: 名称} 逐个比较
+            scan_times = []
+            for keyword in keywords:
+                started = time.perf_counter()
+                if keyword.isdigit():
+                    [(code, name) for code, name in names.items() if code.startswith(keyword)][:20]
+                else:
+                    [(code, name) for code, name in names.items() if keyword in name][:20]
+                scan_times.append(time.perf_counter() - started)
+            print(f"  对照遍历字典: p50 {_percentile(scan_times, 50) * 1e6:.0f} us，"
+                  f"p99 {_percentile(scan_times, 99) * 1e6:.0f} us")
+
+
+def _start_exchange_stub(stocks, latency=0.0, slow_rate=0.0, faults=()):
+    """在子进程中启动 exchange_stub.py（不计入本进程的内存），返回 (进程, 地址)"""
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    command = [sys.executable, os.path.join(here, "exchange_stub.py"), "--http", "127.0.0.1:0",
+               "--stocks", str(stocks), "--latency", str(latency), "--slow-rate", str(slow_rate),
+               "--slow-latency", "0.5"]
+    for fault in faults:
+        command += ["--fault", fault]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    url = process.stdout.readline().rsplit(" ", 1)[-1].strip()
+    return process, url
+
+
+def bench_crawler(stocks=5000, latency=0.02):
+    """股票列表爬虫：对本地模拟的交易所接口端到端运行各个抓取函数，报告耗时、请求数和峰值内存"""
+    import io
+    import tracemalloc
+    import contextlib
+    import requests
+    import fetch_stock_list as crawler
+    from exchange_stub import make_universe
+
+    expected = Counter(stock["exchange"] for stock in make_universe(stocks))
+    scenarios = [
+        ("正常", {}),
+        ("上交所接口返回 500", {"faults": ["sse=error"]}),
+        ("深交所返回空表、5% 请求慢 0.5 s", {"faults": ["szse=empty"], "slow_rate": 0.05}),
+        ("新浪返回 null", {"faults": ["sina=null"]}),
+    ]
+    functions = [("fetch_sh_stocks", "sh"), ("fetch_sz_stocks", "sz"),
+                 ("fetch_sh_stocks_from_sina", "sh"), ("fetch_sz_stocks_from_sina", "sz")]
+    print(f"模拟接口 {stocks} 只股票（上证 {expected['sh']}、深证 {expected['sz']} 只，含 B股），"
+          f"每次请求延迟 {latency * 1000:.0f} ms，请求间隔设为 0")
+    saved = crawler.SSE_HOST, crawler.SZSE_HOST, crawler.SINA_HOST, crawler.PAUSE_SCALE
+    crawler.PAUSE_SCALE = 0
+    try:
+        for title, options in scenarios:
+            process, url = _start_exchange_stub(stocks, latency, **options)
+            crawler.SSE_HOST = crawler.SZSE_HOST = crawler.SINA_HOST = url
+            print(f"  {title}:")
+            try:
+                for name, exchange in functions:
+                    before = sum(requests.get(url + "/stats").json()["requests"].values())
+                    tracemalloc.start()
+                    started = time.perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        result = getattr(crawler, name)()
+                    elapsed = time.perf_counter() - started
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    count = sum(requests.get(url + "/stats").json()["requests"].values()) - before
+                    print(f"    {name:<26} {elapsed * 1000:6.0f} ms，请求 {count:3d} 次，峰值内存 {peak / 1e6:5.1f} MB，"
+                          f"得到 {len(result)}/{expected[exchange]} 只")
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        crawler.SSE_HOST, crawler.SZSE_HOST, crawler.SINA_HOST, crawler.PAUSE_SCALE = saved
+
+    # 完整运行一次 main：两个交易所抓取、归并写出 stock_list.json、写入 universe.db
+    process, url = _start_exchange_stub(stocks, latency)
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            os.chdir(root)
+            tracemalloc.start()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                crawler.main(["--host", url, "--no-pause"])
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            with open("stock_list.json", encoding="utf-8") as f:
+                written = len(json.load(f))
+        count = sum(requests.get(url + "/stats").json()["requests"].values())
+        print(f"  完整运行 main: {elapsed * 1000:.0f} ms，请求 {count} 次，峰值内存 {peak / 1e6:.1f} MB，"
+              f"写出 {written}/{sum(expected.values())} 只")
+    finally:
+        os.chdir(cwd)
+        crawler.SSE_HOST, crawler.SZSE_HOST, crawler.SINA_HOST, crawler.PAUSE_SCALE = saved
+        process.terminate()
+        process.wait()
+
+
+def _sina_pages(stocks, page_size, seed=0):
+    """乱序的新浪节点数据，按页逐块产出 JSON 文本（每块约 CHUNK_SIZE 字节），不在内存中保留整页"""
+    import fetch_stock_list as crawler
+
+    # i -> (i * 104729 + offset) % 700000 是一个置换：代码不重复、顺序打乱，又不必把代码表留在内存里
+    offset = random.Random(seed).randrange(700000)
+    for start in range(0, stocks, page_size):
+        def chunks(start=start):
+            text = "["
+            for i in range(start, min(start + page_size, stocks)):
+                code = f"{(i * 104729 + offset) % 700000:06d}"
+                text += ("," if i > start else "") + json.dumps(
+                    {"symbol": market_prefix(code) + code, "code": code, "name": f"股票{code}",
+                     "trade": "10.00", "pricechange": 0.1, "changepercent": 1.0, "volume": 123456,
+                     "amount": 1234567, "ticktime": "15:00:00"}, ensure_ascii=False)
+                if len(text) >= crawler.CHUNK_SIZE:
+                    yield text
+                    text = ""
+            yield text + "]"
+        yield chunks
+
+
+def bench_crawler_memory(sizes=(5000, 20000, 50000), page_size=2000):
+    """爬虫内存：乱序到达的 sizes 只股票，整页 json.loads + 字典合并 + 排序写出，对照流式解析 + 排序分段归并"""
+    import tracemalloc
+    import fetch_stock_list as crawler
+
+    def whole(root, stocks):
+        all_stocks = {}
+        for chunks in _sina_pages(stocks, page_size):
+            for item in json.loads("".join(chunks())):
+                code = item["symbol"][2:]
+                all_stocks.setdefault(code, crawler._record(code, item["name"], item["symbol"][:2]))
+        sorted_stocks = {k: all_stocks[k]["name"] for k in sorted(all_stocks.keys())}
+        with open(os.path.join(root, "whole.json"), 'w', encoding='utf-8') as f:
+            json.dump(sorted_stocks, f, ensure_ascii=False, indent=2)
+        return len(sorted_stocks)
+
+    def streaming(root, stocks):
+        runs = crawler.SortedRuns()
+        try:
+            for chunks in _sina_pages(stocks, page_size):
+                for item in crawler.iter_json_rows(chunks()):
+                    code = item["symbol"][2:]
+                    runs.add(crawler._record(code, item["name"], item["symbol"][:2]))
+            counts = crawler.write_stock_list(runs.merge(), os.path.join(root, "streaming.json"))
+        finally:
+            runs.close()
+        return sum(counts.values())
+
+    print(f"每页 {page_size} 只，排序段 {crawler.RUN_SIZE} 条")
+    with tempfile.TemporaryDirectory() as root:
+        for stocks in sizes:
+            results = []
+            for label, run in (("整页解析", whole), ("流式归并", streaming)):
+                # 耗时和峰值内存分两次测，tracemalloc 本身会拖慢分配
+                started = time.perf_counter()
+                count = run(root, stocks)
+                elapsed = time.perf_counter() - started
+                tracemalloc.start()
+                run(root, stocks)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                results.append(f"{label} {elapsed * 1000:5.0f} ms / 峰值 {peak / 1e6:5.1f} MB")
+            with open(os.path.join(root, "whole.json"), 'rb') as a, open(os.path.join(root, "streaming.json"), 'rb') as b:
+                same = a.read() == b.read()
+            print(f"  {stocks:6d} 只: {'，'.join(results)}，输出{'相同' if same else '不同!'}（{count} 只）")
+
+
+BENCHMARKS = {
+    "daemon_fanout": bench_daemon_fanout,
+    "backtest": bench_backtest,
+    "snapshot": bench_snapshot,
+    "hedging": bench_hedging,
+    "kline": bench_kline,
+    "indicators": bench_indicators,
+    "portfolio": bench_portfolio,
+    "startup": bench_startup,
+    "universe": bench_universe,
+    "crawler": bench_crawler,
+    "crawler_memory": bench_crawler_memory,
+}
+
+
+def main(argv=None):
+    names = (argv if argv is not None else sys.argv[1:]) or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"未知基准: {name}，可选: {', '.join(BENCHMARKS)}")
+            return 1
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
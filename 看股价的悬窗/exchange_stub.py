@@ -0,0 +1,252 @@
+"""本地模拟的交易所股票列表接口：按真实接口的路径、返回格式和分页返回随机生成的股票，用于离线测试 fetch_stock_list.py
+
+    上交所  GET /security/stock/getStockListData.do?stockType=1&pageHelp.beginPage=1&pageHelp.pageSize=2000
+            {"pageHelp": {"pageNo", "pageSize", "pageCount", "total", "data": [{SECURITY_CODE_A, SECURITY_ABBR_A, LISTING_DATE, ...}]}}
+            stockType=1 主板，8 科创板，2 B股
+    深交所  GET /api/report/ShowReport/data?SHOWTYPE=JSON&CATALOGID=1110&TABKEY=tab1&PAGENO=1
+            [{"metadata": {"pageno", "pagesize", "pagecount", "recordcount"}, "data": [{agdm, agjc, agssrq, bk, ...}]}]
+            每页固定 20 条；tab1 A股，tab2 B股，其他为空表
+    新浪    GET /quotes_service/api/json_v2.php/Market_Center.getHQNodeData?page=1&num=1000&node=sh600
+            [{symbol, code, name, trade, ...}]，node 为 sh/sz 加代码前缀，或 sz_a/sz_b/sz_main/sz_zxb/sz_cyb；
+            没有数据时返回 null
+    统计    GET /stats   {"requests": {接口: 次数}}
+
+还可以模拟慢响应（slow_rate 比例的请求额外等待 slow_latency 秒）和接口故障:
+    error 返回 500，null 返回 null，empty 返回格式正确但没有数据，html 返回一个网页（像被防火墙拦截）
+
+用法:
+    python exchange_stub.py --stocks 5000 --latency 0.02 --fault sse=error
+    python fetch_stock_list.py --host http://127.0.0.1:8767
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SSE_PATH = "/security/stock/getStockListData.do"
+SZSE_PATH = "/api/report/ShowReport/data"
+SINA_PATH = "/quotes_service/api/json_v2.php/Market_Center.getHQNodeData"
+SZSE_PAGE_SIZE = 20
+FAULTS = ("error", "null", "empty", "html")
+
+# 代码前缀 -> (交易所, 板块, 上交所 stockType / 深交所 tab)
+_BOARDS = [
+    ("600", "sh", "主板", "1"), ("601", "sh", "主板", "1"), ("603", "sh", "主板", "1"), ("605", "sh", "主板", "1"),
+    ("688", "sh", "科创板", "8"), ("900", "sh", "B股", "2"),
+    ("000", "sz", "主板", "tab1"), ("001", "sz", "主板", "tab1"), ("002", "sz", "主板", "tab1"),
+    ("003", "sz", "主板", "tab1"), ("300", "sz", "创业板", "tab1"), ("301", "sz", "创业板", "tab1"),
+    ("200", "sz", "B股", "tab2"),
+]
+_WEIGHTS = [16, 9, 12, 2, 6, 1, 5, 1, 10, 1, 14, 4, 1]
+_NAME_CHARS = "中国平安招商银行科技电子新能源医药生物华东方大通信光电股份集团控股实业发展智能制造汽车材料"
+_SINA_BLOCKS = {
+    "sz_a": lambda s: s["exchange"] == "sz" and s["board"] != "B股",
+    "sz_b": lambda s: s["exchange"] == "sz" and s["board"] == "B股",
+    "sz_main": lambda s: s["exchange"] == "sz" and s["board"] == "主板",
+    "sz_zxb": lambda s: s["exchange"] == "sz" and s["code"].startswith("002"),
+    "sz_cyb": lambda s: s["exchange"] == "sz" and s["board"] == "创业板",
+}
+
+
+def make_universe(count=5000, seed=0):
+    """随机生成 count 只股票 [{code, name, exchange, board, listed, group}]，约 3% 为 ST"""
+    rng = random.Random(seed)
+    used = set()
+    stocks = []
+    while len(stocks) < count:
+        prefix, exchange, board, group = rng.choices(_BOARDS, _WEIGHTS)[0]
+        code = f"{prefix}{rng.randrange(1000):03d}"
+        if code in used:
+            continue
+        used.add(code)
+        name = "".join(rng.choice(_NAME_CHARS) for _ in range(4))
+        if rng.random() < 0.03:
+            name = rng.choice(["ST", "*ST"]) + name[:3]
+        listed = f"{rng.randint(1991, 2024)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+        stocks.append({"code": code, "name": name, "exchange": exchange, "board": board, "listed": listed,
+                       "group": group})
+    stocks.sort(key=lambda s: s["code"])
+    return stocks
+
+
+def _sse_item(stock):
+    return {
+        "SECURITY_CODE_A": stock["code"], "SECURITY_ABBR_A": stock["name"], "COMPANY_ABBR": stock["name"],
+        "COMPANY_CODE": stock["code"], "LISTING_DATE": stock["listed"], "SECURITY_CODE_B": "-",
+        "SECURITY_ABBR_B": "-", "AREA_NAME_DESC": "北京", "CSRC_CODE_DESC": "制造业", "CHANGE_DATE": "-",
+        "LISTING_BOARD": "1" if stock["board"] == "主板" else "2", "FULL_NAME": stock["name"] + "股份有限公司",
+    }
+
+
+def _szse_item(stock):
+    listed = f"{stock['listed'][:4]}-{stock['listed'][4:6]}-{stock['listed'][6:]}"
+    if stock["board"] == "B股":
+        return {"bk": "主板", "gsjc": stock["name"], "bgdm": stock["code"], "bgjc": stock["name"],
+                "bgssrq": listed, "bgzgb": "100,000,000", "bgltgb": "100,000,000", "sshymc": "C 制造业"}
+    return {"bk": stock["board"], "gsjc": stock["name"], "gsqc": stock["name"] + "股份有限公司",
+            "agdm": stock["code"], "agjc": stock["name"], "agssrq": listed, "agzgb": "1,000,000,000",
+            "agltgb": "800,000,000", "sshymc": "C 制造业", "http": "www.example.com"}
+
+
+def _sina_item(stock, rng):
+    price = rng.uniform(3, 100)
+    return {
+        "symbol": stock["exchange"] + stock["code"], "code": stock["code"], "name": stock["name"],
+        "trade": f"{price:.3f}", "pricechange": "0.120", "changepercent": "1.205", "buy": f"{price:.3f}",
+        "sell": f"{price + 0.01:.3f}", "settlement": f"{price:.3f}", "open": f"{price:.3f}",
+        "high": f"{price * 1.02:.3f}", "low": f"{price * 0.98:.3f}", "volume": 1234567, "amount": 98765432,
+        "ticktime": "15:00:00", "per": 21.5, "pb": 2.1, "mktcap": 1234567.8, "nmc": 987654.3,
+        "turnoverratio": 1.23,
+    }
+
+
+def _page(rows, page, size):
+    start = (page - 1) * size
+    return rows[start:start + size], max(1, (len(rows) + size - 1) // size)
+
+
+class _ExchangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        stub = self.server.stub
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        endpoint = {SSE_PATH: "sse", SZSE_PATH: "szse", SINA_PATH: "sina"}.get(url.path)
+        if url.path == "/stats":
+            self._send(200, json.dumps({"requests": dict(stub.requests)}))
+            return
+        if endpoint is None:
+            self._send(404, "not found")
+            return
+        stub.count(endpoint)
+        stub.wait()
+        fault = stub.faults.get(endpoint)
+        if fault == "error":
+            self._send(500, "Internal Server Error")
+        elif fault == "null":
+            self._send(200, "null")
+        elif fault == "html":
+            self._send(200, "<html><body>访问过于频繁，请稍后再试</body></html>", "text/html; charset=utf-8")
+        else:
+            self._send(200, getattr(stub, endpoint)(query, empty=fault == "empty"))
+
+    def _send(self, status, text, content_type="application/json; charset=utf-8"):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ExchangeStub:
+    """模拟上交所、深交所和新浪的股票列表接口"""
+    def __init__(self, stocks=None, http_address="127.0.0.1:0", latency=0.0, slow_rate=0.0, slow_latency=1.0,
+                 faults=None, seed=0):
+        self.stocks = make_universe(seed=seed) if stocks is None else stocks
+        self.latency = latency
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.faults = dict(faults or {})  # 接口 (sse/szse/sina) -> 故障类型
+        self.requests = Counter()
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+        host, _, port = http_address.rpartition(":")
+        self.http_server = ThreadingHTTPServer((host, int(port)), _ExchangeHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.stub = self
+        self.http_address = "%s:%d" % self.http_server.server_address[:2]
+
+    @property
+    def url(self):
+        return f"http://{self.http_address}"
+
+    def start(self):
+        threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.http_server.shutdown()
+        self.http_server.server_close()
+
+    def count(self, endpoint):
+        with self.lock:
+            self.requests[endpoint] += 1
+
+    def wait(self):
+        with self.lock:
+            slow = self.rng.random() < self.slow_rate
+        delay = self.latency + (self.slow_latency if slow else 0.0)
+        if delay:
+            time.sleep(delay)
+
+    def sse(self, query, empty=False):
+        group = query.get("stockType", "1")
+        rows = [] if empty else [s for s in self.stocks if s["exchange"] == "sh" and s["group"] == group]
+        page = int(query.get("pageHelp.beginPage", 1))
+        size = int(query.get("pageHelp.pageSize", 25))
+        data, pages = _page(rows, page, size)
+        return json.dumps({"pageHelp": {"pageNo": page, "pageSize": size, "pageCount": pages, "total": len(rows),
+                                        "data": [_sse_item(s) for s in data]}}, ensure_ascii=False)
+
+    def szse(self, query, empty=False):
+        tab = query.get("TABKEY", "tab1")
+        rows = [] if empty else [s for s in self.stocks if s["exchange"] == "sz" and s["group"] == tab]
+        page = int(query.get("PAGENO", 1))
+        data, pages = _page(rows, page, SZSE_PAGE_SIZE)
+        return json.dumps([{"metadata": {"tabkey": tab, "name": "股票列表", "pageno": page, "pagesize": SZSE_PAGE_SIZE,
+                                         "pagecount": pages, "recordcount": len(rows)},
+                            "data": [_szse_item(s) for s in data]}], ensure_ascii=False)
+
+    def sina(self, query, empty=False):
+        node = query.get("node", "")
+        match = _SINA_BLOCKS.get(node)
+        if match is None:
+            exchange, prefix = node[:2], node[2:]
+            match = lambda s: s["exchange"] == exchange and prefix.isdigit() and s["code"].startswith(prefix)
+        rows = [] if empty else [s for s in self.stocks if match(s)]
+        data, _ = _page(rows, int(query.get("page", 1)), int(query.get("num", 40)))
+        if not data:
+            return "null"
+        return json.dumps([_sina_item(s, self.rng) for s in data], ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地模拟的交易所股票列表接口")
+    parser.add_argument("--http", default="127.0.0.1:8767", help="HTTP地址 (默认 %(default)s)")
+    parser.add_argument("--stocks", type=int, default=5000, help="生成的股票数量 (默认 %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子 (默认 %(default)s)")
+    parser.add_argument("--latency", type=float, default=0.0, help="每次请求的延迟（秒）")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="额外变慢的请求比例")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="变慢的请求额外等待的秒数 (默认 %(default)s)")
+    parser.add_argument("--fault", action="append", default=[], metavar="接口=故障",
+                        help=f"让某个接口 (sse/szse/sina) 出故障 ({'/'.join(FAULTS)})，可重复")
+    args = parser.parse_args(argv)
+
+    faults = dict(item.split("=", 1) for item in args.fault)
+    if not set(faults) <= {"sse", "szse", "sina"} or not set(faults.values()) <= set(FAULTS):
+        parser.error(f"--fault 格式为 sse|szse|sina={'|'.join(FAULTS)}")
+    stub = ExchangeStub(make_universe(args.stocks, args.seed), args.http, args.latency, args.slow_rate,
+                        args.slow_latency, faults, args.seed)
+    stub.start()
+    print(f"模拟交易所接口: {stub.url}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    stub.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,277 +1,388 @@
-import requests
+"""获取A股上市公司列表，写入 stock_list.json（代码 -> 名称）和 universe.db（基础信息库）
+
+每页返回边下载边解析，逐条产出记录，不把整页文本和整棵对象树留在内存里；
+记录按代码排序后分段写入临时文件，最后多路归并、合并重复代码，按顺序写出结果。
+内存只和单页、单段的大小有关，不随股票总数增长。
+
+用法:
+    python fetch_stock_list.py
+    python fetch_stock_list.py --host http://127.0.0.1:8767 --no-pause   # 本地模拟接口（见 exchange_stub.py）
+"""
+import os
 import json
 import time
+import heapq
 import random
+import argparse
+import tempfile
+from collections import Counter
+
+import requests
 from bs4 import BeautifulSoup
 
-def fetch_sh_stocks():
-    """获取上海证券交易所上市公司列表"""
-    print("正在获取上海证券交易所股票...")
+from universe import UniverseStore, UNIVERSE_DB, LISTED
+
+# 各接口的地址，可用 --host 指向本地模拟接口（见 exchange_stub.py）
+SSE_HOST = "http://query.sse.com.cn"
+SZSE_HOST = "http://www.szse.cn"
+SINA_HOST = "http://vip.stock.finance.sina.com.cn"
+PAUSE_SCALE = 1.0  # 请求间隔的倍数，对本地模拟接口测速时设为 0
+
+COMPLETE_RATIO = 0.9  # 某交易所抓到的数量不少于库中已上市数量的这个比例，才把没出现的代码记为退市
+CHUNK_SIZE = 64 * 1024  # 下载时每次读取的字节数
+RUN_SIZE = 5000  # 每段排序后写入临时文件的记录数
+
+SINA_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Referer": "http://vip.stock.finance.sina.com.cn/"
+}
+
+
+def _pause(seconds):
+    """两次请求之间的间隔，避免请求过快"""
+    if PAUSE_SCALE:
+        time.sleep(seconds * PAUSE_SCALE)
+
+
+def _listing_date(value):
+    """上市日期统一成 YYYY-MM-DD，无法识别时为 None"""
+    digits = "".join(ch for ch in str(value or "") if ch.isdigit())
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:8]}" if len(digits) >= 8 else None
+
+
+def _record(code, name, exchange, board=None, listed=None):
+    """一只股票的基础信息，写入 universe.db 的一行"""
+    return {"code": code, "name": name, "exchange": exchange, "board": board, "listed": _listing_date(listed)}
+
+
+def _array_start(buffer, key):
+    """要逐条解析的数组在 buffer 中的起点（'[' 之后），数组为 null 时为 -1，内容还不够判断时为 None"""
+    pos = 0
+    while True:
+        if key is not None:
+            found = buffer.find(f'"{key}"', pos)
+            if found < 0:
+                return None
+            pos = found + len(key) + 2
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos >= len(buffer):
+                return None
+            if buffer[pos] != ":":
+                continue  # 是某个字符串值，不是键
+            pos += 1
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        if pos >= len(buffer):
+            return None
+        if buffer[pos] == "[":
+            return pos + 1
+        if buffer.startswith("null", pos):
+            return -1
+        if "null".startswith(buffer[pos:]):
+            return None  # null 还没收完整
+        raise ValueError(f"返回内容不是预期的 JSON: {buffer[pos:pos + 40]!r}")
+
+
+def iter_json_rows(chunks, key=None):
+    """从分块到达的 JSON 文本中逐个解析数组里的元素
+
+    key 为 None 时数组在最外层（新浪），否则解析第一个名为 key 的数组（上交所 pageHelp.data、深交所 data）。
+    整个返回为 null（key 为 None 时还包括空白）或该数组为 null 时不产出任何元素；内容不是预期的格式或没有收完整时抛出 ValueError。
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = None  # 数组中下一个元素的位置，None 表示还没找到数组
+    for chunk in chunks:
+        buffer += chunk
+        if pos is None:
+            pos = _array_start(buffer, key)
+            if pos is None:
+                continue
+            if pos < 0:
+                return
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                return
+            try:
+                row, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                break  # 这个元素还没收完整
+            yield row
+            pos = end
+        buffer = buffer[pos:]
+        pos = 0
+    if pos is None and (buffer.strip() == "null" or key is None and not buffer.strip()):
+        return  # 新浪没有数据的节点返回 null 或空白
+    raise ValueError("返回内容不完整或不是预期的 JSON")
+
+
+def _get_rows(url, headers, key=None, timeout=None):
+    """请求一页并逐条产出其中的记录"""
+    response = requests.get(url, headers=headers, timeout=timeout, stream=True)
+    response.encoding = 'utf-8'
+    with response:
+        yield from iter_json_rows(response.iter_content(CHUNK_SIZE, decode_unicode=True), key)
+
+
+def _collect(records):
+    """{代码: 记录}，同一代码以最先抓到的为准"""
     stocks = {}
-    
-    # 上交所主板、科创板
-    url = "http://www.sse.com.cn/assortment/stock/list/share/"
+    for record in records:
+        stocks.setdefault(record["code"], record)
+    return stocks
+
+
+def iter_sh_stocks():
+    """逐条产出上海证券交易所上市公司，官方接口出错时改用新浪接口"""
+    print("正在获取上海证券交易所股票...")
+    count = 0
     headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
-        "Referer": "http://www.sse.com.cn/",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7"
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+        "Referer": "http://www.sse.com.cn/assortment/stock/list/share/",
+        "Accept": "application/json, text/javascript, */*; q=0.01"
     }
     
     try:
-        # 上交所主板数据
-        response = requests.get("http://query.sse.com.cn/security/stock/getStockListData.do?stockType=1&pageHelp.beginPage=1&pageHelp.pageSize=2000", 
-                                headers={
-                                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                                    "Referer": "http://www.sse.com.cn/assortment/stock/list/share/",
-                                    "Accept": "application/json, text/javascript, */*; q=0.01"
-                                })
-        response.encoding = 'utf-8'
-        data = response.json()
-        
-        for item in data.get('pageHelp', {}).get('data', []):
-            stock_code = item.get('SECURITY_CODE_A', '')
-            stock_name = item.get('SECURITY_ABBR_A', '')
-            if stock_code and stock_name:
-                stocks[stock_code] = stock_name
-        
-        # 科创板数据
-        response = requests.get("http://query.sse.com.cn/security/stock/getStockListData.do?stockType=8&pageHelp.beginPage=1&pageHelp.pageSize=1000", 
-                                headers={
-                                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                                    "Referer": "http://www.sse.com.cn/assortment/stock/list/share/",
-                                    "Accept": "application/json, text/javascript, */*; q=0.01"
-                                })
-        response.encoding = 'utf-8'
-        data = response.json()
-        
-        for item in data.get('pageHelp', {}).get('data', []):
-            stock_code = item.get('SECURITY_CODE_A', '')
-            stock_name = item.get('SECURITY_ABBR_A', '')
-            if stock_code and stock_name:
-                stocks[stock_code] = stock_name
+        # 上交所主板、科创板
+        for stock_type, board, page_size in ((1, "主板", 2000), (8, "科创板", 1000)):
+            url = (f"{SSE_HOST}/security/stock/getStockListData.do?stockType={stock_type}"
+                   f"&pageHelp.beginPage=1&pageHelp.pageSize={page_size}")
+            for item in _get_rows(url, headers, key="data"):
+                stock_code = item.get('SECURITY_CODE_A', '')
+                stock_name = item.get('SECURITY_ABBR_A', '')
+                if stock_code and stock_name:
+                    count += 1
+                    yield _record(stock_code, stock_name, "sh", board, item.get('LISTING_DATE'))
                 
-        print(f"上海证券交易所股票获取成功，共 {len(stocks)} 只")
-        return stocks
+        print(f"上海证券交易所股票获取成功，共 {count} 只")
         
     except Exception as e:
         print(f"获取上交所数据出错: {e}")
-        # 如果API请求失败，尝试备用方法：通过新浪接口获取
-        return fetch_sh_stocks_from_sina()
+        # 如果API请求失败，尝试备用方法：通过新浪接口获取（已产出的记录在归并时去重）
+        yield from iter_sh_stocks_from_sina()
 
-def fetch_sh_stocks_from_sina():
-    """通过新浪财经接口获取上交所股票列表（备用方法）"""
-    stocks = {}
+def _iter_sina_node(node, exchange, num=1000, label=None):
+    """逐条产出新浪一个节点的股票，出错时打印并跳过这个节点"""
+    label = label or node
+    url = f"{SINA_HOST}/quotes_service/api/json_v2.php/Market_Center.getHQNodeData?page=1&num={num}&sort=symbol&asc=1&node={node}&symbol=&_s_r_a=init"
+    count = 0
     try:
-        # 获取上交所主板股票
-        for prefix in ['60', '61', '68']:
-            for i in range(10):
-                base = f"{prefix}{i}00"
-                url = f"http://vip.stock.finance.sina.com.cn/quotes_service/api/json_v2.php/Market_Center.getHQNodeData?page=1&num=1000&sort=symbol&asc=1&node=sh{base}&symbol=&_s_r_a=init"
-                
-                response = requests.get(url, headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                    "Referer": "http://vip.stock.finance.sina.com.cn/"
-                })
-                response.encoding = 'utf-8'
-                
-                if response.text.strip() and response.text != "null":
-                    try:
-                        data = json.loads(response.text)
-                        for item in data:
-                            code = item.get('symbol', '').replace('sh', '')
-                            name = item.get('name', '')
-                            if code and name:
-                                stocks[code] = name
-                    except:
-                        pass
-                
-                time.sleep(0.5)  # 避免请求过快
+        for item in _get_rows(url, SINA_HEADERS, timeout=10):
+            code = item.get('symbol', '').replace(exchange, '')
+            name = item.get('name', '')
+            if code and name:
+                count += 1
+                yield _record(code, name, exchange)
+        if count:
+            print(f"获取到 {label} 股票 {count} 只")
     except Exception as e:
-        print(f"通过新浪获取上交所数据出错: {e}")
-    
-    return stocks
+        print(f"获取 {label} 数据出错: {e}")
 
-def fetch_sz_stocks():
-    """获取深圳证券交易所上市公司列表"""
+def iter_sh_stocks_from_sina():
+    """通过新浪财经接口逐条产出上交所股票（备用方法）"""
+    # 获取上交所主板股票
+    for prefix in ['60', '61', '68']:
+        for i in range(10):
+            yield from _iter_sina_node(f"sh{prefix}{i}00", "sh", label=f"{prefix}{i}00 前缀")
+            _pause(0.5)  # 避免请求过快
+
+def iter_sz_stocks():
+    """逐条产出深圳证券交易所上市公司，官方接口数量过少或出错时再用新浪接口补充"""
     print("正在获取深圳证券交易所股票...")
-    stocks = {}
+    count = 0
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+        "Accept": "application/json, text/javascript, */*; q=0.01",
+        "Referer": "http://www.szse.cn/market/product/stock/list/index.html"
+    }
     
     try:
-        # 尝试从官方API获取
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Accept": "application/json, text/javascript, */*; q=0.01",
-            "Referer": "http://www.szse.cn/market/product/stock/list/index.html"
-        }
-        
-        # 深交所主板
-        response = requests.get(
-            "http://www.szse.cn/api/report/ShowReport/data?SHOWTYPE=JSON&CATALOGID=1110&TABKEY=tab1&random=" + str(random.random()),
-            headers=headers
-        )
-        response.encoding = 'utf-8'
-        
-        try:
-            data = response.json()
-            if data and isinstance(data, list) and len(data) > 0:
-                for item in data[0].get('data', []):
+        # 深交所主板、中小板、创业板
+        for board_type in ["tab1", "tab2", "tab3"]:
+            url = (f"{SZSE_HOST}/api/report/ShowReport/data?SHOWTYPE=JSON&CATALOGID=1110&TABKEY={board_type}"
+                   f"&random={random.random()}")
+            try:
+                for item in _get_rows(url, headers, key="data"):
                     code = item.get('agdm', '')  # 股票代码
                     name = item.get('agjc', '')  # 股票简称
                     if code and name:
-                        stocks[code] = name
-        except:
-            pass
-            
-        # 中小板、创业板
-        for board_type in ["tab2", "tab3"]:
-            response = requests.get(
-                f"http://www.szse.cn/api/report/ShowReport/data?SHOWTYPE=JSON&CATALOGID=1110&TABKEY={board_type}&random=" + str(random.random()),
-                headers=headers
-            )
-            response.encoding = 'utf-8'
-            
-            try:
-                data = response.json()
-                if data and isinstance(data, list) and len(data) > 0:
-                    for item in data[0].get('data', []):
-                        code = item.get('agdm', '')  # 股票代码
-                        name = item.get('agjc', '')  # 股票简称
-                        if code and name:
-                            stocks[code] = name
-            except:
+                        count += 1
+                        yield _record(code, name, "sz", item.get('bk'), item.get('agssrq'))
+            except ValueError:
                 pass
-            
-            time.sleep(0.5)  # 避免请求过快
+            if board_type != "tab1":
+                _pause(0.5)  # 避免请求过快
         
-        if len(stocks) < 100:  # 如果获取数量太少，可能是接口问题，使用备用方法
+        if count < 100:  # 如果获取数量太少，可能是接口问题，使用备用方法
             print("深交所官方API获取股票数量过少，切换到备用方法")
-            return fetch_sz_stocks_from_sina()
+            yield from iter_sz_stocks_from_sina()
+            return
             
-        print(f"深圳证券交易所股票获取成功，共 {len(stocks)} 只")
-        return stocks
+        print(f"深圳证券交易所股票获取成功，共 {count} 只")
         
     except Exception as e:
         print(f"获取深交所数据出错: {e}")
         # 备用方法
-        return fetch_sz_stocks_from_sina()
+        yield from iter_sz_stocks_from_sina()
+
+def iter_sz_stocks_from_sina():
+    """通过新浪财经接口逐条产出深交所股票（备用方法）"""
+    # 获取深交所股票（主板、中小板、创业板）
+    # 使用更全面的前缀列表，覆盖深交所所有股票类型
+    for prefix in ['00', '30', '001', '002', '003', '004', '300', '301']:
+        # 两位前缀尝试所有可能的第三位数字，三位前缀直接请求
+        bases = [f"{prefix}{i}" for i in range(10)] if len(prefix) == 2 else [prefix]
+        for base in bases:
+            yield from _iter_sina_node(f"sz{base}", "sz", label=f"{base} 前缀")
+            _pause(0.2)  # 避免请求过快
+            
+    # 尝试直接获取深交所板块分类的股票数据
+    for block in ['sz_a', 'sz_b', 'sz_main', 'sz_zxb', 'sz_cyb']:
+        yield from _iter_sina_node(block, "sz", num=2000, label=f"{block} 板块")
+        _pause(0.2)  # 避免请求过快
+
+def fetch_sh_stocks():
+    """获取上海证券交易所上市公司列表 {代码: 记录}"""
+    return _collect(iter_sh_stocks())
+
+def fetch_sh_stocks_from_sina():
+    """通过新浪财经接口获取上交所股票列表（备用方法）"""
+    return _collect(iter_sh_stocks_from_sina())
+
+def fetch_sz_stocks():
+    """获取深圳证券交易所上市公司列表 {代码: 记录}"""
+    return _collect(iter_sz_stocks())
 
 def fetch_sz_stocks_from_sina():
     """通过新浪财经接口获取深交所股票列表（备用方法）"""
-    stocks = {}
-    try:
-        # 获取深交所股票（主板、中小板、创业板）
-        # 使用更全面的前缀列表，覆盖深交所所有股票类型
-        for prefix in ['00', '30', '001', '002', '003', '004', '300', '301']:
-            # 对每个前缀进行请求
-            if len(prefix) == 2:
-                # 两位前缀，尝试所有可能的第三位数字
-                for i in range(10):
-                    base = f"{prefix}{i}"
-                    url = f"http://vip.stock.finance.sina.com.cn/quotes_service/api/json_v2.php/Market_Center.getHQNodeData?page=1&num=1000&sort=symbol&asc=1&node=sz{base}&symbol=&_s_r_a=init"
-                    
-                    try:
-                        response = requests.get(url, headers={
-                            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                            "Referer": "http://vip.stock.finance.sina.com.cn/"
-                        }, timeout=10)
-                        response.encoding = 'utf-8'
-                        
-                        if response.text.strip() and response.text != "null":
-                            try:
-                                data = json.loads(response.text)
-                                for item in data:
-                                    code = item.get('symbol', '').replace('sz', '')
-                                    name = item.get('name', '')
-                                    if code and name:
-                                        stocks[code] = name
-                                print(f"获取到 {prefix}{i} 前缀股票 {len(data)} 只")
-                            except Exception as e:
-                                print(f"解析 {prefix}{i} 数据出错: {e}")
-                    except Exception as e:
-                        print(f"请求 {prefix}{i} 出错: {e}")
-                        
-                    time.sleep(0.2)  # 避免请求过快
-            else:
-                # 三位前缀，直接请求
-                url = f"http://vip.stock.finance.sina.com.cn/quotes_service/api/json_v2.php/Market_Center.getHQNodeData?page=1&num=1000&sort=symbol&asc=1&node=sz{prefix}&symbol=&_s_r_a=init"
-                try:
-                    response = requests.get(url, headers={
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                        "Referer": "http://vip.stock.finance.sina.com.cn/"
-                    }, timeout=10)
-                    response.encoding = 'utf-8'
-                    
-                    if response.text.strip() and response.text != "null":
-                        try:
-                            data = json.loads(response.text)
-                            for item in data:
-                                code = item.get('symbol', '').replace('sz', '')
-                                name = item.get('name', '')
-                                if code and name:
-                                    stocks[code] = name
-                            print(f"获取到 {prefix} 前缀股票 {len(data)} 只")
-                        except Exception as e:
-                            print(f"解析 {prefix} 数据出错: {e}")
-                except Exception as e:
-                    print(f"请求 {prefix} 出错: {e}")
-                    
-                time.sleep(0.2)  # 避免请求过快
-                
-        # 尝试直接获取深交所板块分类的股票数据
-        block_codes = ['sz_a', 'sz_b', 'sz_main', 'sz_zxb', 'sz_cyb']
-        for block in block_codes:
-            url = f"http://vip.stock.finance.sina.com.cn/quotes_service/api/json_v2.php/Market_Center.getHQNodeData?page=1&num=2000&sort=symbol&asc=1&node={block}&symbol=&_s_r_a=init"
-            try:
-                response = requests.get(url, headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                    "Referer": "http://vip.stock.finance.sina.com.cn/"
-                }, timeout=10)
-                response.encoding = 'utf-8'
-                
-                if response.text.strip() and response.text != "null":
-                    try:
-                        data = json.loads(response.text)
-                        for item in data:
-                            code = item.get('symbol', '').replace('sz', '')
-                            name = item.get('name', '')
-                            if code and name:
-                                stocks[code] = name
-                        print(f"获取到 {block} 板块股票 {len(data)} 只")
-                    except Exception as e:
-                        print(f"解析 {block} 数据出错: {e}")
-            except Exception as e:
-                print(f"请求 {block} 出错: {e}")
-                
-            time.sleep(0.2)  # 避免请求过快
-                
-        print(f"通过新浪获取深交所股票成功，共 {len(stocks)} 只")
-    except Exception as e:
-        print(f"通过新浪获取深交所数据出错: {e}")
-    
+    stocks = _collect(iter_sz_stocks_from_sina())
+    print(f"通过新浪获取深交所股票成功，共 {len(stocks)} 只")
     return stocks
 
-def main():
-    print("开始获取A股上市公司列表...")
-    
-    # 获取上交所股票
-    sh_stocks = fetch_sh_stocks()
-    
-    # 获取深交所股票
-    sz_stocks = fetch_sz_stocks()
-    
-    # 合并两个交易所的数据
-    all_stocks = {**sh_stocks, **sz_stocks}
-    
-    # 按股票代码排序
-    sorted_stocks = {k: all_stocks[k] for k in sorted(all_stocks.keys())}
-    
-    print(f"获取完成，共 {len(sorted_stocks)} 只股票")
+
+class SortedRuns:
+    """按代码排序、分段写入临时文件的记录；merge() 多路归并并合并重复的代码
+
+    每条记录在内存中只是一个元组，缓冲区满 run_size 条就排序后写出，内存不随记录总数增长。
+    """
+    FIELDS = ["code", "seq", "name", "exchange", "board", "listed"]
+
+    def __init__(self, run_size=RUN_SIZE):
+        self.run_size = run_size
+        self.buffer = []
+        self.runs = []
+        self.count = 0
+
+    def add(self, record):
+        # seq 保持抓取顺序：同一代码先抓到的排在前面
+        self.buffer.append((record["code"], self.count, record["name"], record["exchange"],
+                            record["board"], record["listed"]))
+        self.count += 1
+        if len(self.buffer) >= self.run_size:
+            self._spill()
+
+    def _spill(self):
+        self.buffer.sort()
+        run = tempfile.TemporaryFile("w+", encoding="utf-8")
+        for row in self.buffer:
+            run.write(json.dumps(row, ensure_ascii=False))
+            run.write("\n")
+        self.runs.append(run)
+        self.buffer = []
+
+    def _read(self, run):
+        run.seek(0)
+        for line in run:
+            yield tuple(json.loads(line))
+
+    def merge(self):
+        """按代码顺序产出去重后的记录，同一代码的各字段取最先抓到的非空值；可以多次调用"""
+        self.buffer.sort()
+        current = None
+        for row in heapq.merge(self.buffer, *(self._read(run) for run in self.runs)):
+            if current is not None and row[0] == current[0]:
+                for i in range(2, len(row)):
+                    if not current[i]:
+                        current[i] = row[i]
+                continue
+            if current is not None:
+                yield self._record(current)
+            current = list(row)
+        if current is not None:
+            yield self._record(current)
+
+    def _record(self, row):
+        record = dict(zip(self.FIELDS, row))
+        del record["seq"]
+        return record
+
+    def close(self):
+        for run in self.runs:
+            run.close()
+        self.runs = []
+        self.buffer = []
+
+
+def write_stock_list(records, path='stock_list.json'):
+    """按顺序逐条写出 {代码: 名称}，格式与 json.dump(indent=2) 相同；先写临时文件再替换。返回各交易所的数量"""
+    counts = Counter()
+    temp = path + ".tmp"
+    with open(temp, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(",\n  " if counts else "{\n  ")
+            f.write(f"{json.dumps(record['code'])}: {json.dumps(record['name'], ensure_ascii=False)}")
+            counts[record["exchange"]] += 1
+        f.write("\n}" if counts else "{}")
+    os.replace(temp, path)
+    return counts
+
+def main(argv=None):
+    global SSE_HOST, SZSE_HOST, SINA_HOST, PAUSE_SCALE
+    parser = argparse.ArgumentParser(description="获取A股上市公司列表，写入 stock_list.json 和 universe.db")
+    parser.add_argument("--host", help="所有接口改用这个地址，例如本地模拟接口 http://127.0.0.1:8767")
+    parser.add_argument("--no-pause", action="store_true", help="请求之间不等待（只用于本地模拟接口）")
+    args = parser.parse_args(argv)
+    if args.host:
+        SSE_HOST = SZSE_HOST = SINA_HOST = args.host.rstrip("/")
+    if args.no_pause:
+        PAUSE_SCALE = 0
     
-    # 保存到JSON文件
-    with open('stock_list.json', 'w', encoding='utf-8') as f:
-        json.dump(sorted_stocks, f, ensure_ascii=False, indent=2)
+    print("开始获取A股上市公司列表...")
     
-    print(f"数据已保存到 stock_list.json")
+    # 两个交易所的记录边抓边写入排序段，不在内存中合并
+    runs = SortedRuns()
+    try:
+        for record in iter_sh_stocks():
+            runs.add(record)
+        for record in iter_sz_stocks():
+            runs.add(record)
+        
+        # 归并去重后按代码顺序写出JSON文件
+        counts = write_stock_list(runs.merge(), 'stock_list.json')
+        print(f"获取完成，共 {sum(counts.values())} 只股票")
+        print(f"数据已保存到 stock_list.json")
+        
+        # 再归并一次写入基础信息库（板块、上市日期、改名和退市记录）
+        save_universe(runs.merge(), counts)
+    finally:
+        runs.close()
+
+
+def save_universe(records, fetched, path=UNIVERSE_DB):
+    """在一个事务中写入 universe.db；fetched 为各交易所抓到的数量，抓得不全的交易所不标记退市"""
+    with UniverseStore(path) as store:
+        listed = dict(store.conn.execute(
+            "SELECT exchange, COUNT(*) FROM stocks WHERE status = ? GROUP BY exchange", (LISTED,)))
+        exchanges = [exchange for exchange, count in fetched.items()
+                     if count and count >= listed.get(exchange, 0) * COMPLETE_RATIO]
+        counts = store.upsert(records, exchanges=exchanges)
+    print(f"数据已写入 {path}：新增 {counts['added']}，改名 {counts['renamed']}，"
+          f"退市 {counts['delisted']}，重新上市 {counts['relisted']}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,303 @@
+"""技术指标：MA、EMA、VWAP、RSI、MACD、布林带
+
+两种算法给出逐位相同的结果:
+    IndicatorState.update(price, volume)   每来一个价格 O(1) 更新，只用标准库，供托盘逐tick使用
+    backfill(prices, volumes)              对历史数组一次算完（需要 numpy），并返回可接着流式更新的状态
+
+为了逐位相同，两边做完全相同的浮点运算、相同的顺序:
+    移动平均和布林带用"加上新值减去出窗旧值"的滑动和，批量时对这些增量做 np.cumsum（顺序累加）；
+    EMA 类递推（EMA、MACD、RSI 的平滑）批量时用 frompyfunc(...).accumulate 逐项做同样的 Python 浮点运算。
+窗口未满时该指标为 nan。
+
+    tracker = IndicatorTracker()
+    values = tracker.update("603019", quote)     # {指标名: 值}，每个行情 tick 一个样本
+
+托盘显示的是日线指标（DailyIndicatorTracker）：用本地日K回填到上一个交易日，
+盘中把最新价当作当天的收盘价计算，不改动状态；换日时再把前一天计入状态。
+"""
+import math
+from array import array
+
+MA_PERIODS = (5, 10, 20)
+EMA_PERIOD = 12
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+RSI_PERIOD = 14
+BOLL_PERIOD, BOLL_WIDTH = 20, 2.0
+
+WINDOW = max(MA_PERIODS + (BOLL_PERIOD,))  # 环形缓冲区长度
+
+NAMES = [f"ma{n}" for n in MA_PERIODS] + [
+    "ema", "vwap", "rsi", "macd", "macd_signal", "macd_hist", "boll_mid", "boll_upper", "boll_lower",
+]
+
+NAN = float("nan")
+
+
+def _alpha(period):
+    return 2.0 / (period + 1)
+
+
+EMA_ALPHA = _alpha(EMA_PERIOD)
+FAST_ALPHA = _alpha(MACD_FAST)
+SLOW_ALPHA = _alpha(MACD_SLOW)
+SIGNAL_ALPHA = _alpha(MACD_SIGNAL)
+RSI_ALPHA = 1.0 / RSI_PERIOD  # Wilder 平滑
+
+_MA_KEYS = [(k, period, f"ma{period}") for k, period in enumerate(MA_PERIODS)]
+_BOLL_SUM = MA_PERIODS.index(BOLL_PERIOD)  # 布林带中轨复用同周期均线的滑动和
+
+
+class IndicatorState:
+    """单只股票的指标状态，约 20 个浮点数加一个 WINDOW 长的环形缓冲区"""
+    __slots__ = ("count", "ring", "sums", "square_sum", "last_price", "ema", "fast", "slow", "signal",
+                 "avg_gain", "avg_loss", "pv", "volume")
+
+    def __init__(self):
+        self.count = 0
+        self.ring = array("d", bytes(8 * WINDOW))  # 最近 WINDOW 个价格
+        self.sums = array("d", bytes(8 * len(MA_PERIODS)))  # 各均线窗口内价格之和
+        self.square_sum = 0.0  # 布林带窗口内价格平方和
+        self.last_price = 0.0
+        self.ema = self.fast = self.slow = self.signal = 0.0
+        self.avg_gain = self.avg_loss = 0.0
+        self.pv = 0.0      # VWAP: 价格 x 成交量之和
+        self.volume = 0.0  # VWAP: 成交量之和
+
+    def copy(self):
+        state = IndicatorState()
+        for name in self.__slots__:
+            value = getattr(self, name)
+            setattr(state, name, array("d", value) if isinstance(value, array) else value)
+        return state
+
+    def peek(self, price, volume=0.0):
+        """假如再来一个价格时的指标值，不改动状态"""
+        return self.copy().update(price, volume)
+
+    def reset_vwap(self):
+        """新交易日重新累计 VWAP"""
+        self.pv = 0.0
+        self.volume = 0.0
+
+    def update(self, price, volume=0.0):
+        """加入一个价格（及这段时间的成交量），返回 {指标名: 值}"""
+        price = float(price)
+        volume = float(volume)
+        ring = self.ring
+        i = self.count
+        first = i == 0
+        change = 0.0 if first else price - self.last_price
+
+        # 滑动和：加上新值，减去滑出窗口的旧值（窗口未满时旧值为 0）
+        sums = self.sums
+        for k, period, _ in _MA_KEYS:
+            old = ring[(i - period) % WINDOW] if i >= period else 0.0
+            sums[k] += price - old
+        old = ring[(i - BOLL_PERIOD) % WINDOW] if i >= BOLL_PERIOD else 0.0
+        self.square_sum += price * price - old * old
+        ring[i % WINDOW] = price
+
+        if first:
+            self.ema = self.fast = self.slow = price
+            self.signal = 0.0
+            self.avg_gain = self.avg_loss = 0.0
+        else:
+            self.ema += EMA_ALPHA * (price - self.ema)
+            self.fast += FAST_ALPHA * (price - self.fast)
+            self.slow += SLOW_ALPHA * (price - self.slow)
+            self.signal += SIGNAL_ALPHA * ((self.fast - self.slow) - self.signal)
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            self.avg_gain += RSI_ALPHA * (gain - self.avg_gain)
+            self.avg_loss += RSI_ALPHA * (loss - self.avg_loss)
+        self.pv += price * volume
+        self.volume += volume
+        self.last_price = price
+        self.count = i + 1
+        return self.values()
+
+    def values(self):
+        count = self.count
+        result = {}
+        for k, period, key in _MA_KEYS:
+            result[key] = self.sums[k] / period if count >= period else NAN
+        result["ema"] = self.ema if count else NAN
+        result["vwap"] = self.pv / self.volume if self.volume > 0 else NAN
+        total = self.avg_gain + self.avg_loss
+        if count > RSI_PERIOD:
+            result["rsi"] = 100.0 * self.avg_gain / total if total > 0 else 50.0
+        else:
+            result["rsi"] = NAN
+        macd = self.fast - self.slow
+        result["macd"] = macd if count else NAN
+        result["macd_signal"] = self.signal if count else NAN
+        result["macd_hist"] = macd - self.signal if count else NAN
+        if count >= BOLL_PERIOD:
+            mid = self.sums[_BOLL_SUM] / BOLL_PERIOD
+            variance = self.square_sum / BOLL_PERIOD - mid * mid
+            width = BOLL_WIDTH * math.sqrt(variance if variance > 0 else 0.0)
+            result["boll_mid"], result["boll_upper"], result["boll_lower"] = mid, mid + width, mid - width
+        else:
+            result["boll_mid"] = result["boll_upper"] = result["boll_lower"] = NAN
+        return result
+
+
+def _recurrence(np, values, alpha):
+    """y[0] = x[0]，y[i] = y[i-1] + alpha * (x[i] - y[i-1])，与 IndicatorState 中的写法完全一致"""
+    step = np.frompyfunc(lambda previous, x: previous + alpha * (x - previous), 2, 1)
+    return step.accumulate(values.astype(object)).astype(np.float64)
+
+
+def backfill(prices, volumes=None):
+    """对历史价格（及成交量）批量计算全部指标
+
+    返回 ({指标名: 数组}, IndicatorState)；状态与逐个 update 完全部价格后的相同，之后可继续流式更新。
+    """
+    import numpy as np
+
+    prices = np.asarray(prices, dtype=np.float64)
+    volumes = np.zeros_like(prices) if volumes is None else np.asarray(volumes, dtype=np.float64)
+    n = len(prices)
+    state = IndicatorState()
+    result = {}
+    if n == 0:
+        return {name: np.empty(0) for name in NAMES}, state
+    index = np.arange(n)
+
+    def shifted(values, period):
+        """每个位置滑出窗口的旧值，窗口未满时为 0"""
+        old = np.zeros(n)
+        old[period:] = values[:-period]
+        return old
+
+    sums = {}
+    for period in MA_PERIODS:
+        sums[period] = np.cumsum(prices - shifted(prices, period))
+        result[f"ma{period}"] = np.where(index >= period - 1, sums[period] / period, np.nan)
+    squares = np.cumsum(prices * prices - shifted(prices, BOLL_PERIOD) * shifted(prices, BOLL_PERIOD))
+
+    result["ema"] = ema = _recurrence(np, prices, EMA_ALPHA)
+    fast = _recurrence(np, prices, FAST_ALPHA)
+    slow = _recurrence(np, prices, SLOW_ALPHA)
+    macd = fast - slow
+    # 信号线从 0 开始，第一个价格之后才开始平滑
+    signal = _recurrence(np, np.concatenate(([0.0], macd[1:])), SIGNAL_ALPHA)
+    result["macd"], result["macd_signal"], result["macd_hist"] = macd, signal, macd - signal
+
+    change = np.zeros(n)
+    change[1:] = prices[1:] - prices[:-1]
+    avg_gain = _recurrence(np, np.where(change > 0, change, 0.0), RSI_ALPHA)
+    avg_loss = _recurrence(np, np.where(change < 0, -change, 0.0), RSI_ALPHA)
+    total = avg_gain + avg_loss
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rsi = np.where(total > 0, 100.0 * avg_gain / total, 50.0)
+    result["rsi"] = np.where(index >= RSI_PERIOD, rsi, np.nan)
+
+    pv = np.cumsum(prices * volumes)
+    volume = np.cumsum(volumes)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result["vwap"] = np.where(volume > 0, pv / volume, np.nan)
+
+    mid = sums[BOLL_PERIOD] / BOLL_PERIOD
+    variance = squares / BOLL_PERIOD - mid * mid
+    width = BOLL_WIDTH * np.sqrt(np.where(variance > 0, variance, 0.0))
+    full = index >= BOLL_PERIOD - 1
+    result["boll_mid"] = np.where(full, mid, np.nan)
+    result["boll_upper"] = np.where(full, mid + width, np.nan)
+    result["boll_lower"] = np.where(full, mid - width, np.nan)
+
+    # 接续流式更新所需的状态
+    state.count = n
+    for i in range(max(0, n - WINDOW), n):
+        state.ring[i % WINDOW] = prices[i]
+    for k, period in enumerate(MA_PERIODS):
+        state.sums[k] = sums[period][-1]
+    state.square_sum = float(squares[-1])
+    state.last_price = float(prices[-1])
+    state.ema, state.fast, state.slow, state.signal = float(ema[-1]), float(fast[-1]), float(slow[-1]), float(signal[-1])
+    state.avg_gain, state.avg_loss = float(avg_gain[-1]), float(avg_loss[-1])
+    state.pv, state.volume = float(pv[-1]), float(volume[-1])
+    return result, state
+
+
+class IndicatorTracker:
+    """按代码保存 IndicatorState，用行情字典（成交量为当日累计）逐tick更新"""
+    def __init__(self):
+        self.states = {}
+        self.days = {}        # 代码 -> 最近一笔行情的日期
+        self.volumes = {}     # 代码 -> 上一笔的当日累计成交量
+        self.latest = {}      # 代码 -> 最近一次的指标值
+
+    def update(self, code, quote):
+        state = self.states.get(code)
+        if state is None:
+            state = self.states[code] = IndicatorState()
+        volume = quote["volume"]
+        if self.days.get(code) != quote["date"] or volume < self.volumes.get(code, 0.0):
+            # 新交易日：VWAP 重新累计
+            state.reset_vwap()
+            self.volumes[code] = 0.0
+        self.days[code] = quote["date"]
+        delta = volume - self.volumes[code]
+        self.volumes[code] = volume
+        values = self.latest[code] = state.update(quote["price"], delta)
+        return values
+
+    def get(self, code):
+        return self.latest.get(code)
+
+    def remove(self, code):
+        for table in (self.states, self.days, self.volumes, self.latest):
+            table.pop(code, None)
+
+
+class DailyIndicatorTracker:
+    """按代码保存日线指标状态，行情字典的 date 为交易日
+
+    seed() 用日K回填到某个交易日为止；之后的交易日里，update() 把最新价当作当天收盘价计算（不改动状态），
+    换日时把前一天的最后价格计入状态。没有回填过的代码返回 None，不拿几十个tick冒充日线周期。
+    VWAP 为当天的成交额 / 成交量。
+    """
+    def __init__(self):
+        self.states = {}   # 代码 -> 截至 days[代码] 收盘的 IndicatorState
+        self.days = {}     # 代码 -> 已计入状态的最后一个交易日 'YYYY-MM-DD'
+        self.pending = {}  # 代码 -> (交易日, 价格, 成交量)，还没计入状态的当天K线
+        self.latest = {}   # 代码 -> 最近一次的指标值
+
+    def seed(self, code, days, closes, volumes=None):
+        """用按日期升序的日K回填，days 为各根K线的交易日"""
+        _, self.states[code] = backfill(closes, volumes)
+        self.days[code] = days[-1] if len(days) else ""
+        self.pending.pop(code, None)
+        self.latest.pop(code, None)
+
+    def seeded(self, code):
+        return code in self.states
+
+    def update(self, code, quote):
+        state = self.states.get(code)
+        if state is None:
+            return None
+        day = quote["date"]
+        pending = self.pending.get(code)
+        if pending is not None and day > pending[0]:
+            # 换日：前一天按最后一笔价格收盘
+            state.update(pending[1], pending[2])
+            self.days[code] = pending[0]
+            del self.pending[code]
+        price = quote["price"]
+        if day > self.days[code] and price > 0:
+            self.pending[code] = (day, price, quote["volume"])
+            values = state.peek(price, quote["volume"])
+        else:
+            values = state.values()
+        values["vwap"] = quote["amount"] / quote["volume"] if quote["volume"] > 0 else NAN
+        self.latest[code] = values
+        return values
+
+    def get(self, code):
+        return self.latest.get(code)
+
+    def remove(self, code):
+        for table in (self.states, self.days, self.pending, self.latest):
+            table.pop(code, None)
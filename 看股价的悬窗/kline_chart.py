@@ -0,0 +1,160 @@
+"""K线图窗口：从本地K线缓存读取最近的K线绘制蜡烛图和成交量，打开时在后台补齐缺少的K线"""
+import threading
+
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QButtonGroup
+from PyQt5.QtCore import Qt, QObject, QRectF, QPointF, pyqtSignal
+from PyQt5.QtGui import QPainter, QPen, QColor, QFont
+
+from kline_store import KlineStore, update_history
+from watchlist import UP_COLOR, DOWN_COLOR
+
+CHART_BARS = 120  # 图上显示的K线根数
+CHART_PERIODS = [("日K", "day"), ("60分", "60m"), ("15分", "15m"), ("5分", "5m")]
+VOLUME_RATIO = 0.25  # 成交量区域占图高的比例
+GRID_COLOR = QColor("#EAEAEA")
+TEXT_COLOR = QColor("#666666")
+
+
+class _KlineLoader(QObject):
+    """在后台线程补齐并读取K线，通过信号把结果送回界面线程"""
+    bars_ready = pyqtSignal(str, str, object)
+
+    def __init__(self, store, parent=None, lock=None):
+        super().__init__(parent)
+        self.store = store
+        # KlineStore 的映射缓存不是线程安全的；托盘回填日线指标时也读写K线文件，共用同一把锁
+        self.lock = lock or threading.Lock()
+
+    def load(self, code, period):
+        threading.Thread(target=self._run, args=(code, period), daemon=True).start()
+
+    def _run(self, code, period):
+        with self.lock:
+            # 先把本地已有的画出来，再联网补齐
+            bars = self.store.query(code, period, limit=CHART_BARS)
+            if len(bars["time"]):
+                self.bars_ready.emit(code, period, bars)
+            try:
+                added = update_history(self.store, code, period)
+            except Exception as e:
+                print(f"获取K线数据出错: {e}")
+                added = 0
+            if added or not len(bars["time"]):
+                self.bars_ready.emit(code, period, self.store.query(code, period, limit=CHART_BARS))
+
+
+class KlineChart(QWidget):
+    """蜡烛图 + 成交量柱"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.bars = None
+        self.setMinimumSize(480, 300)
+
+    def set_bars(self, bars):
+        self.bars = bars
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        bars = self.bars
+        if bars is None or not len(bars["time"]):
+            painter.setPen(TEXT_COLOR)
+            painter.drawText(self.rect(), Qt.AlignCenter, "暂无K线数据" if bars is not None else "正在加载...")
+            return
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        painter.setFont(QFont("Microsoft YaHei", 8))
+
+        left, right, top, bottom = 8, 56, 8, 20
+        width = self.width() - left - right
+        height = self.height() - top - bottom
+        price_height = height * (1 - VOLUME_RATIO) - 6
+        volume_top = top + height * (1 - VOLUME_RATIO)
+        volume_height = height * VOLUME_RATIO
+
+        high = float(bars["high"].max())
+        low = float(bars["low"].min())
+        span = (high - low) or 1.0
+        max_volume = float(bars["volume"].max()) or 1.0
+        step = width / CHART_BARS
+        body = max(1.0, step * 0.7)
+
+        def y(price):
+            return top + (high - price) / span * price_height
+
+        # 价格网格和右侧刻度
+        for i in range(5):
+            price = high - span * i / 4
+            painter.setPen(QPen(GRID_COLOR, 1))
+            painter.drawLine(QPointF(left, y(price)), QPointF(left + width, y(price)))
+            painter.setPen(TEXT_COLOR)
+            painter.drawText(QPointF(left + width + 4, y(price) + 4), f"{price:.2f}")
+
+        count = len(bars["time"])
+        offset = CHART_BARS - count  # 不足一屏时靠右画
+        for i in range(count):
+            o, h, l, c = (float(bars[field][i]) for field in ("open", "high", "low", "close"))
+            color = UP_COLOR if c >= o else DOWN_COLOR
+            x = left + (offset + i + 0.5) * step
+            painter.setPen(QPen(color, 1))
+            painter.drawLine(QPointF(x, y(h)), QPointF(x, y(l)))
+            top_y, bottom_y = y(max(o, c)), y(min(o, c))
+            painter.fillRect(QRectF(x - body / 2, top_y, body, max(1.0, bottom_y - top_y)), color)
+            bar_height = float(bars["volume"][i]) / max_volume * volume_height
+            painter.fillRect(QRectF(x - body / 2, volume_top + volume_height - bar_height, body, bar_height), color)
+
+        # 首尾时间
+        painter.setPen(TEXT_COLOR)
+        first, last = str(bars["time"][0]).replace("T", " "), str(bars["time"][-1]).replace("T", " ")
+        if first.endswith(" 00:00:00"):
+            first, last = first[:10], last[:10]
+        painter.drawText(QPointF(left + offset * step, self.height() - 6), first)
+        painter.drawText(QRectF(left, self.height() - 18, width, 16), Qt.AlignRight, last)
+
+
+class KlineWindow(QWidget):
+    """K线图窗口，可切换周期"""
+    def __init__(self, store=None, parent=None, lock=None):
+        super().__init__(parent)
+        self.resize(640, 420)
+        self.code = None
+        self.name = ""
+        self.period = "day"
+        self.loader = _KlineLoader(store or KlineStore(), self, lock)
+        self.loader.bars_ready.connect(self.on_bars_ready)
+
+        layout = QVBoxLayout(self)
+        header = QHBoxLayout()
+        self.title_label = QLabel()
+        header.addWidget(self.title_label, 1)
+        self.period_group = QButtonGroup(self)
+        for label, period in CHART_PERIODS:
+            button = QPushButton(label)
+            button.setCheckable(True)
+            button.setChecked(period == self.period)
+            button.clicked.connect(lambda checked, p=period: self.set_period(p))
+            self.period_group.addButton(button)
+            header.addWidget(button)
+        layout.addLayout(header)
+        self.chart = KlineChart()
+        layout.addWidget(self.chart, 1)
+
+    def set_stock(self, code, name=""):
+        self.code = code
+        self.name = name
+        self.reload()
+
+    def set_period(self, period):
+        self.period = period
+        self.reload()
+
+    def reload(self):
+        self.setWindowTitle(f"K线图 - {self.name} {self.code}")
+        self.title_label.setText(f"{self.name} {self.code}")
+        self.chart.set_bars(None)
+        self.loader.load(self.code, self.period)
+
+    def on_bars_ready(self, code, period, bars):
+        # 切换股票或周期后，旧请求的结果丢弃
+        if code == self.code and period == self.period:
+            self.chart.set_bars(bars)
@@ -0,0 +1,195 @@
+"""本地K线历史：每只股票每个周期一个目录，每个字段一个定长二进制列文件
+
+    kline/day/603019/time     int64，K线时间（秒，按北京时间的字面值，不做时区换算）
+    kline/day/603019/open     float64，以下同
+    kline/day/603019/high  low  close  volume
+
+追加新K线只在各列文件末尾写入；查询时用 mmap 映射时间列二分出范围，
+其余列只读取这一段，不会把整个文件读进内存。
+
+    store = KlineStore()
+    update_history(store, "603019", "day")          # 从新浪拉取缺少的K线并追加
+    bars = store.query("603019", "day", start="2024-01-01")
+    bars["close"][-1], bars["time"][-1]              # time 为 datetime64[s]
+
+需要 numpy（pip install numpy），托盘只在打开K线图时才导入本模块。
+"""
+import os
+import json
+import mmap
+from collections import OrderedDict
+
+import numpy as np
+import requests
+
+from sina_api import SINA_HEADERS, market_prefix
+
+KLINE_DIR = 'kline'
+KLINE_URL = "https://money.finance.sina.com.cn/quotes_service/api/json_v2.php/CN_MarketData.getKLineData"
+MAX_DATALEN = 1023  # 新浪K线接口一次最多返回的条数
+
+FIELDS = ["time", "open", "high", "low", "close", "volume"]
+DTYPES = {field: np.float64 for field in FIELDS}
+DTYPES["time"] = np.int64
+
+# 周期 -> (新浪接口的 scale 分钟数, 每个交易日的K线条数)
+PERIODS = {
+    "day": (240, 1),
+    "60m": (60, 4),
+    "30m": (30, 8),
+    "15m": (15, 16),
+    "5m": (5, 48),
+}
+
+MAP_CACHE_SIZE = 64  # 同时保持映射的 (周期, 代码) 数，每个映射占用一个文件描述符
+
+
+def to_seconds(value):
+    """把 '2024-01-02'、'2024-01-02 10:30:00'、datetime64 等转换成存储用的秒数"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(np.datetime64(value, "s").astype(np.int64))
+
+
+class KlineStore:
+    def __init__(self, root=KLINE_DIR):
+        self.root = root
+        self._maps = OrderedDict()  # (周期, 代码) -> 映射的时间列
+
+    def _dir(self, code, period):
+        if period not in PERIODS:
+            raise ValueError(f"未知K线周期: {period}")
+        return os.path.join(self.root, period, code)
+
+    def _path(self, code, period, field):
+        return os.path.join(self._dir(code, period), field)
+
+    def symbols(self, period="day"):
+        directory = os.path.join(self.root, period)
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def count(self, code, period="day"):
+        """已存的K线条数，以时间列为准（其余列可能因追加中断多出一截）"""
+        try:
+            return os.path.getsize(self._path(code, period, "time")) // 8
+        except OSError:
+            return 0
+
+    def last_time(self, code, period="day"):
+        """最后一根K线的时间（秒），没有数据时为 None"""
+        count = self.count(code, period)
+        if not count:
+            return None
+        with open(self._path(code, period, "time"), "rb") as f:
+            f.seek((count - 1) * 8)
+            return int(np.frombuffer(f.read(8), dtype=np.int64)[0])
+
+    def append(self, code, bars, period="day"):
+        """追加K线，bars 为 {字段: 序列}，time 可以是秒数或日期字符串，须按时间升序
+
+        早于已有最后一根的K线忽略；与最后一根时间相同的覆盖它（盘中未走完的K线会不断更新）。
+        返回新增的条数。
+        """
+        times = np.asarray(bars["time"])
+        if times.dtype.kind in "iu":
+            times = times.astype(np.int64)
+        else:
+            times = times.astype("datetime64[s]").astype(np.int64)
+        if len(times) > 1 and np.any(np.diff(times) <= 0):
+            raise ValueError("K线时间必须严格递增")
+        count = self.count(code, period)
+        last = self.last_time(code, period) if count else None
+        if last is not None:
+            keep = times >= last
+            times = times[keep]
+        else:
+            keep = slice(None)
+        if not len(times):
+            return 0
+        overwrite = last is not None and times[0] == last
+        os.makedirs(self._dir(code, period), exist_ok=True)
+        self._maps.pop((period, code), None)
+
+        # 时间列最后写：中途失败时多出的数据不会被读到，下次追加时截掉
+        for field in FIELDS[1:] + FIELDS[:1]:
+            values = times if field == "time" else np.asarray(bars[field], dtype=DTYPES[field])[keep]
+            path = self._path(code, period, field)
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                start = count - 1 if overwrite else count
+                f.truncate(start * 8)
+                f.seek(start * 8)
+                f.write(np.ascontiguousarray(values, dtype=DTYPES[field]).tobytes())
+        return len(times) - (1 if overwrite else 0)
+
+    def _times(self, code, period):
+        """映射后的时间列（缓存），K线条数变化时重新映射"""
+        key = (period, code)
+        count = self.count(code, period)
+        cached = self._maps.get(key)
+        if cached is not None and len(cached) == count:
+            self._maps.move_to_end(key)
+            return cached
+        if not count:
+            return np.empty(0, dtype=np.int64)
+        with open(self._path(code, period, "time"), "rb") as f:
+            times = np.frombuffer(mmap.mmap(f.fileno(), count * 8, access=mmap.ACCESS_READ), dtype=np.int64)
+        self._maps[key] = times
+        if len(self._maps) > MAP_CACHE_SIZE:
+            self._maps.popitem(last=False)
+        return times
+
+    def _read(self, code, period, field, low, high):
+        """只读取列文件中 [low, high) 这一段"""
+        values = np.empty(high - low, dtype=DTYPES[field])
+        with open(self._path(code, period, field), "rb", buffering=0) as f:
+            f.seek(low * 8)
+            f.readinto(values)
+        return values
+
+    def query(self, code, period="day", start=None, end=None, limit=None):
+        """返回 [start, end] 内的K线 {字段: 数组}，time 为 datetime64[s]
+
+        时间列映射后二分查找范围，其余列只读取这一段；limit 只取范围内最后 limit 根。
+        """
+        times = self._times(code, period)
+        count = len(times)
+        low = 0 if start is None else int(np.searchsorted(times, to_seconds(start), side="left"))
+        high = count if end is None else int(np.searchsorted(times, to_seconds(end), side="right"))
+        if limit is not None:
+            low = max(low, high - limit)
+        bars = {"time": np.array(times[low:high]).view("datetime64[s]")}
+        for field in FIELDS[1:]:
+            bars[field] = self._read(code, period, field, low, high) if high > low else np.empty(0, DTYPES[field])
+        return bars
+
+    def close(self):
+        self._maps.clear()
+
+
+def fetch_kline(code, period="day", datalen=MAX_DATALEN, session=None, timeout=5):
+    """从新浪拉取最近 datalen 根K线，返回 {字段: 列表}（按时间升序）"""
+    http = session or requests
+    scale = PERIODS[period][0]
+    response = http.get(KLINE_URL, params={"symbol": f"{market_prefix(code)}{code}", "scale": scale,
+                                           "ma": "no", "datalen": datalen},
+                        headers=SINA_HEADERS, timeout=timeout)
+    response.raise_for_status()
+    rows = json.loads(response.text) or []
+    bars = {field: [] for field in FIELDS}
+    for row in rows:
+        bars["time"].append(row["day"])
+        for field in FIELDS[1:]:
+            bars[field].append(float(row[field]))
+    return bars
+
+
+def update_history(store, code, period="day", session=None):
+    """只拉取本地缺少的那一段K线并追加，返回新增条数"""
+    last = store.last_time(code, period)
+    if last is None:
+        datalen = MAX_DATALEN
+    else:
+        # 按自然日估算缺少的条数，多拉两根以覆盖盘中未走完的K线
+        days = (np.datetime64("now", "s").astype(np.int64) - last) // 86400 + 1
+        datalen = int(min(MAX_DATALEN, max(2, days * PERIODS[period][1] + 2)))
+    return store.append(code, fetch_kline(code, period, datalen, session=session), period)
@@ -0,0 +1,158 @@
+"""全市场快照：并发分批拉取整个股票列表的行情，解析成 NumPy 数组后向量化统计市场宽度
+
+    snapshot = fetch_snapshot(codes)          # 约 2000 只，分批并发请求
+    stats = breadth(snapshot)                 # 涨跌家数、涨停跌停、涨幅/跌幅/成交额榜
+
+需要 numpy（pip install numpy），托盘只在打开"市场概览"时才导入本模块。
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from sina_api import SINA_QUOTE_URL, SINA_HEADERS, BATCH_SIZE, QUOTE_FIELDS, market_prefix
+from metrics import metrics
+
+SNAPSHOT_WORKERS = 8  # 并发请求数
+TOP_N = 10            # 各榜单的条数
+
+# 快照中的数值列，顺序与 QUOTE_FIELDS 一致
+COLUMNS = list(QUOTE_FIELDS)
+_POSITIONS = list(QUOTE_FIELDS.values())
+
+# 涨跌停幅度：主板 10%，创业板/科创板 20%，北交所 30%；主板的 ST 为 5%，其他板块的 ST 仍按本板块幅度
+LIMIT_RATIOS = [
+    (("300", "301", "688", "689"), 0.20),
+    (("8", "4", "92"), 0.30),
+]
+MAIN_BOARD_RATIO = 0.10
+ST_RATIO = 0.05
+
+
+class MarketSnapshot:
+    """一次全市场行情：codes/names 为列表，其余字段各为一个 float64 数组（行与 codes 对应）"""
+    def __init__(self, codes, names, values):
+        self.codes = codes
+        self.names = names
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(COLUMNS))
+        for i, field in enumerate(COLUMNS):
+            setattr(self, field, values[:, i])
+
+    def __len__(self):
+        return len(self.codes)
+
+
+def parse_snapshot_text(text, codes, names, values):
+    """解析 hq.sinajs.cn 的返回文本，追加到 codes/names/values 三个列表
+
+    与 sina_api.parse_quote_text 相同的格式，但不逐只构造字典；停牌（现价为 0）的也保留，由统计时剔除。
+    """
+    for line in text.splitlines():
+        head, sep, body = line.partition('="')
+        if not sep:
+            continue
+        fields = body.rstrip('";').split(',')
+        if len(fields) <= 9:
+            continue
+        try:
+            row = [float(fields[pos]) if fields[pos] else 0.0 for pos in _POSITIONS]
+        except ValueError:
+            continue
+        codes.append(head.rsplit('_', 1)[-1][2:])
+        names.append(fields[0])
+        values.append(row)
+
+
+def fetch_snapshot(codes, url=SINA_QUOTE_URL, workers=SNAPSHOT_WORKERS, batch_size=BATCH_SIZE, timeout=5):
+    """按 batch_size 分批、workers 个线程并发请求全部代码，返回 MarketSnapshot
+
+    每个线程复用自己的 HTTP 连接；某一批失败时只跳过这一批。
+    """
+    codes = list(codes)
+    batches = [codes[i:i + batch_size] for i in range(0, len(codes), batch_size)]
+    local = threading.local()
+
+    def fetch_batch(batch):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        symbols = ",".join(f"{market_prefix(code)}{code}" for code in batch)
+        metrics.incr("requests")
+        try:
+            with metrics.timer("network"):
+                response = session.get(url + symbols, headers=SINA_HEADERS, timeout=timeout)
+        except Exception as e:
+            metrics.incr("request_failures")
+            print(f"获取市场快照出错: {e}")
+            return None
+        with metrics.timer("decode"):
+            response.encoding = 'gbk'
+            return response.text
+
+    result_codes, names, values = [], [], []
+    with ThreadPoolExecutor(max(1, min(workers, len(batches)))) as pool:
+        for text in pool.map(fetch_batch, batches):
+            if text:
+                with metrics.timer("parse"):
+                    parse_snapshot_text(text, result_codes, names, values)
+    return MarketSnapshot(result_codes, names, values)
+
+
+def limit_ratios(codes, names):
+    """每只股票的涨跌停幅度数组"""
+    codes = np.asarray(codes, dtype=str)
+    ratios = np.full(len(codes), MAIN_BOARD_RATIO)
+    for prefixes, ratio in LIMIT_RATIOS:
+        ratios[np.logical_or.reduce([np.char.startswith(codes, p) for p in prefixes])] = ratio
+    is_st = np.char.find(np.asarray(names, dtype=str), "ST") >= 0
+    ratios[is_st & (ratios == MAIN_BOARD_RATIO)] = ST_RATIO
+    return ratios
+
+
+def _top(values, mask, count, descending=True):
+    """mask 内 values 最大（或最小）的 count 个下标，按顺序排好"""
+    candidates = np.flatnonzero(mask)
+    if candidates.size == 0:
+        return candidates
+    keys = -values[candidates] if descending else values[candidates]
+    if candidates.size > count:
+        part = np.argpartition(keys, count - 1)[:count]
+        candidates, keys = candidates[part], keys[part]
+    return candidates[np.argsort(keys, kind="stable")]
+
+
+def breadth(snapshot, top=TOP_N):
+    """市场宽度统计，全部用数组运算完成
+
+    返回字典: total/advancers/decliners/unchanged/suspended/limit_up/limit_down 为家数，
+    gainers/losers/turnover 为 [(代码, 名称, 现价, 涨跌幅%, 成交额)] 榜单
+    """
+    price, yesterclose = snapshot.price, snapshot.yesterclose
+    trading = (price > 0) & (yesterclose > 0)
+    change_percent = np.zeros(len(snapshot))
+    np.divide(price - yesterclose, yesterclose, out=change_percent, where=trading)
+    change_percent *= 100
+
+    # 涨跌停价按交易所规则四舍五入到分
+    ratios = limit_ratios(snapshot.codes, snapshot.names)
+    limit_up_price = np.round(yesterclose * (1 + ratios), 2)
+    limit_down_price = np.round(yesterclose * (1 - ratios), 2)
+
+    def rows(indexes):
+        return [(snapshot.codes[i], snapshot.names[i], float(price[i]), float(change_percent[i]),
+                 float(snapshot.amount[i])) for i in indexes]
+
+    return {
+        "total": len(snapshot),
+        "advancers": int(np.count_nonzero(trading & (change_percent > 0))),
+        "decliners": int(np.count_nonzero(trading & (change_percent < 0))),
+        "unchanged": int(np.count_nonzero(trading & (change_percent == 0))),
+        "suspended": int(np.count_nonzero(~trading)),
+        "limit_up": int(np.count_nonzero(trading & (price >= limit_up_price - 0.005))),
+        "limit_down": int(np.count_nonzero(trading & (price <= limit_down_price + 0.005))),
+        "amount": float(snapshot.amount[trading].sum()),
+        "gainers": rows(_top(change_percent, trading, top)),
+        "losers": rows(_top(change_percent, trading, top, descending=False)),
+        "turnover": rows(_top(snapshot.amount, trading, top)),
+    }
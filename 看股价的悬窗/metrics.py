@@ -0,0 +1,206 @@
+"""轻量的运行指标：分阶段计时、计数器和延迟直方图
+
+默认关闭，关闭时 timer() 返回共享的空上下文，开销可忽略。开启方式:
+    python stock_tray.py --metrics 127.0.0.1:9108   # HTTP 输出 /metrics 和 /metrics.json
+    python stock_tray.py --metrics-log 60           # 每60秒打印一行汇总
+
+代码中使用:
+    from metrics import metrics
+    with metrics.timer("network"):
+        ...
+    metrics.incr("requests")
+"""
+import json
+import time
+import threading
+
+
+class LatencyHistogram:
+    """按2的幂分桶（微秒）的延迟直方图"""
+    def __init__(self):
+        self.buckets = [0] * 32
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        micros = int(seconds * 1e6)
+        self.buckets[min(micros.bit_length(), 31)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct):
+        """返回所在桶的上界（秒）"""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        seen = 0
+        for bucket, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return (1 << bucket) / 1e6
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count * 1e6 if self.count else 0.0,
+            "p50_us": self.percentile(50) * 1e6,
+            "p99_us": self.percentile(99) * 1e6,
+            "max_us": self.max * 1e6,
+        }
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.add(time.perf_counter() - self.started)
+        return False
+
+
+def _metrics_handler():
+    """HTTP 处理类，只在开启 HTTP 接口时才导入 http.server（它会拖慢托盘启动）"""
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            registry = self.server.metrics
+            if self.path == "/metrics":
+                body = registry.format_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/metrics.json":
+                body = json.dumps(registry.snapshot(), ensure_ascii=False, indent=2).encode("utf-8")
+                content_type = "application/json; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+class Metrics:
+    """计数器与分阶段计时的集合"""
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def enable(self):
+        self.enabled = True
+
+    def incr(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def _histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def observe(self, stage, seconds):
+        if self.enabled:
+            self._histogram(stage).add(seconds)
+
+    def timer(self, stage):
+        """阶段计时上下文，关闭时不做任何事"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._histogram(stage))
+
+    def snapshot(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = dict(self.histograms)
+        return {
+            "uptime_s": time.time() - self.started,
+            "counters": counters,
+            "stages": {stage: histogram.summary() for stage, histogram in histograms.items()},
+        }
+
+    def format_line(self):
+        """一行汇总，用于定期日志"""
+        snapshot = self.snapshot()
+        parts = [f"{name}={value}" for name, value in sorted(snapshot["counters"].items())]
+        for stage, summary in sorted(snapshot["stages"].items()):
+            parts.append(f"{stage}={summary['mean_us'] / 1000:.1f}ms/p99<{summary['p99_us'] / 1000:.1f}ms")
+        return "[metrics] " + " ".join(parts)
+
+    def format_prometheus(self):
+        """Prometheus 文本格式；每次输出全部桶边界（含计数为0的），序列集合保持不变"""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# HELP stock_tray_{name}_total 计数器 {name}")
+            lines.append(f"# TYPE stock_tray_{name}_total counter")
+            lines.append(f"stock_tray_{name}_total {value}")
+        with self.lock:
+            histograms = dict(self.histograms)
+        if histograms:
+            lines.append("# HELP stock_tray_stage_seconds 各阶段耗时（秒）")
+            lines.append("# TYPE stock_tray_stage_seconds histogram")
+        for stage, histogram in sorted(histograms.items()):
+            cumulative = 0
+            # 最后一个桶收纳所有更慢的样本，没有确定的上界，只计入 +Inf
+            for bucket, n in enumerate(histogram.buckets[:-1]):
+                cumulative += n
+                le = (1 << bucket) / 1e6
+                lines.append(f'stock_tray_stage_seconds_bucket{{stage="{stage}",le="{le!r}"}} {cumulative}')
+            lines.append(f'stock_tray_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'stock_tray_stage_seconds_sum{{stage="{stage}"}} {histogram.total:.6f}')
+            lines.append(f'stock_tray_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def start_http(self, address):
+        """在后台线程提供 /metrics 与 /metrics.json，返回实际监听地址"""
+        from http.server import ThreadingHTTPServer
+
+        host, _, port = address.rpartition(":")
+        server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), _metrics_handler())
+        server.daemon_threads = True
+        server.metrics = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return "%s:%d" % server.server_address[:2]
+
+    def start_log(self, interval):
+        """每隔 interval 秒打印一行汇总"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                print(self.format_line())
+        threading.Thread(target=loop, daemon=True).start()
+
+
+# 全局指标，默认关闭
+metrics = Metrics()
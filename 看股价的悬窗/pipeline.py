@@ -0,0 +1,177 @@
+"""行情处理流水线中不依赖Qt的部分：格式化、提醒判断和显示内容生成
+
+托盘界面与回放测试（backtest.py）共用这些函数，保证测的就是实际运行的逻辑。
+"""
+
+ALERT_THRESHOLD = 5  # 涨跌幅超过该百分比时提醒
+RSI_OVERBOUGHT = 80  # RSI 升破该值时提醒超买
+RSI_OVERSOLD = 20    # RSI 跌破该值时提醒超卖
+INDICATOR_ALERT_COOLDOWN = 30 * 60  # 同一只股票同一种指标提醒的最小间隔（秒）
+
+UP_COLOR = "#F5222D"     # 红色
+DOWN_COLOR = "#52C41A"   # 绿色
+STATUS_GRAY = "#8C8C8C"  # 默认灰色
+STATUS_BLUE = "#1890FF"  # 蓝色
+
+
+def market_status(now):
+    """根据当前时间判断市场状态"""
+    # 判断是否是周末
+    if now.weekday() >= 5:  # 5=周六，6=周日
+        return "周末休市"
+
+    # 交易时间判断
+    today_930 = now.replace(hour=9, minute=30, second=0)
+    today_1130 = now.replace(hour=11, minute=30, second=0)
+    today_1300 = now.replace(hour=13, minute=0, second=0)
+    today_1500 = now.replace(hour=15, minute=0, second=0)
+    if today_930 <= now <= today_1130 or today_1300 <= now <= today_1500:
+        return "交易中"
+    return "休市"
+
+
+def format_quote(quote, now):
+    """把行情字典格式化成界面显示用的字符串"""
+    price_change = quote["change"]
+    change_percent = quote["change_percent"]
+    return {
+        "stock_name": quote["name"],
+        "current_price": f"{quote['price']:.2f}",
+        "price_change": f"+{price_change:.2f}" if price_change >= 0 else f"{price_change:.2f}",
+        "change_percent": f"+{change_percent:.2f}%" if change_percent >= 0 else f"{change_percent:.2f}%",
+        "market_status": market_status(now),
+        "update_time": now.strftime("%H:%M:%S"),
+    }
+
+
+def check_alert(stock_name, current_price, change_percent):
+    """涨跌幅超过阈值时返回 (标题, 内容, 是否上涨)，否则返回 None"""
+    change_percent_value = float(change_percent.replace('%', '').replace('+', ''))
+    if change_percent_value > ALERT_THRESHOLD:
+        return f"{stock_name} 大幅上涨", f"当前价格: {current_price}, 涨幅: {change_percent}", True
+    if change_percent_value < -ALERT_THRESHOLD:
+        return f"{stock_name} 大幅下跌", f"当前价格: {current_price}, 跌幅: {change_percent}", False
+    return None
+
+
+class AlertCooldown:
+    """同一个键（例如股票和提醒标题）在 seconds 秒内只放行一次，价格在穿越点附近来回时不反复提醒"""
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.last = {}
+
+    def allow(self, key, now):
+        last = self.last.get(key)
+        if last is not None and now - last < self.seconds:
+            return False
+        self.last[key] = now
+        return True
+
+
+def check_indicator_alert(stock_name, current_price, previous, values):
+    """指标穿越时返回 (标题, 内容, 是否看涨)，否则返回 None
+
+    previous 为上一次的指标值；只在穿越的那一刻提醒，之后保持在同一侧不再重复。
+    """
+    if not previous or not values:
+        return None
+    before, after = previous["macd_hist"], values["macd_hist"]
+    if before <= 0 < after:
+        return f"{stock_name} MACD金叉", f"当前价格: {current_price}, MACD: {values['macd']:.3f}", True
+    if before >= 0 > after:
+        return f"{stock_name} MACD死叉", f"当前价格: {current_price}, MACD: {values['macd']:.3f}", False
+    before, after = previous["rsi"], values["rsi"]
+    if before < RSI_OVERBOUGHT <= after:
+        return f"{stock_name} RSI超买", f"当前价格: {current_price}, RSI: {after:.1f}", True
+    if before > RSI_OVERSOLD >= after:
+        return f"{stock_name} RSI超卖", f"当前价格: {current_price}, RSI: {after:.1f}", False
+    return None
+
+
+def _number(value, fmt="{:.2f}"):
+    """指标值格式化，窗口未满（nan）时显示 --"""
+    return "--" if value != value else fmt.format(value)
+
+
+def indicator_text(values):
+    """悬浮窗口上的一行指标"""
+    if not values:
+        return ""
+    return f"MA20 {_number(values['ma20'])}  RSI {_number(values['rsi'], '{:.0f}')}"
+
+
+def render_indicators_html(values):
+    """托盘菜单中的指标行"""
+    ma = " / ".join(_number(values[f"ma{n}"]) for n in (5, 10, 20))
+    return (
+        f"<div style='margin-top:6px; font-size:11px; color:#595959;'>"
+        f"MA5/10/20 {ma}<br>"
+        f"BOLL {_number(values['boll_upper'])} / {_number(values['boll_lower'])} | "
+        f"VWAP {_number(values['vwap'])}<br>"
+        f"RSI {_number(values['rsi'], '{:.1f}')} | MACD {_number(values['macd'], '{:+.3f}')} "
+        f"({_number(values['macd_hist'], '{:+.3f}')})"
+        f"</div>"
+    )
+
+
+def render_info_html(stock_code, stock_name, current_price, price_change, change_percent,
+                     market_status, update_time, indicators=None, board=""):
+    """托盘菜单中股票信息区域的HTML，indicators 为技术指标值（可选），board 为板块和状态说明（可选）"""
+    # 根据涨跌设置颜色
+    price_color = UP_COLOR if price_change.startswith("+") else DOWN_COLOR
+    # 判断市场状态颜色
+    status_color = STATUS_BLUE if market_status == "交易中" else STATUS_GRAY
+    return (
+        f"<div style='padding:10px; text-align:center;'>"
+        f"<div style='font-size:16px;'><b>{stock_name}</b> <span style='color:#8C8C8C; font-size:12px;'>{stock_code}{' ' + board if board else ''}</span></div>"
+        f"<div style='font-size:26px; margin:5px 0; font-weight:bold;'>{current_price}</div>"
+        f"<div style='color:{price_color}; font-size:14px;'>{price_change} ({change_percent})</div>"
+        f"<div style='margin-top:6px; font-size:12px;'>"
+        f"<span style='color:{status_color};'>{market_status}</span> | "
+        f"更新: {update_time}</div>"
+        f"{render_indicators_html(indicators) if indicators else ''}"
+        f"</div>"
+    )
+
+
+def _money(value, sign=False):
+    """金额显示，一万以上以万为单位"""
+    fmt = "{:+,.2f}" if sign else "{:,.2f}"
+    if abs(value) >= 10000:
+        return fmt.format(value / 10000) + "万"
+    return fmt.format(value)
+
+
+def portfolio_text(summary):
+    """悬浮窗口上的一行持仓盈亏"""
+    if not summary:
+        return ""
+    return f"盈亏 {_money(summary['pnl'], True)}  今日 {_money(summary['day_change'], True)}"
+
+
+def render_portfolio_tooltip(summary):
+    """托盘图标提示中的持仓汇总"""
+    return (f"持仓 {summary['lines']} 笔 市值 {_money(summary['market_value'])}\n"
+            f"浮动盈亏 {_money(summary['pnl'], True)} ({summary['pnl_percent']:+.2f}%) "
+            f"今日 {_money(summary['day_change'], True)} ({summary['day_change_percent']:+.2f}%)")
+
+
+def render_tooltip(stock_code, stock_name, current_price, price_change, market_status, update_time,
+                   portfolio=None):
+    """托盘图标的提示文字，portfolio 为持仓汇总（可选）"""
+    text = f"{stock_name} ({stock_code})\n{current_price} {price_change}\n{market_status} | 更新: {update_time}"
+    if portfolio:
+        text += "\n" + render_portfolio_tooltip(portfolio)
+    return text
+
+
+def icon_text(current_price):
+    """托盘图标上显示的数字：价格的最高位"""
+    price = float(current_price)
+    if price >= 1000:
+        return str(int(price/1000))
+    elif price >= 100:
+        return str(int(price/100))
+    elif price >= 10:
+        return str(int(price/10))
+    return str(int(price))
@@ -0,0 +1,106 @@
+"""持仓与盈亏：每次刷新对整个组合做一次向量化计算
+
+持仓文件 portfolio.json，每行一笔持仓（同一代码可以有多笔），数量为负表示融券/卖空:
+    [{"code": "603019", "quantity": 1000, "cost": 35.20}, ...]
+
+    portfolio = Portfolio.load()
+    portfolio.update_quotes({code: quote})     # 只写入有变化的代码的价格
+    summary = portfolio.summary()              # 市值、浮动盈亏、当日盈亏、仓位权重、敞口
+
+需要 numpy（pip install numpy），托盘只在存在持仓文件时才导入本模块。
+"""
+import json
+
+import numpy as np
+
+PORTFOLIO_FILE = 'portfolio.json'
+
+
+class Portfolio:
+    """价格按代码存放（每个代码一格），持仓按行存放，计算时用 slot 下标把价格展开到各行"""
+    def __init__(self, lines):
+        self.codes = []       # 去重后的代码
+        self.slot_of = {}     # 代码 -> 价格数组下标
+        slots = []
+        for line in lines:
+            code = str(line["code"])
+            slot = self.slot_of.get(code)
+            if slot is None:
+                slot = self.slot_of[code] = len(self.codes)
+                self.codes.append(code)
+            slots.append(slot)
+        self.line_codes = [str(line["code"]) for line in lines]
+        self.slots = np.asarray(slots, dtype=np.intp)
+        self.quantity = np.asarray([float(line["quantity"]) for line in lines], dtype=np.float64)
+        self.cost = np.asarray([float(line["cost"]) for line in lines], dtype=np.float64)  # 每股成本
+        self.price = np.zeros(len(self.codes))
+        self.yesterclose = np.zeros(len(self.codes))
+
+    def __len__(self):
+        return len(self.line_codes)
+
+    @classmethod
+    def load(cls, path=PORTFOLIO_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def update_quotes(self, quotes):
+        """写入 {代码: 行情字典} 中属于本组合的价格，返回写入的代码数"""
+        slots = []
+        prices = []
+        closes = []
+        for code, quote in quotes.items():
+            slot = self.slot_of.get(code)
+            if slot is not None:
+                slots.append(slot)
+                prices.append(quote["price"])
+                closes.append(quote["yesterclose"])
+        if slots:
+            self.price[slots] = prices
+            self.yesterclose[slots] = closes
+        return len(slots)
+
+    def summary(self):
+        """整个组合的汇总，全部用数组运算完成
+
+        停牌（现价为 0）的按昨收计价，两者都没有的行不计入。
+        返回字典: market_value/cost_value/pnl/day_change 为金额，pnl_percent/day_change_percent 为百分比，
+        long/short/gross/net 为多头、空头（负数）、总敞口和净敞口，weights 为各行占总敞口的比例数组，
+        top 为权重最大的 (代码, 权重)，priced 为已有价格的行数。
+        """
+        price = self.price[self.slots]
+        yesterclose = self.yesterclose[self.slots]
+        price = np.where(price > 0, price, yesterclose)
+        priced = price > 0
+        quantity = np.where(priced, self.quantity, 0.0)
+
+        market_value = quantity * price
+        cost_value = quantity * self.cost
+        day_base = quantity * yesterclose
+        day_change = market_value - day_base
+        long = float(market_value[market_value > 0].sum())
+        short = float(market_value[market_value < 0].sum())
+        gross = long - short
+        total_market = float(market_value.sum())
+        total_cost = float(cost_value.sum())
+        total_day_base = float(day_base.sum())
+        weights = np.abs(market_value) / gross if gross else np.zeros(len(price))
+        top = int(np.argmax(weights)) if len(weights) else -1
+        pnl = total_market - total_cost
+        day = float(day_change.sum())
+        return {
+            "lines": len(self),
+            "priced": int(np.count_nonzero(priced)),
+            "market_value": total_market,
+            "cost_value": total_cost,
+            "pnl": pnl,
+            "pnl_percent": pnl / abs(total_cost) * 100 if total_cost else 0.0,
+            "day_change": day,
+            "day_change_percent": day / abs(total_day_base) * 100 if total_day_base else 0.0,
+            "long": long,
+            "short": short,
+            "gross": gross,
+            "net": long + short,
+            "weights": weights,
+            "top": (self.line_codes[top], float(weights[top])) if top >= 0 and gross else None,
+        }
@@ -0,0 +1,314 @@
+"""多个行情接口与对冲请求
+
+三家接口的返回统一成 sina_api.parse_quote_text 的行情字典（code/name/open/yesterclose/price/
+high/low/volume/amount/date/time/change/change_percent）:
+    SinaProvider       hq.sinajs.cn/list=sh603019
+    TencentProvider    qt.gtimg.cn/q=sh603019，字段以 ~ 分隔
+    EastmoneyProvider  push2.eastmoney.com 的 ulist 接口，返回 JSON
+
+HedgedFetcher 按各接口延迟的指数滑动平均(EWMA)排序，先请求最快的一家；超过它近期的 p95
+延迟还没返回时，再向下一家发同样的请求，谁先返回有效结果就用谁。
+
+    fetcher = HedgedFetcher([SinaProvider(), TencentProvider(), EastmoneyProvider()])
+    quotes = fetcher.fetch(["603019"])
+"""
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from sina_api import SINA_QUOTE_URL, SINA_HEADERS, BATCH_SIZE, market_prefix, parse_quote_text
+from metrics import metrics
+
+TENCENT_QUOTE_URL = "https://qt.gtimg.cn/q="
+EASTMONEY_QUOTE_URL = "https://push2.eastmoney.com/api/qt/ulist.np/get"
+EASTMONEY_FIELDS = "f2,f3,f4,f5,f6,f12,f13,f14,f15,f16,f17,f18,f124"
+
+DEFAULT_TIMEOUT = 3       # 单次请求超时（秒）
+EWMA_ALPHA = 0.2          # 延迟平均的平滑系数
+LATENCY_WINDOW = 100      # 计算 p95 用的最近样本数
+MIN_SAMPLES = 5           # 样本不足时用 INITIAL_HEDGE_DELAY
+INITIAL_HEDGE_DELAY = 0.3  # 秒
+MIN_HEDGE_DELAY = 0.02    # 对冲等待的下限（秒），避免每次都双发
+PROBE_INTERVAL = 10       # 每隔多少次请求顺带探测一次最久没有样本的接口
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _finish(quote):
+    """补上涨跌额和涨跌幅，与 parse_quote_text 的算法一致"""
+    yesterclose = quote["yesterclose"]
+    quote["change"] = quote["price"] - yesterclose if yesterclose else 0.0
+    quote["change_percent"] = quote["change"] / yesterclose * 100 if yesterclose else 0.0
+    return quote
+
+
+class QuoteProvider(ABC):
+    """行情接口基类：子类提供请求地址和返回文本的解析"""
+    name = ""
+    encoding = "utf-8"
+    batch_size = BATCH_SIZE
+
+    def __init__(self, url):
+        self.url = url
+
+    @abstractmethod
+    def request_url(self, codes):
+        """返回一批代码的请求地址"""
+
+    @abstractmethod
+    def parse(self, text):
+        """返回 {代码: 行情字典}"""
+
+    def fetch(self, codes, session=None, timeout=DEFAULT_TIMEOUT):
+        http = session or requests
+        quotes = {}
+        codes = list(codes)
+        for start in range(0, len(codes), self.batch_size):
+            response = http.get(self.request_url(codes[start:start + self.batch_size]),
+                                headers=SINA_HEADERS, timeout=timeout)
+            response.raise_for_status()
+            response.encoding = self.encoding
+            quotes.update(self.parse(response.text))
+        return quotes
+
+
+class SinaProvider(QuoteProvider):
+    name = "sina"
+    encoding = "gbk"
+
+    def __init__(self, url=SINA_QUOTE_URL):
+        super().__init__(url)
+
+    def request_url(self, codes):
+        return self.url + ",".join(f"{market_prefix(code)}{code}" for code in codes)
+
+    def parse(self, text):
+        return parse_quote_text(text)
+
+
+class TencentProvider(QuoteProvider):
+    """v_sh603019="1~中科曙光~603019~现价~昨收~今开~成交量(手)~...~时间~涨跌~涨跌幅~最高~最低~...~成交额(万)~...";"""
+    name = "tencent"
+    encoding = "gbk"
+    # 字段位置
+    NAME, CODE, PRICE, YESTERCLOSE, OPEN, VOLUME, TIME, HIGH, LOW, AMOUNT = 1, 2, 3, 4, 5, 6, 30, 33, 34, 37
+
+    def __init__(self, url=TENCENT_QUOTE_URL):
+        super().__init__(url)
+
+    def request_url(self, codes):
+        return self.url + ",".join(f"{market_prefix(code)}{code}" for code in codes)
+
+    def parse(self, text):
+        quotes = {}
+        for line in text.split(";"):
+            _, sep, body = line.partition('="')
+            if not sep:
+                continue
+            fields = body.rstrip('"').split("~")
+            if len(fields) <= self.AMOUNT:
+                continue
+            stamp = fields[self.TIME]  # yyyymmddHHMMSS
+            quote = {
+                "code": fields[self.CODE],
+                "name": fields[self.NAME],
+                "open": _float(fields[self.OPEN]),
+                "yesterclose": _float(fields[self.YESTERCLOSE]),
+                "price": _float(fields[self.PRICE]),
+                "high": _float(fields[self.HIGH]),
+                "low": _float(fields[self.LOW]),
+                "volume": _float(fields[self.VOLUME]) * 100,     # 手 -> 股
+                "amount": _float(fields[self.AMOUNT]) * 10000,   # 万元 -> 元
+                "date": f"{stamp[:4]}-{stamp[4:6]}-{stamp[6:8]}" if len(stamp) >= 14 else "",
+                "time": f"{stamp[8:10]}:{stamp[10:12]}:{stamp[12:14]}" if len(stamp) >= 14 else "",
+            }
+            quotes[quote["code"]] = _finish(quote)
+        return quotes
+
+
+class EastmoneyProvider(QuoteProvider):
+    """secids=1.603019,0.000001（1 为上证，0 为深证），fltt=2 时价格为元"""
+    name = "eastmoney"
+
+    def __init__(self, url=EASTMONEY_QUOTE_URL):
+        super().__init__(url)
+
+    def request_url(self, codes):
+        secids = ",".join(f"{1 if market_prefix(code) == 'sh' else 0}.{code}" for code in codes)
+        return f"{self.url}?fltt=2&fields={EASTMONEY_FIELDS}&secids={secids}"
+
+    def parse(self, text):
+        data = json.loads(text).get("data") or {}
+        quotes = {}
+        for item in data.get("diff") or []:
+            stamp = item.get("f124")
+            local = time.localtime(stamp) if isinstance(stamp, (int, float)) and stamp else None
+            quote = {
+                "code": item["f12"],
+                "name": item.get("f14", ""),
+                "open": _float(item.get("f17")),
+                "yesterclose": _float(item.get("f18")),
+                "price": _float(item.get("f2")),   # 停牌时为 "-"
+                "high": _float(item.get("f15")),
+                "low": _float(item.get("f16")),
+                "volume": _float(item.get("f5")) * 100,
+                "amount": _float(item.get("f6")),
+                "date": time.strftime("%Y-%m-%d", local) if local else "",
+                "time": time.strftime("%H:%M:%S", local) if local else "",
+            }
+            quotes[quote["code"]] = _finish(quote)
+        return quotes
+
+
+PROVIDERS = {
+    "sina": SinaProvider,
+    "tencent": TencentProvider,
+    "eastmoney": EastmoneyProvider,
+}
+
+
+class LatencyStats:
+    """单个接口的延迟：EWMA 用于排序，最近 LATENCY_WINDOW 个样本的 p95 用于决定何时对冲"""
+    def __init__(self):
+        self.ewma = None
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.failures = 0
+        self.updated = 0.0  # 最近一次样本的时间 (monotonic)
+        self.lock = threading.Lock()
+
+    def add(self, seconds, clamp=True):
+        """clamp 时超过 p95 两倍的部分不计入 EWMA：偶发长尾交给对冲处理，不必打乱排序"""
+        p95 = self.p95() if clamp else None
+        with self.lock:
+            self.samples.append(seconds)
+            self.updated = time.monotonic()
+            if p95 is not None:
+                seconds = min(seconds, 2 * p95)
+            self.ewma = seconds if self.ewma is None else self.ewma + EWMA_ALPHA * (seconds - self.ewma)
+
+    def fail(self, timeout):
+        """失败按超时完整计入，排序自然靠后"""
+        self.failures += 1
+        self.add(timeout, clamp=False)
+
+    def p95(self):
+        with self.lock:
+            if len(self.samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class HedgedFetcher:
+    """对冲请求：先发给延迟最低的接口，等到它的 p95 仍未返回就加发下一家，取最先返回的有效结果"""
+    def __init__(self, providers, timeout=DEFAULT_TIMEOUT):
+        self.providers = list(providers)
+        self.timeout = timeout
+        self.stats = {provider.name: LatencyStats() for provider in self.providers}
+        self.wins = {provider.name: 0 for provider in self.providers}
+        self.hedges = 0
+        self.probes = 0
+        self.fetches = 0
+        self.pool = ThreadPoolExecutor(len(self.providers) * 4)
+        self.local = threading.local()  # 每个线程、每家接口各自复用连接
+
+    def ranked(self):
+        """按 EWMA 延迟从低到高排序，没有样本的排在前面以便探测"""
+        return sorted(self.providers, key=lambda p: self.stats[p.name].ewma or 0.0)
+
+    def hedge_delay(self, provider):
+        p95 = self.stats[provider.name].p95()
+        return INITIAL_HEDGE_DELAY if p95 is None else max(MIN_HEDGE_DELAY, p95)
+
+    def _session(self, provider):
+        sessions = getattr(self.local, "sessions", None)
+        if sessions is None:
+            sessions = self.local.sessions = {}
+        session = sessions.get(provider.name)
+        if session is None:
+            session = sessions[provider.name] = requests.Session()
+        return session
+
+    def _call(self, provider, codes):
+        """在线程池中执行一次请求并记录延迟；落选的请求也会记录，用来更新排序"""
+        started = time.perf_counter()
+        try:
+            quotes = provider.fetch(codes, session=self._session(provider), timeout=self.timeout)
+        except Exception:
+            self.stats[provider.name].fail(self.timeout)
+            metrics.incr(f"provider_{provider.name}_failures")
+            raise
+        if not quotes:
+            self.stats[provider.name].fail(self.timeout)
+            raise ValueError(f"{provider.name} 没有返回有效行情")
+        self.stats[provider.name].add(time.perf_counter() - started)
+        return quotes
+
+    def fetch(self, codes):
+        """返回最先到达的有效行情；所有接口都失败时抛出最后一个异常"""
+        codes = list(codes)
+        if not codes:
+            return {}
+        ranked = self.ranked()
+        self.fetches += 1
+        probe = len(ranked) > 1 and self.fetches % PROBE_INTERVAL == 0
+        if probe:
+            # 只有排在前面的接口才有新样本，偶尔一次长尾就可能让它一直排在后面；
+            # 定期把最久没更新的接口和主接口同时请求，让排序能恢复
+            stalest = min(ranked[1:], key=lambda p: self.stats[p.name].updated)
+            ranked.remove(stalest)
+            ranked.insert(1, stalest)
+        pending = {}
+        deadline = time.monotonic() + self.timeout
+        error = None
+
+        launched = []
+
+        def launch(hedge=True):
+            provider = ranked[len(launched)]
+            if launched and hedge:
+                self.hedges += 1
+                metrics.incr("hedges")
+            pending[self.pool.submit(self._call, provider, codes)] = provider
+            launched.append(provider)
+
+        launch()
+        if probe:
+            self.probes += 1
+            launch(hedge=False)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            can_hedge = len(launched) < len(ranked)
+            # 最近发出的请求超过该接口的 p95 还没返回，就加发下一家
+            delay = min(remaining, self.hedge_delay(launched[-1])) if can_hedge else remaining
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            failed = False
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    quotes = future.result()
+                except Exception as e:
+                    error = e
+                    failed = True
+                    continue
+                self.wins[provider.name] += 1
+                metrics.incr(f"provider_{provider.name}_wins")
+                return quotes
+            if can_hedge and (failed or not done):
+                launch()
+        raise error or TimeoutError("所有行情接口均超时")
+
+    def close(self):
+        self.pool.shutdown(wait=False)
@@ -0,0 +1,336 @@
+"""无界面行情守护进程：统一轮询一次新浪行情，通过本地套接字分发给多个托盘客户端
+
+协议为按行分隔的JSON：
+    客户端 -> 守护进程: {"subscribe": ["603019", "000001"]}
+    客户端 -> 守护进程: {"unsubscribe": ["000001"]}
+    守护进程 -> 客户端: {"ts": 发布时间戳, "quotes": {代码: 变化的字段}}
+
+订阅时先推送一次完整行情，之后只推送发生变化的字段，没有变化的代码不推送。
+退订后不再推送该代码；没有任何客户端订阅的代码不再轮询。格式不对的消息直接忽略。
+
+用法:
+    python quote_daemon.py --listen 127.0.0.1:8765
+    python quote_daemon.py --listen unix:/tmp/stock_feed.sock
+    python stock_tray.py --feed 127.0.0.1:8765
+"""
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import argparse
+import threading
+import socketserver
+
+from sina_api import fetch_quotes, diff_quote
+
+DEFAULT_FEED_ADDRESS = "127.0.0.1:8765"
+DEFAULT_POLL_INTERVAL = 3  # 默认轮询间隔（秒）
+SEND_TIMEOUT = 2           # 向单个客户端发送的超时（秒），防止慢客户端拖住发布线程
+
+
+def parse_address(address):
+    """解析 'host:port' 或 'unix:/path' 格式的地址，返回 (套接字族, 地址)"""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[5:]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _set_send_timeout(sock, seconds):
+    """只给发送设置超时，读取仍然阻塞等待订阅消息"""
+    if sys.platform == "win32":
+        value = struct.pack("I", int(seconds * 1000))
+    else:
+        value = struct.pack("ll", int(seconds), 0)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, value)
+
+
+def _message_codes(value):
+    """消息中的代码列表，必须是6位数字字符串的列表，否则返回 None"""
+    if not isinstance(value, list):
+        return None
+    if not all(isinstance(code, str) and len(code) == 6 and code.isdigit() for code in value):
+        return None
+    return value
+
+
+def encode_message(message):
+    return (json.dumps(message, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class _Subscriber:
+    """一个已连接的客户端及其订阅的代码"""
+    def __init__(self, sock):
+        self.sock = sock
+        self.codes = set()
+        self.lock = threading.Lock()
+
+    def send(self, data):
+        with self.lock:
+            self.sock.sendall(data)
+
+
+class _SubscriberHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.quote_daemon
+        subscriber = _Subscriber(self.request)
+        _set_send_timeout(self.request, SEND_TIMEOUT)
+        daemon.add_subscriber(subscriber)
+        try:
+            for line in self.rfile:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(message, dict):
+                    continue
+                codes = _message_codes(message.get("subscribe"))
+                if codes is not None:
+                    daemon.subscribe(subscriber, codes)
+                codes = _message_codes(message.get("unsubscribe"))
+                if codes is not None:
+                    daemon.unsubscribe(subscriber, codes)
+        except OSError:
+            pass
+        finally:
+            daemon.remove_subscriber(subscriber)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class QuoteDaemon:
+    """轮询一次、分发给所有订阅者的行情守护进程"""
+    def __init__(self, address=DEFAULT_FEED_ADDRESS, interval=DEFAULT_POLL_INTERVAL, fetcher=fetch_quotes):
+        self.address = address
+        self.interval = interval
+        self.fetcher = fetcher
+        self.subscribers = set()
+        self.latest = {}  # 代码 -> 最近一次行情
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.server = None
+
+        # 运行统计
+        self.polls = 0
+        self.publish_cpu = 0.0  # 发布线程消耗的CPU时间（秒）
+
+    def start(self):
+        """启动监听和轮询线程（非阻塞）"""
+        family, address = parse_address(self.address)
+        if family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.remove(address)
+            self.server = _UnixServer(address, _SubscriberHandler)
+        else:
+            self.server = _TCPServer(address, _SubscriberHandler)
+            # 端口为0时回填实际分配的端口
+            self.address = "%s:%d" % self.server.server_address[:2]
+        self.server.quote_daemon = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._poll_loop, daemon=True).start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def add_subscriber(self, subscriber):
+        with self.lock:
+            self.subscribers.add(subscriber)
+
+    def remove_subscriber(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def subscribe(self, subscriber, codes):
+        """登记订阅，并立即推送已有的最新行情"""
+        with self.lock:
+            subscriber.codes.update(codes)
+            snapshot = {code: self.latest[code] for code in codes if code in self.latest}
+        if snapshot:
+            try:
+                subscriber.send(encode_message({"ts": time.time(), "quotes": snapshot}))
+            except OSError:
+                pass
+
+    def unsubscribe(self, subscriber, codes):
+        """取消订阅；已无人订阅的代码同时丢弃缓存的行情，重新订阅时从完整行情开始推送"""
+        with self.lock:
+            subscriber.codes.difference_update(codes)
+            for code in codes:
+                if not any(code in other.codes for other in self.subscribers):
+                    self.latest.pop(code, None)
+
+    def wanted_codes(self):
+        """所有订阅者关注的代码并集"""
+        with self.lock:
+            codes = set()
+            for subscriber in self.subscribers:
+                codes |= subscriber.codes
+        return codes
+
+    def poll_once(self):
+        """拉取一次行情并分发"""
+        codes = self.wanted_codes()
+        if not codes:
+            return
+        try:
+            quotes = self.fetcher(sorted(codes))
+        except Exception as e:
+            print(f"获取行情出错: {e}")
+            return
+        self.polls += 1
+        self.publish(quotes)
+
+    def publish(self, quotes):
+        """把变化的字段按各自的订阅分发给客户端，订阅相同的客户端共用同一份编码结果"""
+        cpu_start = time.thread_time()
+        deltas = {}
+        with self.lock:
+            for code, quote in quotes.items():
+                delta = diff_quote(self.latest.get(code), quote)
+                if delta:
+                    deltas[code] = delta
+                    self.latest[code] = quote
+            subscribers = list(self.subscribers)
+        if not deltas:
+            self.publish_cpu += time.thread_time() - cpu_start
+            return
+
+        ts = time.time()
+        encoded = {}  # 订阅集合 -> 已编码消息
+        dead = []
+        for subscriber in subscribers:
+            key = frozenset(subscriber.codes)
+            data = encoded.get(key)
+            if data is None:
+                subset = {code: deltas[code] for code in key if code in deltas}
+                data = encode_message({"ts": ts, "quotes": subset}) if subset else b""
+                encoded[key] = data
+            if not data:
+                continue
+            try:
+                subscriber.send(data)
+            except OSError:
+                dead.append(subscriber)
+        for subscriber in dead:
+            self.remove_subscriber(subscriber)
+        self.publish_cpu += time.thread_time() - cpu_start
+
+    def _poll_loop(self):
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            self.poll_once()
+            self.stop_event.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+class QuoteFeedClient:
+    """订阅守护进程行情的客户端，在后台线程接收变化字段并合并成完整行情"""
+    def __init__(self, address=DEFAULT_FEED_ADDRESS, on_quotes=None):
+        self.address = address
+        self.on_quotes = on_quotes
+        self.quotes = {}
+        self.codes = set()
+        self.last_ts = 0.0
+        self.sock = None
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def connect(self):
+        family, address = parse_address(self.address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(address)
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        if self.codes:
+            self._send_subscribe(self.codes)
+
+    def close(self):
+        self.closed = True
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+
+    def subscribe(self, codes):
+        codes = set(codes) - self.codes
+        if not codes:
+            return
+        self.codes |= codes
+        if self.sock:
+            self._send_subscribe(codes)
+
+    def unsubscribe(self, codes):
+        codes = set(codes) & self.codes
+        if not codes:
+            return
+        self.codes -= codes
+        with self.lock:
+            for code in codes:
+                self.quotes.pop(code, None)
+        if self.sock:
+            try:
+                self.sock.sendall(encode_message({"unsubscribe": sorted(codes)}))
+            except OSError as e:
+                print(f"退订行情失败: {e}")
+
+    def _send_subscribe(self, codes):
+        try:
+            self.sock.sendall(encode_message({"subscribe": sorted(codes)}))
+        except OSError as e:
+            print(f"订阅行情失败: {e}")
+
+    def get(self, code):
+        with self.lock:
+            quote = self.quotes.get(code)
+            return dict(quote) if quote else None
+
+    def _read_loop(self):
+        try:
+            for line in self.sock.makefile("rb"):
+                message = json.loads(line)
+                # 退订前已在途的推送不再合并
+                message["quotes"] = {code: delta for code, delta in message["quotes"].items() if code in self.codes}
+                with self.lock:
+                    for code, delta in message["quotes"].items():
+                        self.quotes.setdefault(code, {}).update(delta)
+                    self.last_ts = message["ts"]
+                if self.on_quotes:
+                    self.on_quotes(message)
+        except (OSError, ValueError) as e:
+            if not self.closed:
+                print(f"行情订阅连接断开: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无界面行情守护进程")
+    parser.add_argument("--listen", default=DEFAULT_FEED_ADDRESS,
+                        help="监听地址，host:port 或 unix:/path (默认 %(default)s)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="轮询间隔秒数 (默认 %(default)s)")
+    args = parser.parse_args(argv)
+
+    daemon = QuoteDaemon(args.listen, args.interval)
+    daemon.start()
+    print(f"行情守护进程已启动: {daemon.address}")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        daemon.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
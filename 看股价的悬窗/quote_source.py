@@ -0,0 +1,129 @@
+"""可替换的行情来源：轮询新浪或订阅推送，统一以"变化字段"的形式交付行情
+
+    source.subscribe(["603019"])
+    deltas = source.poll()           # {代码: 自上次以来变化的字段}
+    quote = source.latest("603019")  # 合并后的完整行情
+
+推送型来源还会在收到数据时调用 on_delta(deltas)，调用方可借此立即刷新而不必等定时器。
+"""
+import threading
+from abc import ABC, abstractmethod
+
+from sina_api import SINA_QUOTE_URL, fetch_quotes, diff_quote
+from quote_daemon import DEFAULT_FEED_ADDRESS, QuoteFeedClient
+
+
+class QuoteSource(ABC):
+    """行情来源基类"""
+    def __init__(self):
+        self.codes = set()
+        self.on_delta = None
+
+    def subscribe(self, codes):
+        self.codes.update(codes)
+
+    def unsubscribe(self, codes):
+        self.codes.difference_update(codes)
+
+    @abstractmethod
+    def poll(self):
+        """返回自上次调用以来变化的字段 {代码: {字段: 值}}，没有变化的代码不出现"""
+
+    @abstractmethod
+    def latest(self, code):
+        """返回代码的完整最新行情，尚未收到时返回 None"""
+
+    def close(self):
+        pass
+
+
+class SinaPollingSource(QuoteSource):
+    """每次 poll 请求一次新浪接口，并与上次结果比较得出变化字段
+
+    传入 recorder（ticks.TickRecorder）时会录制每次的原始返回。
+    """
+    def __init__(self, url=SINA_QUOTE_URL, session=None, recorder=None):
+        super().__init__()
+        self.url = url
+        self.session = session
+        self.recorder = recorder
+        self._latest = {}
+
+    def poll(self):
+        if not self.codes:
+            return {}
+        quotes = self._fetch(sorted(self.codes))
+        deltas = {}
+        for code, quote in quotes.items():
+            delta = diff_quote(self._latest.get(code), quote)
+            if delta:
+                deltas[code] = delta
+                self._latest[code] = quote
+        return deltas
+
+    def _fetch(self, codes):
+        on_raw = self.recorder.record if self.recorder else None
+        return fetch_quotes(codes, session=self.session, url=self.url, on_raw=on_raw)
+
+    def latest(self, code):
+        return self._latest.get(code)
+
+    def close(self):
+        if self.recorder:
+            self.recorder.close()
+
+
+class HedgedPollingSource(SinaPollingSource):
+    """轮询多家行情接口（providers.HedgedFetcher），取最先返回的有效结果
+
+    三家的原始格式不同，不支持录制。
+    """
+    def __init__(self, fetcher):
+        super().__init__()
+        self.fetcher = fetcher
+
+    def _fetch(self, codes):
+        return self.fetcher.fetch(codes)
+
+    def close(self):
+        self.fetcher.close()
+
+
+class FeedStreamSource(QuoteSource):
+    """订阅行情守护进程（或回放服务）推送的变化字段"""
+    def __init__(self, address=DEFAULT_FEED_ADDRESS):
+        super().__init__()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.client = QuoteFeedClient(address, on_quotes=self._on_message)
+
+    def connect(self):
+        self.client.subscribe(self.codes)
+        self.client.connect()
+
+    def subscribe(self, codes):
+        super().subscribe(codes)
+        self.client.subscribe(codes)
+
+    def unsubscribe(self, codes):
+        super().unsubscribe(codes)
+        self.client.unsubscribe(codes)
+
+    def _on_message(self, message):
+        deltas = message["quotes"]
+        with self._lock:
+            for code, delta in deltas.items():
+                self._pending.setdefault(code, {}).update(delta)
+        if self.on_delta:
+            self.on_delta(deltas)
+
+    def poll(self):
+        with self._lock:
+            deltas, self._pending = self._pending, {}
+        return deltas
+
+    def latest(self, code):
+        return self.client.get(code)
+
+    def close(self):
+        self.client.close()
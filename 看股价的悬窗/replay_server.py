@@ -0,0 +1,145 @@
+"""本地行情回放服务：按可调速度播放录制的tick文件，用于离线测试各种行情来源
+
+同时提供两种接口：
+    HTTP  GET /list=sh603019,sz000001   与 hq.sinajs.cn 返回格式相同，供 SinaPollingSource 轮询
+    推送  与 quote_daemon.py 相同的协议，只推送变化字段，供 FeedStreamSource 订阅
+
+用法:
+    python replay_server.py ticks.jsonl.gz --speed 10 --http 127.0.0.1:8766 --feed 127.0.0.1:8765
+    python stock_tray.py --quote-url http://127.0.0.1:8766/list=
+    python stock_tray.py --feed 127.0.0.1:8765
+"""
+import sys
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from sina_api import parse_quote_text
+from quote_daemon import QuoteDaemon
+from ticks import read_ticks
+
+
+class _SinaHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        replay = self.server.replay
+        _, sep, symbols = self.path.partition("/list=")
+        if not sep:
+            self.send_error(404)
+            return
+        body = replay.render(symbols.split(",")).encode("gbk", errors="replace")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/javascript; charset=GBK")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        replay.requests += 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer:
+    """按录制时间间隔（除以 speed）播放tick文件"""
+    def __init__(self, tick_path, speed=1.0, http_address="127.0.0.1:0", feed_address="127.0.0.1:0", loop=False):
+        self.tick_path = tick_path
+        self.speed = speed
+        self.loop = loop
+        self.lines = {}   # 带市场前缀的代码 -> 原始行
+        self.quotes = {}  # 代码 -> 解析后的行情
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.stop_event = threading.Event()
+        self.ticks_played = 0
+        self.requests = 0
+
+        host, _, port = http_address.rpartition(":")
+        self.http_server = ThreadingHTTPServer((host, int(port)), _SinaHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.replay = self
+        self.http_address = "%s:%d" % self.http_server.server_address[:2]
+
+        # 推送由回放驱动，守护进程自身的轮询只是重发最新状态
+        self.feed = QuoteDaemon(feed_address, interval=3600, fetcher=self._current_quotes)
+
+    @property
+    def quote_url(self):
+        return f"http://{self.http_address}/list="
+
+    @property
+    def feed_address(self):
+        return self.feed.address
+
+    def start(self):
+        self.feed.start()
+        threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
+        threading.Thread(target=self._play, daemon=True).start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.http_server.shutdown()
+        self.http_server.server_close()
+        self.feed.stop()
+
+    def render(self, symbols):
+        """按新浪格式输出指定代码的最新行，未出现过的代码返回空行情"""
+        with self.lock:
+            return "".join(self.lines.get(symbol, f'var hq_str_{symbol}="";') + "\n" for symbol in symbols)
+
+    def apply(self, raw):
+        """应用一条tick：更新HTTP返回的原始行并推送变化字段"""
+        quotes = parse_quote_text(raw)
+        with self.lock:
+            for line in raw.splitlines():
+                head, sep, _ = line.partition('="')
+                if sep:
+                    self.lines[head.rsplit('_', 1)[-1]] = line.strip()
+            self.quotes.update(quotes)
+        self.feed.publish(quotes)
+        self.ticks_played += 1
+
+    def _current_quotes(self, codes):
+        with self.lock:
+            return {code: self.quotes[code] for code in codes if code in self.quotes}
+
+    def _play(self):
+        while not self.stop_event.is_set():
+            first = None
+            started = time.monotonic()
+            for t, raw in read_ticks(self.tick_path):
+                if first is None:
+                    first = t
+                if self.speed > 0:
+                    delay = (t - first) / self.speed - (time.monotonic() - started)
+                    if delay > 0 and self.stop_event.wait(delay):
+                        return
+                self.apply(raw)
+            if not self.loop:
+                break
+        self.finished.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地行情回放服务")
+    parser.add_argument("ticks", help="录制的tick文件 (.jsonl.gz)")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，0 表示不等待 (默认 %(default)s)")
+    parser.add_argument("--http", default="127.0.0.1:8766", help="模拟新浪接口的HTTP地址 (默认 %(default)s)")
+    parser.add_argument("--feed", default="127.0.0.1:8765", help="推送地址 (默认 %(default)s)")
+    parser.add_argument("--loop", action="store_true", help="播放完后从头循环")
+    args = parser.parse_args(argv)
+
+    server = ReplayServer(args.ticks, args.speed, args.http, args.feed, args.loop)
+    server.start()
+    print(f"回放中: HTTP {server.quote_url}  推送 {server.feed_address}")
+    try:
+        while not server.finished.wait(1):
+            pass
+        print(f"回放结束，共 {server.ticks_played} 条tick")
+    except KeyboardInterrupt:
+        pass
+    server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
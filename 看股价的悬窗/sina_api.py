@@ -0,0 +1,176 @@
+"""新浪财经行情接口的请求与解析（不依赖Qt，托盘和自选列表共用）"""
+
+from metrics import metrics
+
+SINA_QUOTE_URL = "https://hq.sinajs.cn/list="
+SINA_HEADERS = {
+    "User-Agent": "Mozilla/5.0",
+    "Referer": "https://finance.sina.com.cn"
+}
+
+# 单次请求最多携带的代码数量，避免URL过长
+BATCH_SIZE = 200
+
+# 行情字段在返回数据中的位置
+QUOTE_FIELDS = {
+    "open": 1,         # 开盘价
+    "yesterclose": 2,  # 昨日收盘价
+    "price": 3,        # 当前价格
+    "high": 4,         # 最高价
+    "low": 5,          # 最低价
+    "volume": 8,       # 成交量（股）
+    "amount": 9,       # 成交额（元）
+}
+
+
+# 号段 -> 交易所（新浪/腾讯的代码前缀），先按前三位、再按前两位查找
+MARKET_RANGES = {
+    # 上交所：主板、科创板、B股、基金/ETF、可转债
+    "600": "sh", "601": "sh", "603": "sh", "605": "sh",
+    "688": "sh", "689": "sh",
+    "900": "sh",
+    "50": "sh", "51": "sh", "52": "sh", "56": "sh", "58": "sh",
+    "11": "sh",
+    # 深交所：主板、创业板、B股、基金/ETF/LOF、可转债
+    "000": "sz", "001": "sz", "002": "sz", "003": "sz", "004": "sz",
+    "300": "sz", "301": "sz",
+    "200": "sz",
+    "15": "sz", "16": "sz", "18": "sz",
+    "12": "sz",
+    # 北交所
+    "43": "bj", "83": "bj", "87": "bj", "920": "bj",
+}
+MARKETS = ("sh", "sz", "bj")
+
+
+class MarketTable:
+    """代码 -> 交易所：基础信息库记录的和探测到的优先，其次号段表，都没有时为 None"""
+    def __init__(self, ranges=MARKET_RANGES):
+        self.ranges = ranges
+        self.known = {}
+
+    def update(self, exchanges):
+        """写入 {代码: 交易所}（来自 universe.db 或探测结果）"""
+        self.known.update((code, market) for code, market in exchanges.items() if market in MARKETS)
+
+    def exchange(self, code):
+        market = self.known.get(code)
+        if market is None:
+            market = self.ranges.get(code[:3]) or self.ranges.get(code[:2])
+        return market
+
+    def unknown(self, codes):
+        return [code for code in codes if self.exchange(code) is None]
+
+
+markets = MarketTable()
+
+
+def market_prefix(code):
+    """股票代码的市场前缀 sh/sz/bj；号段表也没有的代码按上证/深证猜测（fetch_quotes 会探测这些代码）"""
+    return markets.exchange(code) or ("sh" if code.startswith("6") else "sz")
+
+
+def _symbols(code):
+    """请求时使用的全部新浪代码：已知交易所的一个，未知的每个市场各一个"""
+    market = markets.exchange(code)
+    return [f"{market}{code}"] if market else [f"{prefix}{code}" for prefix in MARKETS]
+
+
+def _learn_markets(text, codes):
+    """从同时带了多个前缀的返回中记下未知代码实际所在的交易所"""
+    codes = set(codes)
+    found = {}
+    for line in text.splitlines():
+        head, sep, body = line.partition('="')
+        symbol = head.rsplit('_', 1)[-1]
+        if sep and symbol[2:] in codes and body.count(',') >= 5:
+            found[symbol[2:]] = symbol[:2]
+    markets.update(found)
+    return found
+
+
+def parse_quote_text(text):
+    """解析 hq.sinajs.cn 返回的文本，返回 {代码: 行情字典}
+
+    返回文本每行形如: var hq_str_sh603019="中科曙光,开盘,昨收,现价,...";
+    无效或停牌（现价为空）的代码会被跳过。
+    """
+    quotes = {}
+    for line in text.splitlines():
+        head, sep, body = line.partition('="')
+        if not sep:
+            continue
+        symbol = head.rsplit('_', 1)[-1]
+        fields = body.rstrip('";').split(',')
+        if len(fields) <= 5:
+            continue
+
+        quote = {"code": symbol[2:], "name": fields[0]}
+        try:
+            for key, pos in QUOTE_FIELDS.items():
+                quote[key] = float(fields[pos]) if pos < len(fields) and fields[pos] else 0.0
+        except ValueError:
+            continue
+        quote["date"] = fields[30] if len(fields) > 31 else ""
+        quote["time"] = fields[31] if len(fields) > 31 else ""
+
+        # 计算涨跌幅
+        yesterclose = quote["yesterclose"]
+        quote["change"] = quote["price"] - yesterclose if yesterclose else 0.0
+        quote["change_percent"] = quote["change"] / yesterclose * 100 if yesterclose else 0.0
+        quotes[quote["code"]] = quote
+    return quotes
+
+
+def diff_quote(old, new):
+    """返回 new 相对 old 发生变化的字段，old 为空时返回完整记录"""
+    if not old:
+        return dict(new)
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+def fetch_quotes(codes, session=None, timeout=5, url=SINA_QUOTE_URL, on_raw=None):
+    """批量获取多只股票的行情，按 BATCH_SIZE 分批请求
+
+    url 可指向本地回放服务（见 replay_server.py）以便离线测试；
+    on_raw 会收到每批请求的原始返回文本，用于录制。
+    """
+    http = session
+    if http is None:
+        import requests  # 导入要几十毫秒，托盘启动时用不到
+        http = requests
+    quotes = {}
+    codes = list(codes)
+    for start in range(0, len(codes), BATCH_SIZE):
+        batch = codes[start:start + BATCH_SIZE]
+        # 号段表判断不了的代码带上所有前缀，在同一次请求里探测，不额外往返
+        unknown = markets.unknown(batch)
+        if unknown:
+            metrics.incr("market_probes", len(unknown))
+        symbols = ",".join(symbol for code in batch for symbol in _symbols(code))
+        metrics.incr("requests")
+        try:
+            with metrics.timer("network"):
+                response = http.get(url + symbols, headers=SINA_HEADERS, timeout=timeout)
+        except Exception:
+            metrics.incr("request_failures")
+            raise
+        with metrics.timer("decode"):
+            response.encoding = 'gbk'  # 设置正确的编码
+            text = response.text
+        if on_raw:
+            on_raw(text)
+        with metrics.timer("parse"):
+            quotes.update(parse_quote_text(text))
+            if unknown:
+                _learn_markets(text, unknown)
+    return quotes
+
+
+def probe_markets(codes, session=None, timeout=5, url=SINA_QUOTE_URL):
+    """一次请求探测号段表判断不了的代码，返回 {代码: 交易所}（查不到的代码不出现）"""
+    unknown = markets.unknown(codes)
+    if unknown:
+        fetch_quotes(unknown, session=session, timeout=timeout, url=url)
+    return {code: markets.exchange(code) for code in codes if markets.exchange(code)}
@@ -1,17 +1,34 @@
+import os
 import sys
 import json
-import requests
-from datetime import datetime
+import time
+import argparse
+import threading
+from datetime import date, datetime
 from PyQt5.QtWidgets import (QApplication, QSystemTrayIcon, QMenu, QAction, QWidgetAction, 
                          QLabel, QDialog, QVBoxLayout, QLineEdit, QPushButton, 
-                         QHBoxLayout, QCompleter, QTableWidget, QTableWidgetItem,
+                         QHBoxLayout, QCompleter, QTableView, QAbstractItemView,
                          QHeaderView, QFrame, QMessageBox, QWidget, QMainWindow)
-from PyQt5.QtCore import Qt, QTimer, QSize, QStringListModel, QPoint, QEvent, QPropertyAnimation, QRect
+from PyQt5.QtCore import Qt, QObject, pyqtSignal, QTimer, QSize, QStringListModel, QPoint, QEvent, QPropertyAnimation, QRect
 from PyQt5.QtGui import (QIcon, QFont, QPixmap, QPainter, QColor, QBrush, QPen,
                     QLinearGradient, QRadialGradient, QFontMetrics, QCursor, QMouseEvent)
 
+from sina_api import SINA_QUOTE_URL, fetch_quotes, markets, probe_markets
+from quote_source import SinaPollingSource, FeedStreamSource, HedgedPollingSource
+from pipeline import (format_quote, market_status, check_alert, check_indicator_alert, AlertCooldown,
+                      INDICATOR_ALERT_COOLDOWN, render_info_html, render_tooltip, icon_text, indicator_text,
+                      portfolio_text)
+from indicators import DailyIndicatorTracker
+from metrics import metrics
+
 # 定义常量和样式
 DEFAULT_REFRESH_RATE = 3  # 默认刷新频率（秒）
+MARKET_SNAPSHOT_TTL = 30  # 市场概览的缓存时间（秒），期间打开子菜单不重新拉取
+PORTFOLIO_FILE = 'portfolio.json'  # 持仓文件，存在时在悬浮窗口和提示中显示盈亏（见 portfolio.py）
+UNIVERSE_DB = 'universe.db'  # 爬虫写入的股票基础信息库，存在时用于搜索和显示板块（见 universe.py）
+LAST_QUOTE_FILE = 'last_quote.json'  # 上次退出时的行情，启动时先显示它
+LAST_QUOTE_SAVE_INTERVAL = 60  # 运行中保存最近行情的最小间隔（秒）
+INDICATOR_HISTORY = 250  # 回填日线指标用的日K根数
 
 STYLE_SHEET = """
     QDialog, QMenu {
@@ -42,12 +59,12 @@ STYLE_SHEET = """
     QPushButton:pressed {
         background-color: #096DD9;
     }
-    QTableWidget {
+    QTableView {
         border: 1px solid #EAEAEA;
         border-radius: 4px;
         background-color: white;
     }
-    QTableWidget::item:selected {
+    QTableView::item:selected {
         background-color: #E6F7FF;
         color: #1890FF;
     }
@@ -75,7 +92,7 @@ class FloatingWindow(QWidget):
         self.setObjectName("FloatingWindow")
         
         # 设置固定尺寸 - 增加尺寸
-        self.setFixedSize(160, 90)
+        self.setFixedSize(160, 106)
         
         # 初始化UI
         self._init_ui()
@@ -125,11 +142,25 @@ class FloatingWindow(QWidget):
         self.change_label.setAlignment(Qt.AlignCenter)
         self.change_label.setFont(QFont("Microsoft YaHei", 10))
         
+        # 技术指标
+        self.indicator_label = QLabel()
+        self.indicator_label.setAlignment(Qt.AlignCenter)
+        self.indicator_label.setFont(QFont("Microsoft YaHei", 8))
+        self.indicator_label.setStyleSheet("color: rgba(255,255,255,0.7);")
+        
         layout.addLayout(header_layout)
         layout.addWidget(self.price_label)
         layout.addWidget(self.change_label)
+        layout.addWidget(self.indicator_label)
+        
+        # 持仓盈亏（有持仓文件时显示）
+        self.portfolio_label = QLabel()
+        self.portfolio_label.setAlignment(Qt.AlignCenter)
+        self.portfolio_label.setFont(QFont("Microsoft YaHei", 8))
+        self.portfolio_label.hide()
+        layout.addWidget(self.portfolio_label)
     
-    def update_stock_info(self, code, name, price, price_change, change_percent):
+    def update_stock_info(self, code, name, price, price_change, change_percent, indicators=None):
         """更新股票信息"""
         # 分开显示名称和代码
         self.name_label.setText(f"{name}")
@@ -141,6 +172,18 @@ class FloatingWindow(QWidget):
         # 设置涨跌颜色
         color = "#F5222D" if price_change.startswith("+") else "#52C41A"
         self.change_label.setText(f"<span style='color:{color};'>{price_change} ({change_percent})</span>")
+        self.indicator_label.setText(indicator_text(indicators))
+    
+    def update_portfolio(self, summary):
+        """更新持仓盈亏，summary 为 None 时隐藏"""
+        if summary is None:
+            self.portfolio_label.hide()
+            self.setFixedSize(160, 106)
+            return
+        color = "#F5222D" if summary["pnl"] >= 0 else "#52C41A"
+        self.portfolio_label.setText(f"<span style='color:{color};'>{portfolio_text(summary)}</span>")
+        self.portfolio_label.show()
+        self.setFixedSize(160, 122)
     
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
@@ -182,8 +225,34 @@ class FloatingWindow(QWidget):
         return super().eventFilter(obj, event)
 
 
+class QuoteNotifier(QObject):
+    """把推送线程收到行情的通知、后台线程取回的变化字段转到界面线程"""
+    quotes_changed = pyqtSignal()
+    deltas_ready = pyqtSignal(object)
+
+
+class StockListNotifier(QObject):
+    """把后台线程读好的股票列表送回界面线程"""
+    stock_list_ready = pyqtSignal(dict)
+
+
+class IndicatorNotifier(QObject):
+    """把后台线程读好的日K送回界面线程，失败时为 None"""
+    history_ready = pyqtSignal(str, object)
+
+
+class ProbeNotifier(QObject):
+    """把后台线程探测交易所的结果送回界面线程"""
+    probe_done = pyqtSignal(str, bool)
+
+
+class SnapshotNotifier(QObject):
+    """把后台线程算好的市场宽度统计送回界面线程，失败时为 None"""
+    snapshot_ready = pyqtSignal(object)
+
+
 class StockTrayApp:
-    def __init__(self):
+    def __init__(self, feed_address=None, quote_url=SINA_QUOTE_URL, record_path=None, providers=None):
         # 创建应用
         self.app = QApplication(sys.argv)
         self.app.setQuitOnLastWindowClosed(False)  # 关闭窗口时不退出应用
@@ -200,6 +269,20 @@ class StockTrayApp:
         self.change_percent = "+0.00%"
         self.market_status = "休市"  # 市场状态
         self.update_time = "--:--"   # 更新时间
+        self.clock_changed = False   # 本次刷新行情没变、但状态或时间变了
+        
+        # 日线技术指标：用本地日K回填到上一个交易日（后台补齐缺少的K线），盘中按最新价计算当天这根
+        self.indicators = DailyIndicatorTracker()
+        self.indicator_values = None
+        self.previous_indicators = None
+        self.indicator_requested = set()  # 已请求过日K的代码，每个只请求一次
+        self.indicator_cooldown = AlertCooldown(INDICATOR_ALERT_COOLDOWN)
+        self.kline_lock = threading.Lock()  # 与K线图窗口共用，同一时间只有一个线程读写K线文件
+        self.indicator_notifier = IndicatorNotifier()
+        self.indicator_notifier.history_ready.connect(self.on_indicator_history)
+        self.probing_code = None  # 正在后台探测交易所、等待切换的代码
+        self.probe_notifier = ProbeNotifier()
+        self.probe_notifier.probe_done.connect(self.on_stock_probed)
         
         # 创建悬浮窗口
         self.floating_window = FloatingWindow()
@@ -215,9 +298,63 @@ class StockTrayApp:
         window_rect.moveBottom(screen_rect.bottom() - 50)
         self.floating_window.move(window_rect.topLeft())
         
-        # 股票名称缓存（用于搜索）
+        # 先显示上次退出时的行情，实时行情在后台获取
+        self.last_quote = None
+        self.last_quote_saved = 0.0
+        self.load_last_quote()
+        
+        # 行情来源：指定守护进程地址时订阅推送，指定多家接口时对冲轮询，否则直接轮询新浪
+        self.quote_url = quote_url
+        self.rendered_code = None  # 当前显示的实时行情对应的股票代码（缓存的行情不算）
+        self.refresh_busy = False
+        self.refresh_pending = False
+        self.quote_notifier = QuoteNotifier()
+        self.quote_notifier.deltas_ready.connect(self.on_deltas_ready)
+        self.quote_source = None
+        if feed_address:
+            source = FeedStreamSource(feed_address)
+            source.subscribe([self.stock_code])
+            try:
+                source.connect()
+                # 收到推送立即刷新，不必等待定时器
+                self.quote_notifier.quotes_changed.connect(self.refresh_stock_data)
+                source.on_delta = lambda deltas: self.quote_notifier.quotes_changed.emit()
+                self.quote_source = source
+            except OSError as e:
+                print(f"连接行情守护进程失败，改为直接获取: {e}")
+        if self.quote_source is None and providers and not record_path:
+            from providers import PROVIDERS, HedgedFetcher
+            fetcher = HedgedFetcher([PROVIDERS[name]() for name in providers])
+            self.quote_source = HedgedPollingSource(fetcher)
+            self.quote_source.subscribe([self.stock_code])
+        if self.quote_source is None:
+            # 指定录制文件时保存每次接口的原始返回，供 replay_server.py / backtest.py 回放
+            recorder = None
+            if record_path:
+                from ticks import TickRecorder
+                recorder = TickRecorder(record_path)
+            self.quote_source = SinaPollingSource(quote_url, recorder=recorder)
+            self.quote_source.subscribe([self.stock_code])
+        self.app.aboutToQuit.connect(self.quote_source.close)
+        self.app.aboutToQuit.connect(self.save_last_quote)
+        
+        # 持仓：同时订阅所有持仓代码的行情（显示图标后再读取）
+        self.portfolio = None
+        self.portfolio_summary = None
+        self.portfolio_changed = False
+        
+        # 股票名称缓存（用于搜索），在后台线程读取，读完之前为空
         self.stock_cache = {}
-        self.load_stock_list() # 加载股票列表
+        self.universe = None  # 基础信息库，读完股票列表后打开
+        self.stock_list_loaded = False
+        self.stock_list_dirty = False  # 读完之前新增了名称，读完后要保存
+        self.stock_list_notifier = StockListNotifier()
+        self.stock_list_notifier.stock_list_ready.connect(self.on_stock_list_loaded)
+        threading.Thread(target=self._load_stock_list, daemon=True).start()
+        
+        # 自选列表窗口、K线图窗口（首次打开时创建）
+        self.watchlist_window = None
+        self.kline_window = None
         
         # 创建系统托盘图标
         self.tray_icon = QSystemTrayIcon()
@@ -246,6 +383,28 @@ class StockTrayApp:
         change_stock_action.triggered.connect(self.show_stock_dialog)
         self.menu.addAction(change_stock_action)
         
+        # 添加自选列表选项
+        watchlist_action = QAction("自选列表", self.menu)
+        watchlist_action.triggered.connect(self.show_watchlist)
+        self.menu.addAction(watchlist_action)
+        
+        # 添加K线图选项
+        kline_action = QAction("K线图", self.menu)
+        kline_action.triggered.connect(self.show_kline)
+        self.menu.addAction(kline_action)
+        
+        # 添加市场概览子菜单（打开时在后台拉取全市场快照）
+        self.market_menu = QMenu("市场概览", self.menu)
+        self.market_menu.aboutToShow.connect(self.refresh_market_snapshot)
+        self.market_stats = None
+        self.market_stats_time = 0.0
+        self.market_busy = False
+        self.market_failed = False
+        self.snapshot_notifier = SnapshotNotifier()
+        self.snapshot_notifier.snapshot_ready.connect(self.update_market_menu)
+        self.update_market_menu(None)
+        self.menu.addMenu(self.market_menu)
+        
         # 添加刷新选项
         refresh_action = QAction("刷新数据", self.menu)
         refresh_action.triggered.connect(self.refresh_stock_data)
@@ -269,28 +428,89 @@ class StockTrayApp:
         # 将菜单设置到托盘图标
         self.tray_icon.setContextMenu(self.menu)
         
-        # 初始绘制图标
+        # 初始绘制图标（有缓存行情时显示缓存的价格）
         self.draw_stock_icon()
         
         # 显示托盘图标
         self.tray_icon.show()
+        self.floating_window.update_stock_info(self.stock_code, self.stock_name, self.current_price,
+                                               self.price_change, self.change_percent)
         
         # 创建定时器，实时更新数据(默认3秒)
         self.timer = QTimer()
         self.timer.timeout.connect(self.refresh_stock_data)
         self.timer.start(DEFAULT_REFRESH_RATE * 1000)
         
-        # 初始获取股票数据
+        # 初始获取股票数据（后台线程），持仓在图标显示之后再读取
         self.refresh_stock_data()
+        QTimer.singleShot(0, self.load_portfolio)
+    
+    def load_last_quote(self):
+        """读取上次保存的行情并显示，没有时保持默认股票"""
+        try:
+            with open(LAST_QUOTE_FILE, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            quote = saved["quote"]
+            display = format_quote(quote, datetime.now())
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        self.stock_code = saved["code"]
+        self.last_quote = quote
+        self.stock_name = display["stock_name"]
+        self.current_price = display["current_price"]
+        self.price_change = display["price_change"]
+        self.change_percent = display["change_percent"]
+        self.market_status = display["market_status"]
+        self.update_time = f"{quote['time'][:5]} (缓存)"
+    
+    def save_last_quote(self):
+        """保存最近一次的实时行情，下次启动时先显示"""
+        if self.last_quote is None:
+            return
+        try:
+            with open(LAST_QUOTE_FILE, 'w', encoding='utf-8') as f:
+                json.dump({"code": self.stock_code, "quote": self.last_quote}, f, ensure_ascii=False)
+            self.last_quote_saved = time.monotonic()
+        except Exception as e:
+            print(f"保存行情缓存失败: {e}")
+    
+    def _load_stock_list(self):
+        """在后台线程读取股票列表"""
+        self.stock_list_notifier.stock_list_ready.emit(self.read_stock_list())
     
-    def load_stock_list(self):
-        """加载股票列表数据"""
+    def on_stock_list_loaded(self, stocks):
+        """合并后台读好的股票列表（读取期间新增的名称保留）"""
+        for code, name in stocks.items():
+            self.stock_cache.setdefault(code, name)
+        self.stock_list_loaded = True
+        if os.path.exists(UNIVERSE_DB):
+            from universe import UniverseStore
+            try:
+                self.universe = UniverseStore(UNIVERSE_DB)
+                markets.update(self.universe.exchanges())  # 行情请求按库里记录的交易所路由
+            except Exception as e:
+                print(f"打开股票基础信息库失败: {e}")
+            else:
+                self.update_stock_info_label()
+        if self.stock_list_dirty:
+            self.save_stock_list()
+    
+    def read_stock_list(self):
+        """读取股票列表数据，有基础信息库时只取其中上市中的股票"""
+        if os.path.exists(UNIVERSE_DB):
+            try:
+                from universe import UniverseStore
+                with UniverseStore(UNIVERSE_DB) as store:
+                    stocks = store.names()
+                if stocks:
+                    return stocks
+            except Exception as e:
+                print(f"读取股票基础信息库出错: {e}")
         try:
             # 尝试从本地文件加载股票列表
             try:
                 with open('stock_list.json', 'r', encoding='utf-8') as f:
-                    self.stock_cache = json.load(f)
-                    return
+                    return json.load(f)
             except (FileNotFoundError, json.JSONDecodeError):
                 pass
                 
@@ -310,41 +530,39 @@ class StockTrayApp:
                 "601166": "兴业银行", "600036": "招商银行", "600276": "恒瑞医药", 
                 "600887": "伊利股份", "601328": "交通银行", "603019": "中科曙光"
             }
-            self.stock_cache = basic_stocks
             
             # 保存到本地文件
             with open('stock_list.json', 'w', encoding='utf-8') as f:
-                json.dump(self.stock_cache, f, ensure_ascii=False, indent=2)
+                json.dump(basic_stocks, f, ensure_ascii=False, indent=2)
+            return basic_stocks
                 
         except Exception as e:
             print(f"加载股票列表出错: {e}")
             # 如果出错，至少确保有默认股票
-            self.stock_cache = {"603019": "中科曙光"}
+            return {"603019": "中科曙光"}
+    
+    def save_stock_list(self):
+        """保存股票列表缓存到本地文件"""
+        if not self.stock_list_loaded:
+            # 还没读完就保存会覆盖掉完整的列表
+            self.stock_list_dirty = True
+            return
+        try:
+            with metrics.timer("json_write"), open('stock_list.json', 'w', encoding='utf-8') as f:
+                json.dump(self.stock_cache, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存股票列表失败: {e}")
     
     def update_stock_info_label(self):
         """更新股票信息标签"""
-        # 根据涨跌设置颜色
-        if self.price_change.startswith("+"):
-            price_color = "#F5222D"  # 红色
-        else:
-            price_color = "#52C41A"  # 绿色
-            
-        # 判断市场状态颜色
-        status_color = "#8C8C8C"  # 默认灰色
-        if self.market_status == "交易中":
-            status_color = "#1890FF"  # 蓝色
-        
-        # 更新HTML内容
-        self.stock_info_container.setText(
-            f"<div style='padding:10px; text-align:center;'>"
-            f"<div style='font-size:16px;'><b>{self.stock_name}</b> <span style='color:#8C8C8C; font-size:12px;'>{self.stock_code}</span></div>"
-            f"<div style='font-size:26px; margin:5px 0; font-weight:bold;'>{self.current_price}</div>"
-            f"<div style='color:{price_color}; font-size:14px;'>{self.price_change} ({self.change_percent})</div>"
-            f"<div style='margin-top:6px; font-size:12px;'>"
-            f"<span style='color:{status_color};'>{self.market_status}</span> | "
-            f"更新: {self.update_time}</div>"
-            f"</div>"
-        )
+        board = ""
+        if self.universe is not None:
+            from universe import describe
+            board = describe(self.universe.get(self.stock_code))
+        self.stock_info_container.setText(render_info_html(
+            self.stock_code, self.stock_name, self.current_price, self.price_change,
+            self.change_percent, self.market_status, self.update_time, self.indicator_values, board
+        ))
     
     def tray_icon_activated(self, reason):
         """处理托盘图标激活事件"""
@@ -388,17 +606,7 @@ class StockTrayApp:
         painter.setFont(QFont("Arial", 9, QFont.Bold))
         
         # 根据数字长度调整显示方式
-        price = float(self.current_price)
-        display_text = ""
-        
-        if price >= 1000:
-            display_text = str(int(price/1000))
-        elif price >= 100:
-            display_text = str(int(price/100))
-        elif price >= 10:
-            display_text = str(int(price/10))
-        else:
-            display_text = str(int(price))
+        display_text = icon_text(self.current_price)
         
         # 检查文本宽度是否超出图标宽度
         metrics = QFontMetrics(painter.font())
@@ -414,80 +622,97 @@ class StockTrayApp:
         # 设置图标
         self.tray_icon.setIcon(QIcon(pixmap))
     
-    def get_stock_data(self):
-        """获取股票数据"""
+    def get_stock_data(self, deltas):
+        """用后台取回的变化字段更新股票数据，返回当前股票的显示是否需要更新"""
         try:
-            # 使用新浪财经API获取股票数据
-            # 上证: sh + 代码, 深证: sz + 代码
-            prefix = "sh" if self.stock_code.startswith("6") else "sz"
-            url = f"https://hq.sinajs.cn/list={prefix}{self.stock_code}"
-            
-            headers = {
-                "User-Agent": "Mozilla/5.0",
-                "Referer": "https://finance.sina.com.cn"
-            }
+            # 只取变化的字段，行情没有变化时不重绘
+            if self.portfolio is not None and deltas:
+                self.update_portfolio(deltas)
+            if self.stock_code == self.rendered_code and self.stock_code not in deltas:
+                metrics.incr("refresh_unchanged")
+                self.clock_changed = self.update_market_clock()
+                return False
             
-            response = requests.get(url, headers=headers)
-            response.encoding = 'gbk'  # 设置正确的编码
-            
-            # 解析返回的数据
-            data = response.text.split('"')[1].split(',')
-            if len(data) > 3:
-                self.stock_name = data[0]
-                open_price = float(data[1])  # 开盘价
-                yesterclose = float(data[2])  # 昨日收盘价
-                self.current_price = data[3]  # 当前价格
-                high_price = data[4]  # 最高价
-                low_price = data[5]  # 最低价
-                
-                # 判断市场状态
-                now = datetime.now()
-                today_930 = now.replace(hour=9, minute=30, second=0)
-                today_1130 = now.replace(hour=11, minute=30, second=0)
-                today_1300 = now.replace(hour=13, minute=0, second=0)
-                today_1500 = now.replace(hour=15, minute=0, second=0)
-                
-                # 交易时间判断
-                is_trading_hours = ((now >= today_930 and now <= today_1130) or 
-                                  (now >= today_1300 and now <= today_1500))
-                
-                # 判断是否是周末
-                is_weekend = now.weekday() >= 5  # 5=周六，6=周日
-                
-                if is_weekend:
-                    self.market_status = "周末休市"
-                elif is_trading_hours:
-                    self.market_status = "交易中"
+            quote = self.quote_source.latest(self.stock_code)
+            if quote:
+                self.seed_indicators(self.stock_code)
+                self.rendered_code = self.stock_code
+                self.last_quote = quote
+                self.previous_indicators = self.indicators.get(self.stock_code)
+                if self.stock_code in deltas:
+                    self.indicator_values = self.indicators.update(self.stock_code, quote)
                 else:
-                    self.market_status = "休市"
-                
-                # 计算涨跌幅
-                price_change = float(self.current_price) - yesterclose
-                change_percent = (price_change / yesterclose) * 100
-                
-                # 格式化数据
-                self.price_change = f"+{price_change:.2f}" if price_change >= 0 else f"{price_change:.2f}"
-                self.change_percent = f"+{change_percent:.2f}%" if change_percent >= 0 else f"{change_percent:.2f}%"
-                
-                # 更新时间
-                self.update_time = now.strftime("%H:%M:%S")
+                    self.indicator_values = self.previous_indicators
+                display = format_quote(quote, datetime.now())
+                self.stock_name = display["stock_name"]
+                self.current_price = display["current_price"]
+                self.price_change = display["price_change"]
+                self.change_percent = display["change_percent"]
+                self.market_status = display["market_status"]
+                self.update_time = display["update_time"]
                 
                 # 如果股票名称没有在缓存中，添加到缓存中
                 if self.stock_code not in self.stock_cache:
                     self.stock_cache[self.stock_code] = self.stock_name
                     # 保存到本地文件
-                    try:
-                        with open('stock_list.json', 'w', encoding='utf-8') as f:
-                            json.dump(self.stock_cache, f, ensure_ascii=False, indent=2)
-                    except Exception as e:
-                        print(f"保存股票列表失败: {e}")
+                    self.save_stock_list()
                 
                 return True
             return False
         except Exception as e:
+            metrics.incr("refresh_failures")
             print(f"获取股票数据出错: {e}")
             return False
     
+    def seed_indicators(self, code):
+        """在后台补齐并读取日K，回填这只股票的日线指标"""
+        if code in self.indicator_requested:
+            return
+        self.indicator_requested.add(code)
+        threading.Thread(target=self._load_indicator_history, args=(code,), daemon=True).start()
+    
+    def _load_indicator_history(self, code):
+        bars = None
+        try:
+            # 需要 numpy，没有时不显示指标
+            from kline_store import KlineStore, update_history, to_seconds
+            with self.kline_lock:
+                store = KlineStore()
+                try:
+                    update_history(store, code, "day")
+                except Exception as e:
+                    print(f"获取K线数据出错: {e}")
+                # 今天的K线盘中还没走完，只回填到上一个交易日
+                today = to_seconds(date.today().isoformat())
+                bars = store.query(code, "day", end=today - 1, limit=INDICATOR_HISTORY)
+                store.close()
+        except Exception as e:
+            print(f"读取日K出错: {e}")
+        self.indicator_notifier.history_ready.emit(code, bars)
+    
+    def on_indicator_history(self, code, bars):
+        """界面线程：回填日线指标，是当前显示的股票时立即更新"""
+        if bars is None or not len(bars["close"]):
+            return
+        days = [str(day) for day in bars["time"].astype("datetime64[D]")]
+        self.indicators.seed(code, days, bars["close"], bars["volume"])
+        if code == self.stock_code == self.rendered_code and self.last_quote is not None:
+            self.previous_indicators = None
+            self.indicator_values = self.indicators.update(code, self.last_quote)
+            self.update_stock_info_label()
+            self.floating_window.update_stock_info(self.stock_code, self.stock_name, self.current_price,
+                                                   self.price_change, self.change_percent, self.indicator_values)
+    
+    def update_market_clock(self):
+        """行情没有变化时也按本地时钟更新市场状态和更新时间（午休、收盘），有变化时返回 True"""
+        now = datetime.now()
+        status, update_time = market_status(now), now.strftime("%H:%M:%S")
+        if status == self.market_status and update_time == self.update_time:
+            return False
+        self.market_status = status
+        self.update_time = update_time
+        return True
+    
     def toggle_floating_window(self):
         """切换悬浮窗口显示/隐藏状态"""
         if self.floating_window.isVisible():
@@ -498,42 +723,125 @@ class StockTrayApp:
             self.float_window_action.setText("隐藏悬浮窗口")
     
     def refresh_stock_data(self):
-        """刷新股票数据"""
-        if self.get_stock_data():
+        """在后台线程获取行情，取回后在界面线程更新显示；上一次还没返回时等它返回后再取"""
+        if self.refresh_busy:
+            self.refresh_pending = True
+            return
+        self.refresh_busy = True
+        threading.Thread(target=self._poll_quotes, daemon=True).start()
+    
+    def _poll_quotes(self):
+        deltas = None
+        try:
+            deltas = self.quote_source.poll()
+        except Exception as e:
+            metrics.incr("refresh_failures")
+            print(f"获取股票数据出错: {e}")
+        self.quote_notifier.deltas_ready.emit(deltas)
+    
+    def on_deltas_ready(self, deltas):
+        """界面线程：用取回的行情更新显示"""
+        self.refresh_busy = False
+        if deltas is not None:
+            with metrics.timer("refresh"):
+                self._refresh_stock_data(deltas)
+        if self.refresh_pending:
+            # 等待期间切换了股票或收到了推送
+            self.refresh_pending = False
+            self.refresh_stock_data()
+    
+    def _refresh_stock_data(self, deltas):
+        metrics.incr("refreshes")
+        self.clock_changed = False
+        changed = self.get_stock_data(deltas)
+        if not changed and self.clock_changed:
+            # 价格没变，不重绘图标和悬浮窗，只更新菜单里的状态和时间
+            with metrics.timer("label"):
+                self.update_stock_info_label()
+        if not changed and (self.portfolio_changed or self.clock_changed):
+            # 当前股票没变：其他持仓的价格变了，或提示里的状态和时间要更新
+            self.update_portfolio_display()
+        if changed:
             # 更新托盘图标和菜单
-            self.update_stock_info_label()
-            self.draw_stock_icon()
+            with metrics.timer("label"):
+                self.update_stock_info_label()
+            with metrics.timer("icon"):
+                self.draw_stock_icon()
             
             # 更新悬浮窗口
-            self.floating_window.update_stock_info(
-                self.stock_code, 
-                self.stock_name,
-                self.current_price,
-                self.price_change,
-                self.change_percent
-            )
+            with metrics.timer("floating_window"):
+                self.floating_window.update_stock_info(
+                    self.stock_code, 
+                    self.stock_name,
+                    self.current_price,
+                    self.price_change,
+                    self.change_percent,
+                    self.indicator_values
+                )
+            
+            # 更新托盘图标提示和持仓盈亏
+            self.update_portfolio_display()
             
-            # 更新托盘图标提示
-            tooltip = f"{self.stock_name} ({self.stock_code})\n{self.current_price} {self.price_change}\n{self.market_status} | 更新: {self.update_time}"
-            self.tray_icon.setToolTip(tooltip)
+            # 保存最近的行情，下次启动时先显示
+            if time.monotonic() - self.last_quote_saved >= LAST_QUOTE_SAVE_INTERVAL:
+                self.save_last_quote()
             
             # 如果涨跌幅超过5%，显示消息通知
-            change_percent_value = float(self.change_percent.replace('%', '').replace('+', ''))
-            if change_percent_value > 5:
+            alert = check_alert(self.stock_name, self.current_price, self.change_percent)
+            if not alert:
+                # MACD 金叉/死叉、RSI 超买/超卖
+                alert = check_indicator_alert(self.stock_name, self.current_price,
+                                              self.previous_indicators, self.indicator_values)
+                if alert and not self.indicator_cooldown.allow((self.stock_code, alert[0]), time.monotonic()):
+                    alert = None
+            if alert:
+                metrics.incr("notifications")
+                title, message, is_rise = alert
                 self.tray_icon.showMessage(
-                    f"{self.stock_name} 大幅上涨",
-                    f"当前价格: {self.current_price}, 涨幅: {self.change_percent}",
-                    QSystemTrayIcon.Information,
-                    3000
-                )
-            elif change_percent_value < -5:
-                self.tray_icon.showMessage(
-                    f"{self.stock_name} 大幅下跌",
-                    f"当前价格: {self.current_price}, 跌幅: {self.change_percent}",
-                    QSystemTrayIcon.Warning,
+                    title,
+                    message,
+                    QSystemTrayIcon.Information if is_rise else QSystemTrayIcon.Warning,
                     3000
                 )
     
+    def load_portfolio(self):
+        """读取持仓文件（不存在时不显示持仓）"""
+        if not os.path.exists(PORTFOLIO_FILE):
+            return
+        try:
+            # 需要 numpy，只在有持仓文件时导入
+            from portfolio import Portfolio
+            self.portfolio = Portfolio.load(PORTFOLIO_FILE)
+        except Exception as e:
+            print(f"读取持仓文件失败: {e}")
+            return
+        self.quote_source.subscribe(self.portfolio.codes)
+        self.refresh_stock_data()  # 马上取一次持仓代码的行情
+    
+    def update_portfolio(self, deltas):
+        """把有变化的持仓代码的最新行情写入组合并重新汇总"""
+        quotes = {}
+        for code in deltas:
+            if code in self.portfolio.slot_of:
+                quote = self.quote_source.latest(code)
+                if quote:
+                    quotes[code] = quote
+        if quotes:
+            with metrics.timer("portfolio"):
+                self.portfolio.update_quotes(quotes)
+                self.portfolio_summary = self.portfolio.summary()
+            self.portfolio_changed = True
+    
+    def update_portfolio_display(self):
+        """更新托盘图标提示和悬浮窗口中的持仓盈亏"""
+        tooltip = render_tooltip(self.stock_code, self.stock_name, self.current_price,
+                                 self.price_change, self.market_status, self.update_time,
+                                 self.portfolio_summary)
+        self.tray_icon.setToolTip(tooltip)
+        if self.portfolio_changed:
+            self.floating_window.update_portfolio(self.portfolio_summary)
+            self.portfolio_changed = False
+    
     def search_stock(self, keyword):
         """根据关键词搜索股票，如果本地未找到则进行在线搜索"""
         results = []
@@ -541,8 +849,19 @@ class StockTrayApp:
         found_in_local = False
         
         # 先在本地缓存中搜索
+        if self.universe is not None:
+            # 基础信息库：代码走主键范围查询，名称（含曾用名）走全文索引
+            try:
+                results = self.universe.search(keyword, limit=20)
+            except Exception as e:
+                print(f"查询股票基础信息库出错: {e}")
+            found_in_local = any(code == keyword for code, _ in results)
+            if not found_in_local and keyword in self.stock_cache:
+                # 之前在线搜到、库里还没有的代码
+                results.insert(0, (keyword, self.stock_cache[keyword]))
+                found_in_local = True
         # 如果输入是股票代码
-        if keyword.isdigit():
+        elif keyword.isdigit():
             for code, name in self.stock_cache.items():
                 if code.startswith(keyword):
                     results.append((code, name))
@@ -556,64 +875,33 @@ class StockTrayApp:
                     results.append((code, name))
         
         # 如果是股票代码但在本地未找到精确匹配，则从网络搜索
-        if keyword.isdigit() and len(keyword) == 6 and not found_in_local:
-            try:
-                online_result = self.online_search_stock(keyword)
-                if online_result:
-                    code, name = online_result
-                    # 添加到结果开头并标记为网络来源
-                    results.insert(0, (code, name))
-                    # 添加到缓存
-                    self.stock_cache[code] = name
-                    # 保存到本地文件
-                    try:
-                        with open('stock_list.json', 'w', encoding='utf-8') as f:
-                            json.dump(self.stock_cache, f, ensure_ascii=False, indent=2)
-                    except Exception as e:
-                        print(f"保存股票列表失败: {e}")
-            except Exception as e:
-                print(f"在线搜索股票出错: {e}")
+        if keyword.isdigit() and len(keyword) == 6:
+            metrics.incr("cache_hits" if found_in_local else "cache_misses")
+            if not found_in_local:
+                try:
+                    online_result = self.online_search_stock(keyword)
+                    if online_result:
+                        code, name = online_result
+                        # 添加到结果开头并标记为网络来源
+                        results.insert(0, (code, name))
+                        # 添加到缓存
+                        self.stock_cache[code] = name
+                        # 保存到本地文件
+                        self.save_stock_list()
+                except Exception as e:
+                    print(f"在线搜索股票出错: {e}")
         
         return results[:20]  # 最多返到20个结果
     
     def online_search_stock(self, code):
-        """从网络搜索股票信息"""
-        # 请求数据
+        """从网络搜索股票信息，返回 (代码, 名称)，查不到时为 None
+
+        交易所由号段表和基础信息库确定，只请求一次；两者都判断不了的代码在同一次请求里带上所有市场前缀。
+        """
         try:
-            # 确定股票市场
-            # 上证: sh + 代码, 深证: sz + 代码
-            prefix = "sh" if code.startswith("6") else "sz"
-            url = f"https://hq.sinajs.cn/list={prefix}{code}"
-            
-            headers = {
-                "User-Agent": "Mozilla/5.0",
-                "Referer": "https://finance.sina.com.cn"
-            }
-            
-            response = requests.get(url, headers=headers)
-            response.encoding = 'gbk'  # 设置正确的编码
-            
-            # 解析返回的数据
-            data = response.text
-            # 检查是否找到结果
-            if "FAILED" in data or len(data.split('",')[0].split('="')) < 2:
-                # 尝试另一个前缀
-                prefix = "sz" if prefix == "sh" else "sh"
-                url = f"https://hq.sinajs.cn/list={prefix}{code}"
-                response = requests.get(url, headers=headers)
-                response.encoding = 'gbk'
-                data = response.text
-                
-            # 再次检查结果
-            if "FAILED" in data or len(data.split('",')[0].split('="')) < 2:
-                return None
-            
-            # 提取股票名称
-            stock_data = data.split('",')[0].split('="')[1]
-            if "," in stock_data and len(stock_data.split(',')) > 0:
-                stock_name = stock_data.split(',')[0]
-                return (code, stock_name)
-                
+            quote = fetch_quotes([code], url=self.quote_url or SINA_QUOTE_URL).get(code)
+            if quote and quote["name"]:
+                return (code, quote["name"])
             return None
         except Exception as e:
             print(f"获取股票数据出错: {e}")
@@ -642,12 +930,15 @@ class StockTrayApp:
         layout.addLayout(search_layout)
         
         # 创建结果表格
-        result_table = QTableWidget(0, 2)  # 0行2列
-        result_table.setHorizontalHeaderLabels(["代码", "名称"])
+        from watchlist import SearchResultModel
+        result_model = SearchResultModel(dialog)
+        result_table = QTableView()
+        result_table.setModel(result_model)
+        result_table.verticalHeader().setVisible(False)
         result_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
         result_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
-        result_table.setEditTriggers(QTableWidget.NoEditTriggers)  # 不可编辑
-        result_table.setSelectionBehavior(QTableWidget.SelectRows)  # 按行选择
+        result_table.setEditTriggers(QAbstractItemView.NoEditTriggers)  # 不可编辑
+        result_table.setSelectionBehavior(QAbstractItemView.SelectRows)  # 按行选择
         layout.addWidget(result_table)
         
         # 添加分隔线
@@ -675,13 +966,7 @@ class StockTrayApp:
                 return
                 
             results = self.search_stock(keyword)
-            result_table.setRowCount(len(results))
-            
-            for i, (code, name) in enumerate(results):
-                code_item = QTableWidgetItem(code)
-                name_item = QTableWidgetItem(name)
-                result_table.setItem(i, 0, code_item)
-                result_table.setItem(i, 1, name_item)
+            result_model.set_results(results)
             
             if results:
                 result_table.selectRow(0)  # 选中第一行
@@ -694,20 +979,18 @@ class StockTrayApp:
         search_input.returnPressed.connect(perform_search)  # 回车键触发搜索
         
         # 双击选择股票
-        def on_table_double_clicked(item):
-            row = item.row()
-            code = result_table.item(row, 0).text()
+        def on_table_double_clicked(index):
+            code = result_model.code_at(index.row())
             dialog.accept()
             self.change_stock(code, dialog)
         
-        result_table.itemDoubleClicked.connect(on_table_double_clicked)
+        result_table.doubleClicked.connect(on_table_double_clicked)
         
         # 选择按钮点击
         def on_select_clicked():
-            selected_rows = result_table.selectedItems()
+            selected_rows = result_table.selectionModel().selectedRows()
             if selected_rows:
-                row = selected_rows[0].row()
-                code = result_table.item(row, 0).text()
+                code = result_model.code_at(selected_rows[0].row())
                 dialog.accept()
                 self.change_stock(code, dialog)
         
@@ -717,15 +1000,132 @@ class StockTrayApp:
         # 显示对话框
         dialog.exec_()
     
+    def show_watchlist(self):
+        """显示自选列表窗口"""
+        if self.watchlist_window is None:
+            from watchlist import WatchlistWindow
+            self.watchlist_window = WatchlistWindow(self.stock_cache)
+            self.watchlist_window.stock_selected.connect(self.change_stock)
+        self.watchlist_window.show()
+        self.watchlist_window.raise_()
+        self.watchlist_window.activateWindow()
+    
+    def show_kline(self):
+        """显示当前股票的K线图窗口"""
+        if self.kline_window is None:
+            try:
+                # 需要 numpy，只在用到K线图时导入
+                from kline_chart import KlineWindow
+            except ImportError as e:
+                QMessageBox.warning(None, "K线图", f"K线图需要 numpy: {e}")
+                return
+            self.kline_window = KlineWindow(lock=self.kline_lock)
+        self.kline_window.set_stock(self.stock_code, self.stock_name)
+        self.kline_window.show()
+        self.kline_window.raise_()
+        self.kline_window.activateWindow()
+    
+    def refresh_market_snapshot(self, force=False):
+        """在后台线程拉取股票列表中全部代码的行情，缓存时间内不重复拉取"""
+        if self.market_busy:
+            return
+        if not force and time.monotonic() - self.market_stats_time < MARKET_SNAPSHOT_TTL:
+            return
+        self.market_busy = True
+        codes = list(self.stock_cache)
+        threading.Thread(target=self._fetch_market_snapshot, args=(codes,), daemon=True).start()
+    
+    def _fetch_market_snapshot(self, codes):
+        stats = None
+        try:
+            # 需要 numpy，只在用到市场概览时导入
+            from market_snapshot import fetch_snapshot, breadth
+            with metrics.timer("snapshot"):
+                stats = breadth(fetch_snapshot(codes, url=self.quote_url))
+        except Exception as e:
+            print(f"获取市场快照出错: {e}")
+        finally:
+            self.market_busy = False
+        self.market_failed = stats is None
+        self.snapshot_notifier.snapshot_ready.emit(stats)
+    
+    def update_market_menu(self, stats):
+        """用最新的统计结果重建市场概览子菜单"""
+        if stats is not None:
+            self.market_stats = stats
+            self.market_stats_time = time.monotonic()
+        menu = self.market_menu
+        # clear() 只移除动作，addMenu 建出的榜单子菜单要手动释放
+        for action in menu.actions():
+            if action.menu() is not None:
+                action.menu().deleteLater()
+        menu.clear()
+
+        def add_info(text):
+            action = menu.addAction(text)
+            action.setEnabled(False)
+        
+        stats = self.market_stats
+        if stats is None:
+            add_info("获取失败，请稍后刷新" if self.market_failed else "正在加载...")
+        else:
+            add_info(f"上涨 {stats['advancers']}  下跌 {stats['decliners']}  平盘 {stats['unchanged']}")
+            add_info(f"涨停 {stats['limit_up']}  跌停 {stats['limit_down']}  停牌 {stats['suspended']}")
+            add_info(f"成交额 {stats['amount'] / 1e8:.0f} 亿 ({stats['total']} 只)")
+            menu.addSeparator()
+            # 榜单中点击某只股票即切换到该股票
+            for title, key in (("涨幅榜", "gainers"), ("跌幅榜", "losers"), ("成交额榜", "turnover")):
+                submenu = menu.addMenu(title)
+                for code, name, price, change_percent, amount in stats[key]:
+                    text = f"{name} {code}  {price:.2f}  {change_percent:+.2f}%"
+                    if key == "turnover":
+                        text += f"  {amount / 1e8:.1f}亿"
+                    action = submenu.addAction(text)
+                    action.triggered.connect(lambda checked, c=code: self.change_stock(c))
+        menu.addSeparator()
+        refresh_action = menu.addAction("刷新")
+        refresh_action.triggered.connect(lambda: self.refresh_market_snapshot(force=True))
+    
     def change_stock(self, new_code, dialog=None):
-        """更改跟踪的股票代码"""
-        if new_code and (new_code.startswith("6") or new_code.startswith("0") or new_code.startswith("3")):
-            self.stock_code = new_code
-            self.refresh_stock_data()
-            if dialog:
-                dialog.accept()
-            return True
-        return False
+        """更改跟踪的股票代码（6 位数字）；号段表和基础信息库都判断不了交易所的代码先在后台探测，查到后再切换"""
+        if not (new_code and len(new_code) == 6 and new_code.isdigit()):
+            return False
+        if new_code in self.stock_cache or markets.exchange(new_code):
+            self.probing_code = None
+            self._switch_stock(new_code)
+        else:
+            self.probing_code = new_code
+            threading.Thread(target=self._probe_stock, args=(new_code,), daemon=True).start()
+        if dialog:
+            dialog.accept()
+        return True
+    
+    def _probe_stock(self, code):
+        found = False
+        try:
+            found = code in probe_markets([code], url=self.quote_url or SINA_QUOTE_URL)
+        except Exception as e:
+            print(f"查询股票交易所出错: {e}")
+        self.probe_notifier.probe_done.emit(code, found)
+    
+    def on_stock_probed(self, code, found):
+        """界面线程：探测完成后切换；期间又选了别的股票时忽略"""
+        if code != self.probing_code:
+            return
+        self.probing_code = None
+        if found:
+            self._switch_stock(code)
+        else:
+            print(f"未找到股票代码: {code}")
+    
+    def _switch_stock(self, new_code):
+        if self.portfolio is None or self.stock_code not in self.portfolio.slot_of:
+            self.quote_source.unsubscribe([self.stock_code])
+        self.quote_source.subscribe([new_code])
+        self.stock_code = new_code
+        self.refresh_stock_data()
+        if self.kline_window is not None and self.kline_window.isVisible():
+            self.kline_window.set_stock(new_code, self.stock_cache.get(new_code, ""))
         
     def show_settings(self):
         """显示设置对话框"""
@@ -794,8 +1194,29 @@ class StockTrayApp:
         return self.app.exec_()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="迷你股票行情监控器")
+    parser.add_argument("--feed", help="订阅行情推送的地址，例如 127.0.0.1:8765 (见 quote_daemon.py)")
+    parser.add_argument("--quote-url", default=SINA_QUOTE_URL, help="轮询的行情接口地址，可指向本地回放服务")
+    parser.add_argument("--record", help="把每次获取的原始行情追加录制到该文件 (.jsonl.gz)")
+    parser.add_argument("--providers", help="同时使用的行情接口，逗号分隔，例如 sina,tencent,eastmoney；"
+                                            "按延迟排序并在慢时对冲请求 (见 providers.py)")
+    parser.add_argument("--metrics", help="开启运行指标并在该地址提供HTTP接口，例如 127.0.0.1:9108")
+    parser.add_argument("--metrics-log", type=float, help="开启运行指标并每隔N秒打印一行汇总")
+    args, _ = parser.parse_known_args()
+    if args.metrics or args.metrics_log:
+        metrics.enable()
+        if args.metrics:
+            print(f"运行指标: http://{metrics.start_http(args.metrics)}/metrics")
+        if args.metrics_log:
+            metrics.start_log(args.metrics_log)
+    providers = args.providers.split(",") if args.providers else None
+    if providers:
+        from providers import PROVIDERS
+    if providers and not set(providers) <= set(PROVIDERS):
+        parser.error(f"--providers 只能是 {','.join(PROVIDERS)}")
     try:
-        app = StockTrayApp()
+        app = StockTrayApp(feed_address=args.feed, quote_url=args.quote_url, record_path=args.record,
+                           providers=providers)
         sys.exit(app.run())
     except Exception as e:
         print(f"程序发生错误: {e}")
@@ -0,0 +1,54 @@
+"""行情tick文件：gzip压缩的JSON行，每行记录一次接口原始返回
+
+    {"t": 接收时间戳, "raw": "var hq_str_sh603019=\\"...\\";\\n..."}
+
+文件按 gzip 成员追加写入，中途中断也不会损坏已写入的部分。
+"""
+import gzip
+import json
+import time
+
+FLUSH_EVERY = 20  # 每写入多少条tick刷新一次压缩流
+
+
+def read_ticks(path):
+    """按顺序逐条读取tick，返回 (时间戳, 原始文本) 的迭代器"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                tick = json.loads(line)
+                yield tick["t"], tick["raw"]
+        except (EOFError, ValueError):
+            # 最后一条写入被中断，忽略残缺的尾部
+            return
+
+
+class TickRecorder:
+    """以追加方式录制接口原始返回
+
+    每 FLUSH_EVERY 条做一次同步刷新，进程意外退出时最多丢失最近的几条。
+    """
+    def __init__(self, path, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        self.count = 0
+        self._file = gzip.open(path, "ab")
+
+    def record(self, raw, t=None):
+        tick = {"t": time.time() if t is None else t, "raw": raw}
+        self._file.write((json.dumps(tick, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
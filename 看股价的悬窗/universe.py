@@ -0,0 +1,216 @@
+"""股票基础信息库：SQLite 保存代码、交易所、板块、上市日期、名称历史和上市状态，FTS5 做名称搜索
+
+    stocks          每只股票一行：代码、交易所、板块、当前名称、上市日期、状态（listed/delisted）、是否 ST
+    name_history    名称变更记录（改名、戴帽摘帽），每段 [start, end)，end 为空表示当前名称
+    status_history  上市状态变更记录（首次出现、退市、重新出现）
+    names_fts       FTS5 全文索引：当前名称和曾用名按单字切分，用短语查询匹配名称中任意连续的字
+
+    store = UniverseStore()
+    store.upsert(rows, exchanges=["sh", "sz"])   # 爬虫在一个事务中写入；这两个交易所本次没出现的代码记为退市
+    store.search("曙光")                          # [(代码, 名称), ...]，代码前缀或名称片段
+    store.get("603019")                           # {字段: 值}，没有时为 None
+"""
+import sqlite3
+from datetime import date
+
+UNIVERSE_DB = 'universe.db'
+
+LISTED = "listed"
+DELISTED = "delisted"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stocks (
+    code     TEXT PRIMARY KEY,
+    exchange TEXT,
+    board    TEXT,
+    name     TEXT NOT NULL,
+    listed   TEXT,
+    status   TEXT NOT NULL,
+    st       INTEGER NOT NULL DEFAULT 0,
+    updated  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stocks_board ON stocks (board, status);
+CREATE INDEX IF NOT EXISTS stocks_exchange ON stocks (exchange, status);
+CREATE TABLE IF NOT EXISTS name_history (
+    code  TEXT NOT NULL,
+    name  TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end   TEXT
+);
+CREATE INDEX IF NOT EXISTS name_history_code ON name_history (code, start);
+CREATE TABLE IF NOT EXISTS status_history (
+    code   TEXT NOT NULL,
+    status TEXT NOT NULL,
+    date   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS status_history_code ON status_history (code, date);
+CREATE VIRTUAL TABLE IF NOT EXISTS names_fts USING fts5 (name, former, tokenize = 'unicode61');
+"""
+
+UPSERT_CHUNK = 1000  # 爬虫结果按这个条数分批写入，不必先全部放进内存
+
+_COLUMNS = ["code", "exchange", "board", "name", "listed", "status", "st", "updated"]
+
+
+def is_st(name):
+    """ST、*ST 等风险警示股"""
+    return "ST" in name.upper()
+
+
+def _chars(text):
+    """按单字切分（字母数字以外的字符丢弃），供 FTS 索引和查询使用"""
+    return " ".join(ch for ch in text if ch.isalnum())
+
+
+def describe(info):
+    """板块和状态的简短说明，例如 '科创板 ST'、'主板 已退市'"""
+    if not info:
+        return ""
+    parts = [info["board"] or ""]
+    if info["st"]:
+        parts.append("ST")
+    if info["status"] == DELISTED:
+        parts.append("已退市")
+    return " ".join(part for part in parts if part)
+
+
+class UniverseStore:
+    def __init__(self, path=UNIVERSE_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM stocks").fetchone()[0]
+
+    def upsert(self, rows, exchanges=None, as_of=None):
+        """在一个事务中写入爬虫结果，返回 {"added", "renamed", "delisted", "relisted"} 计数
+
+        rows 为 {code, name, exchange?, board?, listed?} 字典序列，缺少或为空的字段不覆盖已有值。
+        exchanges 为本次完整抓取到的交易所：其中已上市、但本次没出现的代码记为退市。
+        任何一步出错时整个事务回滚，库中保持上次的内容。
+        """
+        as_of = as_of or date.today().isoformat()
+        counts = {"added": 0, "renamed": 0, "delisted": 0, "relisted": 0}
+        with self.conn:
+            cur = self.conn.cursor()
+            existing = {row[0]: row for row in cur.execute(
+                "SELECT code, rowid, name, exchange, board, listed, status FROM stocks")}
+            seen = set()
+            added = []
+            updated = []
+            for row in rows:
+                code = str(row["code"])
+                name = str(row["name"]).strip()
+                if not code or not name or code in seen:
+                    continue
+                seen.add(code)
+                old = existing.get(code)
+                if old is None:
+                    added.append((code, row.get("exchange"), row.get("board"), name, row.get("listed"),
+                                  LISTED, int(is_st(name)), as_of))
+                    if len(added) >= UPSERT_CHUNK:
+                        counts["added"] += self._insert(cur, added, as_of)
+                        added = []
+                    continue
+                _, rowid, old_name, exchange, board, listed, status = old
+                updated.append((row.get("exchange") or exchange, row.get("board") or board, name,
+                                row.get("listed") or listed, int(is_st(name)), as_of, rowid))
+                if len(updated) >= UPSERT_CHUNK:
+                    self._update(cur, updated)
+                    updated = []
+                if name != old_name:
+                    counts["renamed"] += 1
+                    cur.execute("UPDATE name_history SET end = ? WHERE code = ? AND end IS NULL", (as_of, code))
+                    cur.execute("INSERT INTO name_history (code, name, start) VALUES (?, ?, ?)", (code, name, as_of))
+                    former = [r[0] for r in cur.execute(
+                        "SELECT name FROM name_history WHERE code = ? AND end IS NOT NULL", (code,))]
+                    cur.execute("DELETE FROM names_fts WHERE rowid = ?", (rowid,))
+                    cur.execute("INSERT INTO names_fts (rowid, name, former) VALUES (?, ?, ?)",
+                                (rowid, _chars(name), _chars(" ".join(former))))
+                if status != LISTED:
+                    counts["relisted"] += 1
+                    cur.execute("INSERT INTO status_history VALUES (?, ?, ?)", (code, LISTED, as_of))
+            self._update(cur, updated)
+            counts["added"] += self._insert(cur, added, as_of)
+
+            if exchanges:
+                missing = [(as_of, code) for code, (_, _, _, exchange, _, _, status) in existing.items()
+                           if exchange in exchanges and status == LISTED and code not in seen]
+                if missing:
+                    counts["delisted"] = len(missing)
+                    cur.executemany("UPDATE stocks SET status = 'delisted', updated = ? WHERE code = ?", missing)
+                    cur.executemany("INSERT INTO status_history VALUES (?, 'delisted', ?)",
+                                    [(code, as_of) for as_of, code in missing])
+        return counts
+
+    def _update(self, cur, updated):
+        cur.executemany("UPDATE stocks SET exchange = ?, board = ?, name = ?, listed = ?, status = 'listed', "
+                        "st = ?, updated = ? WHERE rowid = ?", updated)
+
+    def _insert(self, cur, added, as_of):
+        """写入一批新代码及其名称、状态记录和全文索引，返回条数"""
+        if not added:
+            return 0
+        last = cur.execute("SELECT coalesce(max(rowid), 0) FROM stocks").fetchone()[0]
+        cur.executemany(f"INSERT INTO stocks ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})", added)
+        cur.executemany("INSERT INTO name_history (code, name, start) VALUES (?, ?, ?)",
+                        [(row[0], row[3], as_of) for row in added])
+        cur.executemany("INSERT INTO status_history VALUES (?, ?, ?)", [(row[0], LISTED, as_of) for row in added])
+        # 新行的 rowid 都大于写入前的最大值
+        cur.executemany("INSERT INTO names_fts (rowid, name, former) VALUES (?, ?, '')",
+                        [(rowid, _chars(name)) for rowid, name in cur.execute(
+                            "SELECT rowid, name FROM stocks WHERE rowid > ?", (last,)).fetchall()])
+        return len(added)
+
+    def get(self, code):
+        row = self.conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM stocks WHERE code = ?", (code,)).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def names(self, include_delisted=False):
+        """{代码: 名称}，默认只含上市中的"""
+        sql = "SELECT code, name FROM stocks" + ("" if include_delisted else " WHERE status = 'listed'")
+        return dict(self.conn.execute(sql + " ORDER BY code"))
+
+    def exchanges(self):
+        """{代码: 交易所}，供 sina_api.markets 路由行情请求"""
+        return dict(self.conn.execute("SELECT code, exchange FROM stocks WHERE exchange IS NOT NULL"))
+
+    def search(self, keyword, limit=20, include_delisted=False):
+        """代码前缀或名称（含曾用名）中连续的字，返回 [(代码, 名称), ...]，当前名称命中的排在前面"""
+        keyword = keyword.strip()
+        status = "" if include_delisted else " AND s.status = 'listed'"
+        if keyword.isdigit():
+            # 代码是定长数字，前缀查询转成主键上的范围查询
+            return self.conn.execute(f"SELECT code, name FROM stocks s WHERE code >= ? AND code < ?{status} "
+                                     "ORDER BY code LIMIT ?", (keyword, keyword + ":", limit)).fetchall()
+        chars = _chars(keyword)
+        if not chars:
+            return []
+        # 单字之间用空格隔开后作为一个短语查询，即名称中这几个字连续出现
+        return self.conn.execute(
+            "SELECT s.code, s.name FROM names_fts f JOIN stocks s ON s.rowid = f.rowid "
+            f"WHERE names_fts MATCH ?{status} ORDER BY instr(upper(s.name), upper(?)) = 0, s.code LIMIT ?",
+            (f'"{chars}"', keyword, limit)).fetchall()
+
+    def name_history(self, code):
+        """[(名称, 开始日期, 结束日期或 None), ...]，按时间先后"""
+        return self.conn.execute("SELECT name, start, end FROM name_history WHERE code = ? ORDER BY start, rowid",
+                                 (code,)).fetchall()
+
+    def status_history(self, code):
+        return self.conn.execute("SELECT status, date FROM status_history WHERE code = ? ORDER BY date, rowid",
+                                 (code,)).fetchall()
+
+    def by_board(self, board, include_delisted=False):
+        sql = "SELECT code, name FROM stocks WHERE board = ?" + ("" if include_delisted else " AND status = 'listed'")
+        return self.conn.execute(sql + " ORDER BY code", (board,)).fetchall()
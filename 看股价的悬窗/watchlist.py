@@ -0,0 +1,364 @@
+"""自选股列表窗口：基于 QAbstractTableModel 的列式行情表"""
+import json
+import threading
+from array import array
+
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton,
+                             QTableView, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import Qt, QObject, QTimer, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt5.QtGui import QColor
+
+from sina_api import fetch_quotes
+
+WATCHLIST_FILE = 'watchlist.json'
+WATCHLIST_REFRESH_MS = 1000  # 自选列表刷新间隔（毫秒）
+
+UP_COLOR = QColor("#F5222D")    # 上涨红色
+DOWN_COLOR = QColor("#52C41A")  # 下跌绿色
+
+# (表头, 行情字段, 显示格式)，名称列为字符串，其余为数值列
+COLUMNS = [
+    ("代码", "code", None),
+    ("名称", "name", None),
+    ("现价", "price", "{:.2f}"),
+    ("涨跌", "change", "{:+.2f}"),
+    ("涨跌幅", "change_percent", "{:+.2f}%"),
+    ("最高", "high", "{:.2f}"),
+    ("最低", "low", "{:.2f}"),
+    ("成交额(万)", "amount", "{:.0f}"),
+]
+NUMERIC_FIELDS = [field for _, field, fmt in COLUMNS if fmt]
+
+
+class QuoteTableModel(QAbstractTableModel):
+    """列式存储的行情表模型
+
+    每个数值字段一列 array('d')，按加入顺序存放；视图顺序由 _order 决定，
+    排序只重排下标而不移动数据。更新行情时仅对发生变化的单元格发出 dataChanged。
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._codes = []
+        self._names = []
+        self._columns = {field: array('d') for field in NUMERIC_FIELDS}
+        self._row_of = {}   # 代码 -> 存储行
+        self._order = []    # 视图行 -> 存储行
+        self._sort_column = -1
+        self._sort_order = Qt.AscendingOrder
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return None
+
+    def _value(self, row, column):
+        field = COLUMNS[column][1]
+        if field == "code":
+            return self._codes[row]
+        if field == "name":
+            return self._names[row]
+        return self._columns[field][row]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._order[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            value = self._value(row, column)
+            fmt = COLUMNS[column][2]
+            if not fmt:
+                return value
+            if COLUMNS[column][1] == "amount":
+                value /= 10000
+            return fmt.format(value)
+        if role == Qt.ForegroundRole and column >= 2:
+            change = self._columns["change"][row]
+            if change > 0:
+                return UP_COLOR
+            if change < 0:
+                return DOWN_COLOR
+        if role == Qt.TextAlignmentRole and column >= 2:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def codes(self):
+        return list(self._codes)
+
+    def code_at(self, view_row):
+        return self._codes[self._order[view_row]]
+
+    def add_code(self, code, name=""):
+        """添加一只股票，已存在则忽略"""
+        if code in self._row_of:
+            return False
+        row = len(self._codes)
+        self.beginInsertRows(QModelIndex(), len(self._order), len(self._order))
+        self._codes.append(code)
+        self._names.append(name)
+        for column in self._columns.values():
+            column.append(0.0)
+        self._row_of[code] = row
+        self._order.append(row)
+        self.endInsertRows()
+        return True
+
+    def remove_code(self, code):
+        """删除一只股票，末行搬到被删除的位置以保持列数组紧凑"""
+        row = self._row_of.get(code)
+        if row is None:
+            return False
+        view_row = self._order.index(row)
+        self.beginRemoveRows(QModelIndex(), view_row, view_row)
+        last = len(self._codes) - 1
+        if row != last:
+            self._codes[row] = self._codes[last]
+            self._names[row] = self._names[last]
+            for column in self._columns.values():
+                column[row] = column[last]
+            self._row_of[self._codes[row]] = row
+        self._codes.pop()
+        self._names.pop()
+        for column in self._columns.values():
+            column.pop()
+        del self._row_of[code]
+        del self._order[view_row]
+        self._order = [row if r == last else r for r in self._order]
+        self.endRemoveRows()
+        return True
+
+    def update_quotes(self, quotes):
+        """写入一批行情 {代码: 行情字典}，只通知变化的单元格"""
+        changed = {}  # 存储行 -> (最小列, 最大列)
+        sort_key_changed = False
+        sort_field = COLUMNS[self._sort_column][1] if self._sort_column >= 0 else None
+        for code, quote in quotes.items():
+            row = self._row_of.get(code)
+            if row is None:
+                continue
+            first = last = -1
+            name = quote.get("name")
+            if name and name != self._names[row]:
+                self._names[row] = name
+                first = last = 1
+                sort_key_changed |= sort_field == "name"
+            for column in range(2, len(COLUMNS)):
+                field = COLUMNS[column][1]
+                value = quote.get(field)
+                if value is None or self._columns[field][row] == value:
+                    continue
+                self._columns[field][row] = value
+                if first < 0:
+                    first = column
+                last = column
+                sort_key_changed |= sort_field == field
+            if first >= 0:
+                # 涨跌变化会改变整行颜色
+                if "change" in quote:
+                    first = min(first, 2)
+                changed[row] = (first, last)
+
+        if not changed:
+            return 0
+        if sort_key_changed and self._reorder():
+            return len(changed)
+        position = {row: view_row for view_row, row in enumerate(self._order)}
+        for row, (first, last) in changed.items():
+            view_row = position[row]
+            self.dataChanged.emit(self.index(view_row, first), self.index(view_row, last))
+        return len(changed)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column = column
+        self._sort_order = order
+        self._reorder()
+
+    def _reorder(self):
+        """按当前排序列重排视图顺序，顺序不变时不触发布局刷新"""
+        if self._sort_column < 0:
+            return False
+        column = self._sort_column
+        field = COLUMNS[column][1]
+        if field == "code":
+            keys = self._codes
+        elif field == "name":
+            keys = self._names
+        else:
+            keys = self._columns[field]
+        new_order = sorted(range(len(self._codes)), key=keys.__getitem__,
+                           reverse=self._sort_order == Qt.DescendingOrder)
+        if new_order == self._order:
+            return False
+
+        self.layoutAboutToBeChanged.emit()
+        new_position = {row: view_row for view_row, row in enumerate(new_order)}
+        old_indexes = self.persistentIndexList()
+        new_indexes = []
+        for index in old_indexes:
+            row = self._order[index.row()]
+            new_indexes.append(self.index(new_position[row], index.column()))
+        self._order = new_order
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+        return True
+
+
+class SearchResultModel(QAbstractTableModel):
+    """搜索结果表模型（代码、名称两列）"""
+    HEADERS = ["代码", "名称"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 2
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role == Qt.DisplayRole:
+            return self._rows[index.row()][index.column()]
+        return None
+
+    def set_results(self, results):
+        """替换全部结果 [(代码, 名称), ...]"""
+        self.beginResetModel()
+        self._rows = list(results)
+        self.endResetModel()
+
+    def code_at(self, row):
+        return self._rows[row][0]
+
+
+class _QuoteFetcher(QObject):
+    """在后台线程拉取行情，通过信号把结果送回界面线程"""
+    quotes_ready = pyqtSignal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._busy = False
+
+    def fetch(self, codes):
+        # 上一次请求还没返回时跳过，避免请求堆积
+        if self._busy or not codes:
+            return
+        self._busy = True
+        threading.Thread(target=self._run, args=(codes,), daemon=True).start()
+
+    def _run(self, codes):
+        try:
+            self.quotes_ready.emit(fetch_quotes(codes))
+        except Exception as e:
+            print(f"获取自选股行情出错: {e}")
+        finally:
+            self._busy = False
+
+
+class WatchlistWindow(QWidget):
+    """自选股列表窗口"""
+    stock_selected = pyqtSignal(str)
+
+    def __init__(self, stock_cache=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("自选列表")
+        self.resize(560, 420)
+        self.stock_cache = stock_cache if stock_cache is not None else {}
+
+        self.model = QuoteTableModel(self)
+        self.fetcher = _QuoteFetcher(self)
+        self.fetcher.quotes_ready.connect(self.model.update_quotes)
+
+        self._init_ui()
+        self.load()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+
+    def _init_ui(self):
+        layout = QVBoxLayout(self)
+
+        # 添加/删除区域
+        edit_layout = QHBoxLayout()
+        self.code_input = QLineEdit()
+        self.code_input.setPlaceholderText("输入股票代码添加到自选")
+        add_button = QPushButton("添加")
+        remove_button = QPushButton("删除")
+        edit_layout.addWidget(self.code_input, 6)
+        edit_layout.addWidget(add_button, 2)
+        edit_layout.addWidget(remove_button, 2)
+        layout.addLayout(edit_layout)
+
+        # 行情表格
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(-1, Qt.AscendingOrder)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        add_button.clicked.connect(self.on_add_clicked)
+        self.code_input.returnPressed.connect(self.on_add_clicked)
+        remove_button.clicked.connect(self.on_remove_clicked)
+        self.table.doubleClicked.connect(lambda index: self.stock_selected.emit(self.model.code_at(index.row())))
+
+    def load(self):
+        """从本地文件加载自选股"""
+        try:
+            with open(WATCHLIST_FILE, 'r', encoding='utf-8') as f:
+                codes = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            codes = []
+        for code in codes:
+            self.model.add_code(code, self.stock_cache.get(code, ""))
+
+    def save(self):
+        """保存自选股到本地文件"""
+        try:
+            with open(WATCHLIST_FILE, 'w', encoding='utf-8') as f:
+                json.dump(self.model.codes(), f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存自选列表失败: {e}")
+
+    def on_add_clicked(self):
+        code = self.code_input.text().strip()
+        if code.isdigit() and len(code) == 6 and self.model.add_code(code, self.stock_cache.get(code, "")):
+            self.code_input.clear()
+            self.save()
+            self.refresh()
+
+    def on_remove_clicked(self):
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()}, reverse=True)
+        codes = [self.model.code_at(row) for row in rows]
+        for code in codes:
+            self.model.remove_code(code)
+        if codes:
+            self.save()
+
+    def refresh(self):
+        self.fetcher.fetch(self.model.codes())
+
+    def showEvent(self, event):
+        self.refresh()
+        self.timer.start(WATCHLIST_REFRESH_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        # 窗口隐藏时停止刷新
+        self.timer.stop()
+        super().hideEvent(event)